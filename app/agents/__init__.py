@@ -1,10 +1,35 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+"""The NLP, verification and tokenization agents, each built on first use.
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///rwa_tokenization.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+Building the NLP agent loads the spaCy model, which takes seconds and a few
+hundred MB; processes that never parse input (CLI tools, job runners for
+tokenize only, a preloading gunicorn master) never pay for it.
+"""
+import threading
 
-db = SQLAlchemy(app)
+_agents = {}
+_lock = threading.Lock()
 
-# from app import routes  # If you have a routes.py file
+
+def _agent(name, factory):
+    agent = _agents.get(name)
+    if agent is None:
+        with _lock:
+            agent = _agents.get(name)
+            if agent is None:
+                agent = _agents[name] = factory()
+    return agent
+
+
+def get_nlp_agent():
+    from app.agents.nlp_agent import NLPAgent
+    return _agent('nlp', NLPAgent)
+
+
+def get_verification_agent():
+    from app.agents.verification_agent import VerificationAgent
+    return _agent('verification', VerificationAgent)
+
+
+def get_tokenization_agent():
+    from app.agents.tokenization_agent import TokenizationAgent
+    return _agent('tokenization', TokenizationAgent)
@@ -1,7 +1,7 @@
 import spacy
 import re
 from nltk.sentiment import SentimentIntensityAnalyzer
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 class NLPAgent:
     def __init__(self):
@@ -17,15 +17,17 @@ class NLPAgent:
             'commodity': ['gold', 'silver', 'oil', 'wheat', 'commodity', 'metal', 'oz', 'purity']
         }
 
-        # Value patterns
+        # Value patterns and the currency each implies. Lakh and crore come
+        # first so "worth 2 crore" is not read as 2 by the generic patterns.
         self.value_patterns = [
-            r'\$([0-9,]+(?:\.[0-9]{2})?)',
-            r'([0-9,]+(?:\.[0-9]{2})?) dollars?',
-            r'worth ([0-9,]+)',
-            r'valued at ([0-9,]+)',
-            r'inr[\s₹]*([\d,]+)',
-            r'(\d+(?:\.\d+)?)\s*(crore|crores|cr)',
-            r'(\d+(?:\.\d+)?)\s*(lakh|lac|lacs)'
+            (r'(\d+(?:\.\d+)?)\s*(crore|crores|cr)\b', 'INR'),
+            (r'(\d+(?:\.\d+)?)\s*(lakh|lakhs|lac|lacs)\b', 'INR'),
+            (r'(?:inr|₹|\brs\.?)[\s₹]*([\d,]+(?:\.\d+)?)', 'INR'),
+            (r'([\d,]+(?:\.\d+)?)\s*rupees?', 'INR'),
+            (r'\$([0-9,]+(?:\.[0-9]{2})?)', 'USD'),
+            (r'([0-9,]+(?:\.[0-9]{2})?) dollars?', 'USD'),
+            (r'worth ([0-9,]+)', None),
+            (r'valued at ([0-9,]+)', None)
         ]
 
         # Location patterns
@@ -37,11 +39,13 @@ class NLPAgent:
 
     def parse_user_input(self, text: str) -> Dict:
         doc = self.nlp(text.lower())
+        value, currency = self._extract_amount(text)
 
         result = {
             'asset_type': self._extract_asset_type(text),
             'description': self._clean_description(text),
-            'estimated_value': self._extract_value(text),
+            'estimated_value': value,
+            'currency': currency,
             'location': self._extract_location(text),
             'sentiment': self._analyze_sentiment(text),
             'entities': self._extract_entities(doc),
@@ -60,10 +64,11 @@ class NLPAgent:
                     return asset_type
         return 'unknown'
 
-    def _extract_value(self, text: str) -> Optional[float]:
+    def _extract_amount(self, text: str) -> Tuple[Optional[float], str]:
+        """The stated value and its ISO currency code; USD unless it reads as rupees."""
         text = text.lower()
 
-        for pattern in self.value_patterns:
+        for pattern, currency in self.value_patterns:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
                 value_str = match.group(1).replace(',', '')
@@ -74,13 +79,13 @@ class NLPAgent:
                         unit = match.group(2)
                         if unit in ['crore', 'crores', 'cr']:
                             value *= 1e7
-                        elif unit in ['lakh', 'lac', 'lacs']:
+                        elif unit in ['lakh', 'lakhs', 'lac', 'lacs']:
                             value *= 1e5
-                    return value
+                    return value, currency or 'USD'
                 except ValueError:
                     continue
 
-        return None
+        return None, 'USD'
 
     def _extract_location(self, text: str) -> Optional[str]:
         for pattern in self.location_patterns:
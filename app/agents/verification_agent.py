@@ -4,6 +4,9 @@ from datetime import datetime
 import json
 
 class VerificationAgent:
+    # Bump whenever scoring rules change, so stored results can be told apart
+    RULESET_VERSION = '1.0'
+
     def __init__(self):
         self.verification_threshold = 0.7
         
@@ -30,6 +33,7 @@ class VerificationAgent:
         verification_result = {
             'overall_score': 0.0,
             'status': 'pending',
+            'ruleset_version': self.RULESET_VERSION,
             'breakdown': {},
             'issues': [],
             'recommendations': [],
@@ -0,0 +1,444 @@
+"""ASGI deployment of the API, for many concurrent and mostly waiting clients.
+
+    uvicorn --factory app.asgi:create_asgi_app --host 0.0.0.0 --port 5000 --proxy-headers
+
+The read routes (an asset, a wallet's assets, stats, job status and the
+health checks) run on the event loop with async SQLAlchemy sessions. A
+client waiting on a read or polling a job costs a coroutine there, not a
+thread. Every other request goes to the Flask app from ``create_app()``,
+which runs on a pool of ``ASYNC_EXECUTOR_THREADS`` threads. That covers
+intake, verify, tokenize, the event stream, the page and static files. The
+NLP and verification agents are CPU-bound, so they run on those threads,
+off the event loop. Their writes go through the same session hooks as under
+gunicorn: stat counters, events, audit rows and idempotency keys.
+
+Responses match the Flask routes': the same bodies, ETags and 304s,
+MessagePack, NDJSON streams, compression and rate limits. With sharding
+enabled every request goes to the Flask app.
+"""
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_accept_header
+
+from app import codec
+from app.main import NDJSON_MIMETYPE, create_app
+from app.negotiation import (
+    COMPRESSIBLE_MIMETYPES, DEFAULT_MIN_SIZE, MSGPACK_MIMETYPE, best_coding, compress, pack, prefers_msgpack,
+    stream_compressor,
+)
+from app.models.addresses import InvalidWalletAddress, normalize_address
+from app.models.archive import archive_entries_query, read_archive_entries
+from app.models.async_db import AsyncDatabase
+from app.models.conditional import (
+    asset_row_validators, asset_version_query, matched_etag, validator_headers, wallet_row_validators,
+    wallet_version_query,
+)
+from app.models.database import User, Asset, Transaction, Job
+from app.models.fields import InvalidFieldRequest, columns, parse_fields, serializer
+from app.models.jobs import to_dict as job_to_dict
+from app.models.pagination import InvalidPageRequest, STREAM_BATCH_SIZE, newest_first, parse_limit, split_page
+from app.models.ratelimit import EXEMPT_ENDPOINTS, MemoryBuckets, parse_wallet
+from app.models.routing import READ_YOUR_WRITES_COOKIE, REPLICA_BIND_KEY
+from app.models.stats import counters_query, stats_cache, sum_counters
+
+DEFAULT_EXECUTOR_THREADS = 32
+
+logger = logging.getLogger(__name__)
+
+
+def create_asgi_app(config_name=None):
+    """Build the ASGI app around a Flask app from ``create_app(config_name)``."""
+    flask_app = create_app(config_name)
+    threads = flask_app.config.get('ASYNC_EXECUTOR_THREADS') or DEFAULT_EXECUTOR_THREADS
+    fallback = Mount('/', app=WSGIMiddleware(flask_app, workers=threads))
+
+    if flask_app.config.get('SHARD_COUNT'):
+        return Starlette(routes=[fallback], middleware=[cors()])
+
+    database = AsyncDatabase(flask_app)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await database.dispose()
+
+    app = Starlette(routes=[*api_routes(), fallback], middleware=[cors()], lifespan=lifespan)
+    app.state.flask_app = flask_app
+    app.state.database = database
+    return app
+
+
+def cors():
+    # Same policy as CORS(app) on the Flask side
+    return Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+
+
+def api_routes():
+    return [
+        route('/health', health_check_basic),
+        route('/api/health', health_check),
+        route('/api/jobs/{job_id:int}', get_job_status),
+        route('/api/asset/{asset_id:int}', get_asset),
+        route('/api/assets/{wallet_address}', get_user_assets),
+        route('/api/stats', get_stats),
+    ]
+
+
+def route(path, view):
+    """A GET route for ``view`` with the Flask app's rate limits and compression."""
+    async def endpoint(request):
+        refused = await rate_limit(request, view.__name__)
+        if refused is not None:
+            return refused
+        return compress_response(request, await view(request))
+
+    return Route(path, endpoint, methods=['GET'], name=view.__name__)
+
+
+# Request helpers ---------------------------------------------------------------
+
+def flask_config(request):
+    return request.app.state.flask_app.config
+
+
+def accept_mimetypes(request) -> MIMEAccept:
+    return parse_accept_header(request.headers.get('accept'), MIMEAccept)
+
+
+def wants_ndjson(request) -> bool:
+    return request.query_params.get('format') == 'ndjson' or accept_mimetypes(request).best == NDJSON_MIMETYPE
+
+
+def wants_msgpack(request) -> bool:
+    return prefers_msgpack(request.query_params.get('format'), accept_mimetypes(request))
+
+
+def wants_full_history(request) -> bool:
+    return request.query_params.get('history') == 'full'
+
+
+def response_variant(request) -> str:
+    if wants_ndjson(request):
+        return NDJSON_MIMETYPE
+    return MSGPACK_MIMETYPE if wants_msgpack(request) else 'application/json'
+
+
+def use_replica(request) -> bool:
+    """Whether reads may go to the replica; not for a client that has just written."""
+    if REPLICA_BIND_KEY not in (flask_config(request).get('SQLALCHEMY_BINDS') or {}):
+        return False
+    try:
+        primary_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    return primary_until <= time.time()
+
+
+def query_args(request):
+    return request.query_params.multi_items()
+
+
+def preconditions(request):
+    """The request's precondition headers as the WSGI environ keys ``matched_etag`` reads."""
+    return {
+        f"HTTP_{name.upper().replace('-', '_')}": request.headers[name]
+        for name in ('if-none-match', 'if-modified-since', 'if-match')
+        if name in request.headers
+    }
+
+
+# Responses ---------------------------------------------------------------------
+
+def json_response(request, payload, status=200, headers=None) -> Response:
+    body = request.app.state.flask_app.json.dumps(payload) + '\n'
+    return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+
+def render(request, payload, status=200) -> Response:
+    """Serialize a response payload as MessagePack or JSON, as the client asked."""
+    if wants_msgpack(request):
+        response = Response(pack(payload), status_code=status, media_type=MSGPACK_MIMETYPE)
+    else:
+        response = json_response(request, payload, status)
+    response.headers.add_vary_header('Accept')
+    return response
+
+
+def ndjson_response(rows) -> StreamingResponse:
+    """Stream one JSON document per item of the async iterable ``rows``."""
+    async def generate():
+        async for row in rows:
+            yield codec.dumps(row) + '\n'
+    return StreamingResponse(generate(), media_type=NDJSON_MIMETYPE)
+
+
+def with_validators(response, validators):
+    response.headers.update(validator_headers(validators))
+    return response
+
+
+def not_modified(request, validators):
+    tag = matched_etag(validators, preconditions(request))
+    if tag is None:
+        return None
+    response = with_validators(Response(status_code=304), (tag, validators[1]))
+    response.headers.add_vary_header('Accept-Encoding')
+    return response
+
+
+def compress_response(request, response):
+    """The Flask app's ``compress_response`` for Starlette responses."""
+    config = flask_config(request)
+    if not config.get('COMPRESS_RESPONSES', True):
+        return response
+    if response.status_code not in (200, 201, 202) or 'content-encoding' in response.headers:
+        return response
+    if response.media_type not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.headers.add_vary_header('Accept-Encoding')
+
+    coding = best_coding(parse_accept_header(request.headers.get('accept-encoding'), Accept))
+    if coding is None:
+        return response
+
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = compress_chunks(response.body_iterator, coding)
+    else:
+        if len(response.body) < config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+        response.body = compress(response.body, coding)
+        response.headers['content-length'] = str(len(response.body))
+
+    response.headers['content-encoding'] = coding
+    etag = response.headers.get('etag')
+    if etag:
+        # Each coding is a different representation, so it needs its own strong ETag
+        response.headers['etag'] = f'{etag[:-1]}-{coding}"'
+    return response
+
+
+async def compress_chunks(chunks, coding):
+    feed, finish = stream_compressor(coding)
+    async for chunk in chunks:
+        data = feed(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def rate_limit(request, view):
+    """The Flask app's rate limit refusal for this request, if any."""
+    if view in EXEMPT_ENDPOINTS:
+        return None
+    limiter = request.app.state.flask_app.extensions['rate_limiter']
+    wallet = parse_wallet(request.path_params.get('wallet_address') or request.query_params.get('wallet'))
+    remote_addr = request.client.host if request.client else None
+    if isinstance(limiter.store, MemoryBuckets):
+        refused = limiter.check(view, remote_addr, wallet)
+    else:
+        refused = await run_in_threadpool(limiter.check, view, remote_addr, wallet)
+    if refused is None:
+        return None
+    body, status, headers = refused
+    return json_response(request, body, status, headers)
+
+
+# Queries -----------------------------------------------------------------------
+
+def list_query(model, where, fields):
+    """A select for ``model`` rows, narrowed to ``fields`` when given, and a row serializer."""
+    if fields:
+        return select(*columns(model, fields)).where(where), serializer(fields)
+    return select(model).where(where).options(raiseload('*')), model.to_dict
+
+
+async def fetch(session, stmt, fields):
+    result = await session.execute(stmt)
+    return result.all() if fields else result.scalars().all()
+
+
+async def stream_rows(request, stmt, fields, serialize):
+    """Serialized rows of ``stmt`` in batches, on a session of their own that lives as long as the stream."""
+    async with request.app.state.database.session(use_replica(request)) as session:
+        stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+        result = await (session.stream(stmt) if fields else session.stream_scalars(stmt))
+        async for row in result:
+            yield serialize(row)
+
+
+async def read_archived_transactions(session, asset_id, fields):
+    entries = (await session.execute(archive_entries_query(asset_id))).all()
+    transactions = await run_in_threadpool(read_archive_entries, entries) if entries else []
+    if fields:
+        transactions = [{name: tx.get(name) for name in fields} for tx in transactions]
+    return transactions
+
+
+# Routes ------------------------------------------------------------------------
+
+async def health_check_basic(request):
+    return json_response(request, {'status': 'ok'})
+
+
+async def health_check(request):
+    return json_response(request, {
+        'status': 'healthy',
+        'timestamp': datetime.utcnow().isoformat(),
+        'version': '1.0.0'
+    })
+
+
+async def get_job_status(request):
+    try:
+        async with request.app.state.database.jobs_session() as session:
+            row = (await session.execute(
+                select(Job.__table__).where(Job.id == request.path_params['job_id'])
+            )).first()
+        if row is None:
+            return json_response(request, {'error': 'Job not found'}, 404)
+        return render(request, job_to_dict(row))
+
+    except Exception as e:
+        logger.error(f"Failed to get job: {str(e)}")
+        return json_response(request, {'error': 'Failed to retrieve job', 'details': str(e)}, 500)
+
+
+async def get_asset(request):
+    asset_id = request.path_params['asset_id']
+    database = request.app.state.database
+    try:
+        async with database.session(use_replica(request)) as session:
+            # Decide 304 from the version row alone, before loading the asset
+            row = (await session.execute(asset_version_query(asset_id))).first()
+            validators = asset_row_validators(row, asset_id, response_variant(request), query_args(request))
+            cached = not_modified(request, validators) if validators is not None else None
+            if cached is not None:
+                return cached
+
+            asset = await session.get(Asset, asset_id)
+            if asset is None:
+                raise NotFound()
+            cursor = request.query_params.get('cursor')
+            fields = parse_fields(request.query_params.get('fields'), Transaction)
+            history, serialize = list_query(Transaction, Transaction.asset_id == asset_id, fields)
+            history = newest_first(history, Transaction, cursor)
+
+            if wants_ndjson(request):
+                full_history = wants_full_history(request)
+
+                async def rows():
+                    async for tx in stream_rows(request, history, fields, serialize):
+                        yield tx
+                    if full_history:
+                        # Archived rows are all older than the live ones
+                        async with database.session(use_replica(request)) as archive_session:
+                            for tx in await read_archived_transactions(archive_session, asset_id, fields):
+                                yield tx
+
+                return with_validators(ndjson_response(rows()), validators)
+
+            limit = parse_limit(request.query_params.get('limit'))
+            transactions, next_cursor = split_page(await fetch(session, history.limit(limit + 1), fields), limit)
+            response = {
+                'asset': asset.to_dict(),
+                'transactions': [serialize(tx) for tx in transactions],
+                'next_cursor': next_cursor
+            }
+            if wants_full_history(request) and next_cursor is None:
+                response['archived_transactions'] = await read_archived_transactions(session, asset_id, fields)
+
+        return with_validators(render(request, response), validators)
+
+    except (InvalidPageRequest, InvalidFieldRequest) as e:
+        return json_response(request, {'error': str(e)}, 400)
+    except Exception as e:
+        logger.error(f"Get asset failed: {str(e)}")
+        return json_response(request, {'error': 'Asset not found', 'details': str(e)}, 404)
+
+
+async def get_user_assets(request):
+    try:
+        cursor = request.query_params.get('cursor')
+        limit = parse_limit(request.query_params.get('limit'))
+        fields = parse_fields(request.query_params.get('fields'), Asset)
+        wallet_address = normalize_address(request.path_params['wallet_address'])
+
+        async with request.app.state.database.session(use_replica(request)) as session:
+            row = (await session.execute(wallet_version_query(wallet_address))).first()
+            validators = wallet_row_validators(row, response_variant(request), query_args(request))
+            cached = not_modified(request, validators)
+            if cached is not None:
+                return cached
+
+            user = (await session.scalars(select(User).where(User.wallet_address == wallet_address))).first()
+            if not user:
+                if wants_ndjson(request):
+                    return with_validators(ndjson_response(no_rows()), validators)
+                return with_validators(render(request, {'assets': [], 'next_cursor': None}), validators)
+
+            holdings, serialize = list_query(Asset, Asset.user_id == user.id, fields)
+            holdings = newest_first(holdings, Asset, cursor)
+
+            if wants_ndjson(request):
+                return with_validators(
+                    ndjson_response(stream_rows(request, holdings, fields, serialize)), validators
+                )
+
+            assets, next_cursor = split_page(await fetch(session, holdings.limit(limit + 1), fields), limit)
+
+        return with_validators(render(request, {
+            'user': user.to_dict(),
+            'assets': [serialize(asset) for asset in assets],
+            'next_cursor': next_cursor
+        }), validators)
+
+    except (InvalidPageRequest, InvalidFieldRequest, InvalidWalletAddress) as e:
+        return json_response(request, {'error': str(e)}, 400)
+    except Exception as e:
+        logger.error(f"Get user assets failed: {str(e)}")
+        return json_response(request, {'error': 'Failed to retrieve assets', 'details': str(e)}, 500)
+
+
+async def no_rows():
+    for row in ():
+        yield row
+
+
+async def get_stats(request):
+    try:
+        cache = stats_cache(request.app.state.flask_app)
+        counters = cache.peek()
+        if counters is None:
+            async with request.app.state.database.session(use_replica(request)) as session:
+                counters = sum_counters((await session.execute(counters_query())).all())
+            cache.put(counters)
+
+        total_assets = counters['total_assets']
+        verified_assets = counters['verified_assets']
+        tokenized_assets = counters['tokenized_assets']
+        return render(request, {
+            'total_assets': total_assets,
+            'total_users': counters['total_users'],
+            'verified_assets': verified_assets,
+            'tokenized_assets': tokenized_assets,
+            'verification_rate': (verified_assets / total_assets * 100) if total_assets > 0 else 0,
+            'tokenization_rate': (tokenized_assets / verified_assets * 100) if verified_assets > 0 else 0
+        })
+
+    except Exception as e:
+        logger.error(f"Stats failed: {str(e)}")
+        return json_response(request, {'error': 'Failed to retrieve stats', 'details': str(e)}, 500)
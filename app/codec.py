@@ -0,0 +1,116 @@
+"""Pluggable JSON codec shared by the JSON text columns and API responses.
+
+orjson is used when it is installed; the standard library ``json`` module is
+the fallback. Select a codec explicitly with the ``JSON_CODEC`` setting.
+"""
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+
+class StdlibCodec:
+    name = 'json'
+
+    def dumps(self, obj: Any, indent: bool = False, sort_keys: bool = False,
+              default: Optional[Callable] = None) -> str:
+        return json.dumps(
+            obj,
+            indent=2 if indent else None,
+            separators=None if indent else (',', ':'),
+            sort_keys=sort_keys,
+            default=default,
+            ensure_ascii=False,
+        )
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._fallback = StdlibCodec()
+
+    def dumps(self, obj: Any, indent: bool = False, sort_keys: bool = False,
+              default: Optional[Callable] = None) -> str:
+        option = self._orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= self._orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= self._orjson.OPT_SORT_KEYS
+        try:
+            return self._orjson.dumps(obj, default=default, option=option).decode('utf-8')
+        except TypeError:
+            # e.g. integers wider than 64 bits, which orjson refuses
+            return self._fallback.dumps(obj, indent=indent, sort_keys=sort_keys, default=default)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+CODECS: Dict[str, Callable] = {
+    'json': StdlibCodec,
+    'orjson': OrjsonCodec,
+}
+
+_codec = None
+
+
+def register_codec(name: str, factory: Callable):
+    """Make a codec available to ``use_codec`` under ``name``."""
+    CODECS[name] = factory
+
+
+def use_codec(name: str = 'auto'):
+    """Switch the process-wide codec. ``auto`` prefers orjson over the stdlib."""
+    global _codec
+
+    if name in (None, '', 'auto'):
+        candidates = ['orjson', 'json']
+    elif name in CODECS:
+        candidates = [name, 'json']
+    else:
+        raise ValueError(f"Unknown JSON codec: {name}")
+
+    for candidate in candidates:
+        try:
+            _codec = CODECS[candidate]()
+            return _codec
+        except ImportError:
+            logger.info(f"JSON codec '{candidate}' unavailable, falling back")
+
+
+def get_codec():
+    return _codec or use_codec()
+
+
+def dumps(obj: Any) -> str:
+    """Encode a value for storage in a JSON text column."""
+    return get_codec().dumps(obj)
+
+
+def loads(data):
+    """Decode a JSON text column, treating NULL and '' as an empty object."""
+    return get_codec().loads(data) if data else {}
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes responses with the active codec."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return get_codec().dumps(
+            obj,
+            indent=bool(kwargs.get('indent')),
+            sort_keys=kwargs.get('sort_keys', self.sort_keys),
+            default=kwargs.get('default', self.default),
+        )
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return get_codec().loads(s)
@@ -3,68 +3,220 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, request, jsonify, render_template
-from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
-import os
-import json
 import logging
 from datetime import datetime
 
-from app.models.database import db, User, Asset, Transaction
+import click
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, render_template, stream_with_context, url_for
+from flask.cli import with_appcontext
+from flask_cors import CORS
+from sqlalchemy.orm import raiseload
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import codec
+from app.agents import get_nlp_agent, get_tokenization_agent, get_verification_agent
+from app.codec import CodecJSONProvider, use_codec
+from app.negotiation import MSGPACK_MIMETYPE, init_compression, msgpack_response, wants_msgpack
+from app.models.database import db, User, Asset, Transaction, VERIFICATION_COLUMNS, verification_summary
+from app.models.pagination import InvalidPageRequest, iter_rows, keyset_page, newest_first, parse_limit, split_page
+from app.models.fields import InvalidFieldRequest, parse_fields, project, serializer
+from app.models.addresses import InvalidWalletAddress, normalize_address, to_checksum_address
+from app.models.archive import read_archived_transactions
+from app.models.audit import configure_audit, init_audit, record_transaction
+from app.models.conditional import asset_validators, not_modified, wallet_validators, with_validators
+from app.models.idempotency import configure_idempotency, init_idempotency
+from app.models.ratelimit import configure_rate_limits, init_rate_limits, load_monitor
+from app.models.search import InvalidSearchRequest, create_search_index, parse_query, search_assets
+from app.models.facets import InvalidAssetQuery, facet_counts, matching_assets, parse_filters
+from app.models.fx import UnknownCurrency, ensure_fx_rates, get_fx_rates, normalize_currency, set_fx_rate
+from app.models.portfolio import portfolio_rows_query, summarize_portfolio
+from app.models.events import (
+    Subscription, configure_events, event_broker, init_events, publish_event, queue_event, stream_events,
+)
+from app.models.jobs import configure_jobs, create_job_table, enqueue, get_job, init_jobs, job_queue_enabled
+from app.models.stats import ensure_stat_counters, get_counters
+from app.models.wallets import get_or_create_user_id
+from app.models.routing import configure_engines, init_read_routing, replica_read
+from app.models.sharding import (
+    ShardUnavailable, configure_shards, each_shard, init_shards, init_sharding, route_asset, route_wallet,
+    sharding_enabled,
+)
+from config import config
 
-from app.agents.nlp_agent import NLPAgent
+logger = logging.getLogger(__name__)
 
-from app.agents.verification_agent import VerificationAgent
-from app.agents.tokenization_agent import TokenizationAgent
+api = Blueprint('api', __name__)
+
+
+def create_app(config_name=None):
+    """Build the app for ``config_name``, a key of ``config.config`` or a settings class.
+
+    The name defaults to ``$FLASK_CONFIG``, then ``$FLASK_ENV``, then
+    ``default``. Nothing here connects to a database or loads the NLP
+    models: tables are created by ``flask --app app.main init-db`` (or
+    ``init_db.py``), and the agents are built on first use. Background
+    threads start on each process's first request, so ``gunicorn --preload``
+    forks before any of them exist.
+    """
+    if config_name is None or isinstance(config_name, str):
+        name = config_name or os.environ.get('FLASK_CONFIG') or os.environ.get('FLASK_ENV') or 'default'
+        settings = config[name]
+    else:
+        settings = config_name
+
+    app = Flask(__name__, template_folder='../templates', static_folder='../static')
+    app.config['SECRET_KEY'] = settings.SECRET_KEY
+    app.config['DEBUG'] = getattr(settings, 'DEBUG', False)
+    app.config['TESTING'] = getattr(settings, 'TESTING', False)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_logging(settings)
+    configure_engines(app, settings)
+    configure_shards(app, settings)
+    configure_audit(app, settings)
+    configure_jobs(app, settings)
+    configure_events(app, settings)
+    configure_idempotency(app, settings)
+    configure_rate_limits(app, settings)
+    app.config['STATS_CACHE_SECONDS'] = settings.STATS_CACHE_SECONDS
+    app.config['FX_CACHE_SECONDS'] = settings.FX_CACHE_SECONDS
+    app.config['WALLET_CACHE_SIZE'] = settings.WALLET_CACHE_SIZE
+    app.config['COMPRESS_RESPONSES'] = settings.COMPRESS_RESPONSES
+    app.config['COMPRESS_MIN_SIZE'] = settings.COMPRESS_MIN_SIZE
+    app.config['ASYNC_EXECUTOR_THREADS'] = settings.ASYNC_EXECUTOR_THREADS
+    use_codec(settings.JSON_CODEC)
+    app.json = CodecJSONProvider(app)
+
+    # Initialize extensions
+    db.init_app(app)
+    init_read_routing(app, db)
+    init_sharding(app, db)
+    init_audit(app)
+    jobs = init_jobs(app, db)
+    jobs.handler('verify')(run_verification)
+    jobs.handler('tokenize')(run_tokenization)
+    jobs.on_finished(publish_job_event)
+    init_events(app)
+    init_compression(app)
+    init_rate_limits(app)
+    init_idempotency(app)
+    CORS(app)
+    if settings.TRUSTED_PROXIES:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.TRUSTED_PROXIES)
+
+    app.register_blueprint(api)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(set_fx_rate_command)
+    return app
+
+
+def configure_logging(settings):
+    """Log to stderr and, when ``LOG_FILE`` is set, to that file; only the first call counts."""
+    handlers = [logging.StreamHandler()]
+    if settings.LOG_FILE:
+        os.makedirs(os.path.dirname(settings.LOG_FILE) or '.', exist_ok=True)
+        handlers.append(logging.FileHandler(settings.LOG_FILE))
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
+def create_schema():
+    """Create any missing tables, on every shard too; existing tables are left alone."""
+    db.create_all()
+    create_job_table()
+    if sharding_enabled():
+        init_shards()
+    with db.engines[None].begin() as connection:
+        ensure_fx_rates(connection)
+    # create_all() skips the search index when the asset table already exists.
+    # Filling it and the portfolio rollups for older databases is migrate_db.py's
+    # job, after it has added the columns they read. The counters only read
+    # columns every release has had, so they are filled here.
+    for shard in each_shard():
+        create_search_index(db.session.connection())
+        ensure_stat_counters(db.session.connection())
+        db.session.commit()
 
-from flask import Flask
 
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database tables."""
+    create_schema()
+    click.echo('Database tables created')
 
-app = Flask(__name__, template_folder='../templates', static_folder='../static')
-app.config['SECRET_KEY'] = 'your-secret-key-change-this'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///rwa_tokenization.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+@click.command('set-fx-rate')
+@click.argument('currency')
+@click.argument('usd_rate', type=float)
+@with_appcontext
+def set_fx_rate_command(currency, usd_rate):
+    """Set how many US dollars one unit of CURRENCY is worth."""
+    set_fx_rate(currency, usd_rate)
+    click.echo(f"{normalize_currency(currency)} = {usd_rate} USD")
 
 
-# Initialize extensions
-db.init_app(app)
-CORS(app)
+NDJSON_MIMETYPE = 'application/x-ndjson'
 
-# Initialize agents
-nlp_agent = NLPAgent()
-verification_agent = VerificationAgent()
-tokenization_agent = TokenizationAgent()
+def wants_ndjson():
+    return (request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == NDJSON_MIMETYPE)
 
-# Configure logging
-os.makedirs('logs', exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+def response_variant():
+    """The representation a list route will send, as part of its ETag."""
+    if wants_ndjson():
+        return NDJSON_MIMETYPE
+    return MSGPACK_MIMETYPE if wants_msgpack() else 'application/json'
 
-# Create tables
-with app.app_context():
-    db.create_all()
+def render(payload, status=200):
+    """Serialize a response payload as MessagePack or JSON, as the client asked."""
+    if wants_msgpack():
+        response = msgpack_response(payload, status)
+    else:
+        response = jsonify(payload)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response
+
+def wants_full_history():
+    return request.args.get('history') == 'full'
+
+def list_rows(query, model, fields):
+    """``query`` and a row serializer, narrowed to ``fields`` when given.
+
+    Full rows refuse lazy relationship loads, so a serializer that starts
+    touching one fails loudly instead of issuing a query per row.
+    """
+    if fields:
+        return project(query, model, fields), serializer(fields)
+    return query.options(raiseload('*')), model.to_dict
+
+def shard_unavailable(error):
+    return jsonify({'error': str(error)}), 503, {'Retry-After': str(max(int(current_app.config['SHARD_MAP_SECONDS']), 1))}
+
+def ndjson_response(rows, serialize=None):
+    """Stream one JSON document per row; rows are consumed lazily."""
+    def generate():
+        for row in rows:
+            yield codec.dumps(serialize(row) if serialize else row) + '\n'
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+EVENT_STREAM_MIMETYPE = 'text/event-stream'
 
 # Simple root route
-@app.route('/')
+@api.route('/')
 def home():
     return render_template('index.html')
 
 # ✅ Basic Health Check for system_test.sh compatibility
-@app.route('/health')
+@api.route('/health')
 def health_check_basic():
     return jsonify(status="ok"), 200
 
 # Detailed Health Check
-@app.route('/api/health')
+@api.route('/api/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
@@ -73,7 +225,7 @@ def health_check():
     })
 
 # Asset Intake Route
-@app.route('/api/intake', methods=['POST'])
+@api.route('/api/intake', methods=['POST'])
 def asset_intake():
     try:
         data = request.get_json()
@@ -82,37 +234,38 @@ def asset_intake():
             return jsonify({'error': 'Missing required fields: user_input, wallet_address'}), 400
 
         user_input = data['user_input']
-        wallet_address = data['wallet_address']
-        logger.info(f"Processing intake for wallet: {wallet_address}")
+        wallet_address = normalize_address(data['wallet_address'])
+        route_wallet(wallet_address, write=True)
+        logger.info(f"Processing intake for wallet: {to_checksum_address(wallet_address)}")
 
-        parsed_data = nlp_agent.parse_user_input(user_input)
+        with load_monitor().track():
+            parsed_data = get_nlp_agent().parse_user_input(user_input)
 
-        user = User.query.filter_by(wallet_address=wallet_address).first()
-        if not user:
-            user = User(
-                wallet_address=wallet_address,
-                email=data.get('email'),
-                jurisdiction=parsed_data.get('location', '').split(',')[-1].strip()[:2]
-            )
-            db.session.add(user)
-            db.session.commit()
+        user_id = get_or_create_user_id(
+            wallet_address,
+            email=data.get('email'),
+            jurisdiction=(parsed_data.get('location') or '').split(',')[-1].strip()[:2]
+        )
 
         asset = Asset(
-            user_id=user.id,
+            user_id=user_id,
             asset_type=parsed_data.get('asset_type', 'unknown'),
             description=parsed_data.get('description', user_input),
             estimated_value=parsed_data.get('estimated_value', 0),
+            currency=parsed_data.get('currency') or 'USD',
             location=parsed_data.get('location', 'Unknown'),
-            requirements=json.dumps({
+            requirements_data={
                 'confidence_score': parsed_data.get('confidence_score', 0),
                 'sentiment': parsed_data.get('sentiment', {}),
                 'entities': parsed_data.get('entities', [])
-            })
+            }
         )
         db.session.add(asset)
+        db.session.flush()
+        queue_event('asset', asset.id, wallet_address, {'asset': asset.to_dict()})
         db.session.commit()
 
-        follow_up_questions = nlp_agent.generate_follow_up_questions(parsed_data)
+        follow_up_questions = get_nlp_agent().generate_follow_up_questions(parsed_data)
 
         return jsonify({
             'success': True,
@@ -126,128 +279,371 @@ def asset_intake():
             ]
         })
 
+    except InvalidWalletAddress as e:
+        return jsonify({'error': str(e)}), 400
+    except ShardUnavailable as e:
+        return shard_unavailable(e)
     except Exception as e:
         logger.error(f"Asset intake failed: {str(e)}")
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
-@app.route('/api/verify/<int:asset_id>', methods=['POST'])
-def verify_asset(asset_id):
-    try:
-        asset = Asset.query.get_or_404(asset_id)
-        logger.info(f"Verifying asset: {asset_id}")
-
-        asset_data = asset.to_dict()
-        verification_result = verification_agent.verify_asset(asset_data)
+def no_progress(step):
+    pass
+
+def run_verification(asset_id, progress=no_progress):
+    """Verify an asset and record the result; return ``(body, status code)``."""
+    route_asset(asset_id, write=True)
+    asset = Asset.query.get_or_404(asset_id)
+    logger.info(f"Verifying asset: {asset_id}")
+
+    progress('verifying')
+    asset_data = asset.to_dict(include_requirements=False)
+    verification_result = get_verification_agent().verify_asset(asset_data)
+
+    progress('saving')
+    asset.verification_status = verification_result['status']
+    asset.updated_at = datetime.utcnow()
+    record_transaction(asset.id, 'verification', verification_result['status'], verification_result)
+    queue_event('verification', asset.id, asset.user.wallet_address, {
+        'asset': asset.to_dict(include_requirements=False),
+        'verification_result': verification_result
+    })
+    db.session.commit()
+
+    return {
+        'success': True,
+        'verification_result': verification_result,
+        'asset': asset.to_dict()
+    }, 200
+
+def run_tokenization(asset_id, progress=no_progress):
+    """Mint a token for a verified asset; return ``(body, status code)``."""
+    route_asset(asset_id, write=True)
+    asset = Asset.query.get_or_404(asset_id)
+
+    if asset.verification_status != 'verified':
+        return {'error': 'Asset must be verified before tokenization'}, 400
+
+    asset_data = asset.to_dict(include_requirements=False)
+
+    # Typed columns only; the full result blob is never loaded or parsed
+    last_verification = Transaction.query.filter_by(
+        asset_id=asset_id,
+        transaction_type='verification'
+    ).order_by(Transaction.created_at.desc()).with_entities(
+        Transaction.status, *(getattr(Transaction, name) for name in VERIFICATION_COLUMNS)
+    ).first()
+
+    # A write-behind verification row may not be flushed yet; the status is enough then
+    verification_result = verification_summary(last_verification) if last_verification else {'status': 'verified'}
+    progress('minting')
+    tokenization_result = get_tokenization_agent().tokenize_asset(asset_data, verification_result)
+
+    if not tokenization_result.get('success'):
+        return tokenization_result, 400
+
+    progress('saving')
+    asset.token_id = tokenization_result['token_id']
+    asset.updated_at = datetime.utcnow()
+    record_transaction(asset.id, 'tokenization', 'completed', tokenization_result,
+                       transaction_hash=tokenization_result['transaction_hash'])
+    queue_event('tokenization', asset.id, asset.user.wallet_address, {
+        'asset': asset.to_dict(include_requirements=False),
+        'tokenization_result': tokenization_result
+    })
+    db.session.commit()
+
+    return {
+        'success': True,
+        'tokenization_result': tokenization_result,
+        'asset': asset.to_dict()
+    }, 200
+
+def publish_job_event(job, status, error):
+    route_asset(job.asset_id)
+    wallet_address = db.session.query(User.wallet_address).join(Asset, Asset.user_id == User.id).filter(
+        Asset.id == job.asset_id
+    ).scalar()
+    publish_event('job', job.asset_id, wallet_address, {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': status,
+        'error': error
+    })
 
-        asset.verification_status = verification_result['status']
-        asset.updated_at = datetime.utcnow()
-        db.session.commit()
+def queue_job(kind, asset_id):
+    """202 with the new job's id, or 404 when the asset does not exist."""
+    route_asset(asset_id)
+    if Asset.query.with_entities(Asset.id).filter_by(id=asset_id).first() is None:
+        return jsonify({'error': 'Asset not found'}), 404
 
-        transaction = Transaction(
-            asset_id=asset.id,
-            transaction_type='verification',
-            status=verification_result['status'],
-            details=json.dumps(verification_result)
-        )
-        db.session.add(transaction)
-        db.session.commit()
+    job_id = enqueue(kind, asset_id)
+    status_url = url_for('api.get_job_status', job_id=job_id)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': status_url
+    }), 202, {'Location': status_url}
 
-        return jsonify({
-            'success': True,
-            'verification_result': verification_result,
-            'asset': asset.to_dict()
-        })
+@api.route('/api/verify/<int:asset_id>', methods=['POST'])
+def verify_asset(asset_id):
+    try:
+        if job_queue_enabled():
+            return queue_job('verify', asset_id)
+        body, status = run_verification(asset_id)
+        return jsonify(body), status
 
+    except ShardUnavailable as e:
+        return shard_unavailable(e)
     except Exception as e:
         logger.error(f"Verification failed: {str(e)}")
         return jsonify({'error': 'Verification failed', 'details': str(e)}), 500
 
-@app.route('/api/tokenize/<int:asset_id>', methods=['POST'])
+@api.route('/api/tokenize/<int:asset_id>', methods=['POST'])
 def tokenize_asset(asset_id):
     try:
-        asset = Asset.query.get_or_404(asset_id)
-
-        if asset.verification_status != 'verified':
-            return jsonify({'error': 'Asset must be verified before tokenization'}), 400
-
-        asset_data = asset.to_dict()
-
-        last_verification = Transaction.query.filter_by(
-            asset_id=asset_id,
-            transaction_type='verification'
-        ).order_by(Transaction.created_at.desc()).first()
-
-        verification_result = json.loads(last_verification.details) if last_verification else {'status': 'verified'}
-        tokenization_result = tokenization_agent.tokenize_asset(asset_data, verification_result)
-
-        if tokenization_result.get('success'):
-            asset.token_id = tokenization_result['token_id']
-            asset.updated_at = datetime.utcnow()
-            db.session.commit()
-
-            transaction = Transaction(
-                asset_id=asset.id,
-                transaction_type='tokenization',
-                transaction_hash=tokenization_result['transaction_hash'],
-                status='completed',
-                details=json.dumps(tokenization_result)
-            )
-            db.session.add(transaction)
-            db.session.commit()
-
-            return jsonify({
-                'success': True,
-                'tokenization_result': tokenization_result,
-                'asset': asset.to_dict()
-            })
-        else:
-            return jsonify(tokenization_result), 400
+        if job_queue_enabled():
+            return queue_job('tokenize', asset_id)
+        body, status = run_tokenization(asset_id)
+        return jsonify(body), status
 
+    except ShardUnavailable as e:
+        return shard_unavailable(e)
     except Exception as e:
         logger.error(f"Tokenization failed: {str(e)}")
         return jsonify({'error': 'Tokenization failed', 'details': str(e)}), 500
 
-@app.route('/api/asset/<int:asset_id>')
+@api.route('/api/events')
+def asset_events():
+    """Server-Sent Events for one wallet (``?wallet=``) and/or asset (``?asset=``)."""
+    asset = request.args.get('asset')
+    try:
+        asset_id = int(asset) if asset else None
+    except ValueError:
+        return jsonify({'error': f"Invalid asset: {asset}"}), 400
+
+    try:
+        wallet = request.args.get('wallet')
+        subscription = Subscription(
+            wallet_address=normalize_address(wallet) if wallet else None,
+            asset_id=asset_id
+        )
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except (InvalidWalletAddress, ValueError) as e:
+        return jsonify({'error': 'Invalid event filter', 'details': str(e)}), 400
+
+    def load_stats():
+        try:
+            return get_counters()
+        finally:
+            # Streams stay open for minutes; don't hold a pooled connection meanwhile
+            db.session.remove()
+
+    stream = stream_events(
+        event_broker(), subscription, last_event_id, load_stats,
+        keepalive=current_app.config['EVENTS_KEEPALIVE_SECONDS'],
+        max_seconds=current_app.config['EVENTS_STREAM_SECONDS']
+    )
+    return Response(stream_with_context(stream), mimetype=EVENT_STREAM_MIMETYPE, headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@api.route('/api/jobs/<int:job_id>')
+def get_job_status(job_id):
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return render(job)
+
+    except Exception as e:
+        logger.error(f"Failed to get job: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve job', 'details': str(e)}), 500
+
+@api.route('/api/asset/<int:asset_id>')
+@replica_read
 def get_asset(asset_id):
     try:
+        route_asset(asset_id)
+        # Decide 304 from the version row alone, before loading the asset
+        validators = asset_validators(asset_id, response_variant())
+        cached = not_modified(validators) if validators is not None else None
+        if cached is not None:
+            return cached
+
         asset = Asset.query.get_or_404(asset_id)
-        transactions = Transaction.query.filter_by(asset_id=asset_id).order_by(Transaction.created_at.desc()).all()
-        return jsonify({
+        cursor = request.args.get('cursor')
+        fields = parse_fields(request.args.get('fields'), Transaction)
+        history, serialize = list_rows(Transaction.query.filter_by(asset_id=asset_id), Transaction, fields)
+
+        def archived():
+            transactions = read_archived_transactions(asset_id)
+            if fields:
+                transactions = [{name: tx.get(name) for name in fields} for tx in transactions]
+            return transactions
+
+        if wants_ndjson():
+            if not wants_full_history():
+                return with_validators(ndjson_response(iter_rows(history, Transaction, cursor), serialize), validators)
+
+            def full_history():
+                for tx in iter_rows(history, Transaction, cursor):
+                    yield serialize(tx)
+                # Archived rows are all older than the live ones
+                yield from archived()
+
+            return with_validators(ndjson_response(full_history()), validators)
+
+        transactions, next_cursor = keyset_page(
+            history, Transaction, parse_limit(request.args.get('limit')), cursor
+        )
+        response = {
             'asset': asset.to_dict(),
-            'transactions': [tx.to_dict() for tx in transactions]
-        })
+            'transactions': [serialize(tx) for tx in transactions],
+            'next_cursor': next_cursor
+        }
+        if wants_full_history() and next_cursor is None:
+            response['archived_transactions'] = archived()
 
+        return with_validators(render(response), validators)
+
+    except (InvalidPageRequest, InvalidFieldRequest) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Get asset failed: {str(e)}")
         return jsonify({'error': 'Asset not found', 'details': str(e)}), 404
 
-@app.route('/api/assets/<wallet_address>')
+@api.route('/api/assets/<wallet_address>')
+@replica_read
 def get_user_assets(wallet_address):
     try:
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'))
+        fields = parse_fields(request.args.get('fields'), Asset)
+
+        wallet_address = normalize_address(wallet_address)
+        route_wallet(wallet_address)
+        validators = wallet_validators(wallet_address, response_variant())
+        cached = not_modified(validators)
+        if cached is not None:
+            return cached
+
         user = User.query.filter_by(wallet_address=wallet_address).first()
         if not user:
-            return jsonify({'assets': []})
+            if wants_ndjson():
+                return with_validators(ndjson_response([]), validators)
+            return with_validators(render({'assets': [], 'next_cursor': None}), validators)
 
-        assets = Asset.query.filter_by(user_id=user.id).order_by(Asset.created_at.desc()).all()
+        holdings, serialize = list_rows(Asset.query.filter_by(user_id=user.id), Asset, fields)
 
-        return jsonify({
+        if wants_ndjson():
+            return with_validators(ndjson_response(iter_rows(holdings, Asset, cursor), serialize), validators)
+
+        assets, next_cursor = keyset_page(holdings, Asset, limit, cursor)
+
+        return with_validators(render({
             'user': user.to_dict(),
-            'assets': [asset.to_dict() for asset in assets]
-        })
+            'assets': [serialize(asset) for asset in assets],
+            'next_cursor': next_cursor
+        }), validators)
 
+    except (InvalidPageRequest, InvalidFieldRequest, InvalidWalletAddress) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Get user assets failed: {str(e)}")
         return jsonify({'error': 'Failed to retrieve assets', 'details': str(e)}), 500
 
-@app.route('/api/stats')
+@api.route('/api/portfolio/<wallet_address>')
+@replica_read
+def get_portfolio(wallet_address):
+    """A wallet's totals from its rollup rows, valued in ``?currency=`` (USD by default)."""
+    try:
+        currency = normalize_currency(request.args.get('currency'))
+        wallet_address = normalize_address(wallet_address)
+        route_wallet(wallet_address)
+
+        rows = db.session.scalars(portfolio_rows_query(wallet_address)).all()
+        return render(dict(
+            summarize_portfolio(rows, currency, get_fx_rates()),
+            wallet_address=to_checksum_address(wallet_address),
+        ))
+
+    except (UnknownCurrency, InvalidWalletAddress) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Get portfolio failed: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve portfolio', 'details': str(e)}), 500
+
+@api.route('/api/assets')
+@replica_read
+def query_assets():
+    """Assets matching the query string filters, newest first; the first page carries facet counts."""
+    try:
+        filters = parse_filters(request.args)
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'))
+        fields = parse_fields(request.args.get('fields'), Asset)
+
+        rows = []
+        for shard in each_shard():
+            matches, serialize = list_rows(matching_assets(filters), Asset, fields)
+            rows.extend(newest_first(matches, Asset, cursor).limit(limit + 1).all())
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+        assets, next_cursor = split_page(rows[:limit + 1], limit)
+
+        payload = {'assets': [serialize(asset) for asset in assets], 'next_cursor': next_cursor}
+        if not cursor:
+            payload.update(facet_counts(filters))
+        return render(payload)
+
+    except (InvalidAssetQuery, InvalidPageRequest, InvalidFieldRequest) as e:
+        return jsonify({'error': str(e)}), 400
+    except ShardUnavailable as e:
+        return shard_unavailable(e)
+    except Exception as e:
+        logger.error(f"Asset query failed: {str(e)}")
+        return jsonify({'error': 'Failed to query assets', 'details': str(e)}), 500
+
+@api.route('/api/search')
+@replica_read
+def search():
+    """Assets matching every term of ``?q=``, most relevant first."""
+    try:
+        terms = parse_query(request.args.get('q'))
+        limit = parse_limit(request.args.get('limit'))
+        matches, next_cursor = search_assets(terms, limit, request.args.get('cursor'))
+
+        return render({
+            'query': ' '.join(terms),
+            'assets': [
+                dict(asset.to_dict(include_requirements=False), relevance=-score)
+                for asset, score in matches
+            ],
+            'next_cursor': next_cursor
+        })
+
+    except (InvalidSearchRequest, InvalidPageRequest) as e:
+        return jsonify({'error': str(e)}), 400
+    except ShardUnavailable as e:
+        return shard_unavailable(e)
+    except Exception as e:
+        logger.error(f"Search failed: {str(e)}")
+        return jsonify({'error': 'Search failed', 'details': str(e)}), 500
+
+@api.route('/api/stats')
+@replica_read
 def get_stats():
     try:
-        total_assets = Asset.query.count()
-        total_users = User.query.count()
-        verified_assets = Asset.query.filter_by(verification_status='verified').count()
-        tokenized_assets = Asset.query.filter(Asset.token_id.isnot(None)).count()
+        counters = get_counters()
+        total_assets = counters['total_assets']
+        total_users = counters['total_users']
+        verified_assets = counters['verified_assets']
+        tokenized_assets = counters['tokenized_assets']
 
-        return jsonify({
+        return render({
             'total_assets': total_assets,
             'total_users': total_users,
             'verified_assets': verified_assets,
@@ -261,4 +657,7 @@ def get_stats():
         return jsonify({'error': 'Failed to retrieve stats', 'details': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app = create_app()
+    with app.app_context():
+        create_schema()
+    app.run(debug=app.config.get('DEBUG', False), host='0.0.0.0', port=5000)
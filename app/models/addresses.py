@@ -0,0 +1,129 @@
+"""Wallet addresses: 20 raw bytes in the database, EIP-55 hex at the edges.
+
+Addresses arrive as ``0x``-prefixed hex in any letter case. They are
+normalized to bytes before they reach a query, so two casings of one
+address are the same key, and the unique index holds 20 bytes per user
+instead of 42 characters. ``to_checksum_address`` turns them back into
+mixed-case checksummed hex for responses.
+"""
+import re
+from functools import lru_cache
+from typing import Union
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    from Crypto.Hash import keccak as _pycryptodome_keccak
+except ImportError:  # pragma: no cover - optional speedup
+    _pycryptodome_keccak = None
+
+ADDRESS_BYTES = 20
+_HEX_ADDRESS = re.compile(r'0x[0-9a-fA-F]{40}')
+
+
+class InvalidWalletAddress(ValueError):
+    pass
+
+
+def normalize_address(value: Union[str, bytes, memoryview]) -> bytes:
+    """The 20-byte form of a hex or binary address; raises InvalidWalletAddress."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+        if len(raw) != ADDRESS_BYTES:
+            raise InvalidWalletAddress(f"Wallet address must be {ADDRESS_BYTES} bytes")
+        return raw
+
+    text = value.strip() if isinstance(value, str) else ''
+    if not _HEX_ADDRESS.fullmatch(text):
+        raise InvalidWalletAddress(f"Invalid wallet address: {value!r}")
+    return bytes.fromhex(text[2:])
+
+
+# Keccak-256 (the pre-standard SHA-3 padding Ethereum uses; hashlib.sha3_256
+# pads differently and gives other digests)
+_MASK = (1 << 64) - 1
+_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+_RATE = 136
+
+
+def _rotl(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & _MASK
+
+
+def _keccak_f(lanes):
+    for round_constant in _ROUND_CONSTANTS:
+        parity = [lanes[x] ^ lanes[x + 5] ^ lanes[x + 10] ^ lanes[x + 15] ^ lanes[x + 20] for x in range(5)]
+        for x in range(5):
+            d = parity[(x - 1) % 5] ^ _rotl(parity[(x + 1) % 5], 1)
+            for y in range(0, 25, 5):
+                lanes[x + y] ^= d
+
+        moved = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                moved[y + 5 * ((2 * x + 3 * y) % 5)] = _rotl(lanes[x + 5 * y], _ROTATIONS[x][y])
+
+        for y in range(0, 25, 5):
+            for x in range(5):
+                lanes[x + y] = moved[x + y] ^ (~moved[(x + 1) % 5 + y] & moved[(x + 2) % 5 + y])
+        lanes[0] ^= round_constant
+
+
+def keccak256(data: bytes) -> bytes:
+    if _pycryptodome_keccak is not None:
+        return _pycryptodome_keccak.new(digest_bits=256, data=data).digest()
+
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b'\x00' * (-len(padded) % _RATE))
+    padded[-1] |= 0x80
+
+    lanes = [0] * 25
+    for start in range(0, len(padded), _RATE):
+        for i in range(_RATE // 8):
+            lanes[i] ^= int.from_bytes(padded[start + 8 * i:start + 8 * i + 8], 'little')
+        _keccak_f(lanes)
+
+    return b''.join(lane.to_bytes(8, 'little') for lane in lanes[:4])
+
+
+@lru_cache(maxsize=4096)
+def _checksum(raw: bytes) -> str:
+    hex_address = raw.hex()
+    digest = keccak256(hex_address.encode('ascii')).hex()
+    return '0x' + ''.join(
+        char.upper() if int(digest[i], 16) >= 8 else char
+        for i, char in enumerate(hex_address)
+    )
+
+
+def to_checksum_address(value: Union[str, bytes, memoryview]) -> str:
+    """EIP-55 mixed-case hex for an address in any accepted form."""
+    return _checksum(normalize_address(value))
+
+
+class WalletAddress(TypeDecorator):
+    """Stores addresses as 20-byte binary; binds accept hex or bytes."""
+    impl = LargeBinary(ADDRESS_BYTES)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else normalize_address(value)
+
+    def process_result_value(self, value, dialect):
+        # psycopg2 returns bytea as memoryview
+        return None if value is None else bytes(value)
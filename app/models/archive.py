@@ -0,0 +1,177 @@
+"""Cold storage for old Transaction rows.
+
+Transactions older than a cutoff are moved, one calendar month at a time,
+into gzip-compressed NDJSON segment files. Inside a segment each asset's
+rows form their own gzip member. The per-segment index (ArchiveSegmentEntry)
+records the byte range of each member, so reading one asset's history
+decompresses only that asset's rows.
+"""
+import gzip
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, select
+
+from app import codec
+from app.models.database import db, Transaction, ArchiveSegment, ArchiveSegmentEntry
+
+DEFAULT_ARCHIVE_DIR = 'archive'
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+READ_BATCH_SIZE = 1000
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(moment: datetime) -> datetime:
+    return (_month_start(moment) + timedelta(days=32)).replace(day=1)
+
+
+def _write_segment(rows, path: str) -> Dict:
+    """Write ``rows`` (sorted by asset) to ``path``; return the segment summary."""
+    entries = []
+    row_count = 0
+    min_created_at = max_created_at = None
+    max_id = 0
+
+    current_asset, lines = None, []
+
+    def flush_member(out):
+        data = gzip.compress(''.join(lines).encode('utf-8'))
+        entries.append({
+            'asset_id': current_asset,
+            'byte_offset': out.tell(),
+            'byte_length': len(data),
+            'row_count': len(lines),
+        })
+        out.write(data)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as out:
+        for tx in rows:
+            if tx.asset_id != current_asset:
+                if lines:
+                    flush_member(out)
+                current_asset, lines = tx.asset_id, []
+
+            lines.append(codec.dumps(tx.to_dict()) + '\n')
+            row_count += 1
+            max_id = max(max_id, tx.id)
+            min_created_at = tx.created_at if min_created_at is None else min(min_created_at, tx.created_at)
+            max_created_at = tx.created_at if max_created_at is None else max(max_created_at, tx.created_at)
+
+        if lines:
+            flush_member(out)
+
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(tmp_path, path)
+
+    return {
+        'entries': entries,
+        'row_count': row_count,
+        'min_created_at': min_created_at,
+        'max_created_at': max_created_at,
+        'max_id': max_id,
+    }
+
+
+def archive_month(month: datetime, cutoff: datetime, archive_dir: str) -> Optional[ArchiveSegment]:
+    """Move one month's transactions older than ``cutoff`` into a new segment.
+
+    The segment file is fsynced before the catalog rows are committed and the
+    live rows deleted, so a crash leaves at worst an unreferenced file behind.
+    """
+    start = _month_start(month)
+    end = min(_next_month(month), cutoff)
+    in_range = and_(Transaction.created_at >= start, Transaction.created_at < end)
+
+    period = start.strftime('%Y-%m')
+    directory = os.path.join(archive_dir, 'transactions', period)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.ndjson.gz")
+
+    rows = (
+        Transaction.query
+        .filter(in_range)
+        .order_by(Transaction.asset_id, Transaction.created_at, Transaction.id)
+        .yield_per(READ_BATCH_SIZE)
+    )
+    summary = _write_segment(rows, path)
+
+    if not summary['row_count']:
+        os.remove(path)
+        return None
+
+    segment = ArchiveSegment(
+        period=period,
+        path=path,
+        row_count=summary['row_count'],
+        min_created_at=summary['min_created_at'],
+        max_created_at=summary['max_created_at'],
+    )
+    db.session.add(segment)
+    db.session.flush()
+
+    db.session.execute(
+        ArchiveSegmentEntry.__table__.insert(),
+        [dict(entry, segment_id=segment.id) for entry in summary['entries']],
+    )
+    db.session.execute(
+        delete(Transaction)
+        .where(in_range, Transaction.id <= summary['max_id'])
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return segment
+
+
+def archive_transactions(older_than_days: int = DEFAULT_ARCHIVE_AFTER_DAYS,
+                         archive_dir: str = DEFAULT_ARCHIVE_DIR,
+                         now: Optional[datetime] = None) -> List[ArchiveSegment]:
+    """Archive every transaction older than ``older_than_days``, month by month."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+
+    oldest = db.session.scalar(
+        select(func.min(Transaction.created_at)).where(Transaction.created_at < cutoff)
+    )
+    segments = []
+    month = oldest
+    while month is not None and _month_start(month) < cutoff:
+        segment = archive_month(month, cutoff, archive_dir)
+        if segment is not None:
+            segments.append(segment)
+        month = _next_month(month)
+
+    return segments
+
+
+def archive_entries_query(asset_id: int):
+    return (
+        select(ArchiveSegment.path, ArchiveSegmentEntry.byte_offset, ArchiveSegmentEntry.byte_length)
+        .join(ArchiveSegment, ArchiveSegment.id == ArchiveSegmentEntry.segment_id)
+        .where(ArchiveSegmentEntry.asset_id == asset_id)
+    )
+
+
+def read_archived_transactions(asset_id: int) -> List[Dict]:
+    """All archived transactions for an asset, newest first, as ``to_dict()`` shapes."""
+    return read_archive_entries(db.session.execute(archive_entries_query(asset_id)).all())
+
+
+def read_archive_entries(entries) -> List[Dict]:
+    """Read ``(path, byte_offset, byte_length)`` members from segment files, newest first."""
+    transactions = []
+    for path, byte_offset, byte_length in entries:
+        with open(path, 'rb') as segment:
+            segment.seek(byte_offset)
+            member = gzip.decompress(segment.read(byte_length))
+        transactions.extend(codec.loads(line) for line in member.decode('utf-8').splitlines() if line)
+
+    transactions.sort(key=lambda tx: (tx['created_at'], tx['id']), reverse=True)
+    return transactions
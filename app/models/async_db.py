@@ -0,0 +1,58 @@
+"""Async SQLAlchemy engines and sessions for the ASGI app (``app.asgi``).
+
+They point at the same databases as the Flask app's engines: the primary,
+the read replica and the job database when those are configured. Each URL
+is switched to its dialect's async driver, aiosqlite for SQLite and asyncpg
+for PostgreSQL.
+"""
+from typing import Optional
+
+from sqlalchemy.engine import URL, make_url
+
+from app.models.jobs import JOBS_BIND_KEY
+from app.models.routing import REPLICA_BIND_KEY
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_uri(uri: str) -> URL:
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for database URL: {url.drivername}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    """One async engine per database of ``app``; imports the asyncio extension lazily."""
+
+    def __init__(self, app):
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        config = app.config
+        options = config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        binds = config.get('SQLALCHEMY_BINDS') or {}
+
+        def engine(uri):
+            return create_async_engine(async_database_uri(uri), **options)
+
+        self.primary = engine(config['SQLALCHEMY_DATABASE_URI'])
+        self.replica = engine(binds[REPLICA_BIND_KEY]) if REPLICA_BIND_KEY in binds else None
+        self.jobs = engine(binds[JOBS_BIND_KEY]) if JOBS_BIND_KEY in binds else self.primary
+        # Rows are serialized after the session closes; nothing should expire under them
+        self._sessions = async_sessionmaker(expire_on_commit=False)
+
+    def session(self, replica: bool = False):
+        """A new ``AsyncSession`` on the replica when asked and configured, else the primary."""
+        engine = self.replica if replica and self.replica is not None else self.primary
+        return self._sessions(bind=engine)
+
+    def jobs_session(self):
+        return self._sessions(bind=self.jobs)
+
+    async def dispose(self):
+        for engine in {self.primary, self.replica, self.jobs} - {None}:
+            await engine.dispose()
@@ -0,0 +1,407 @@
+"""Write-behind buffering for verification and tokenization audit rows.
+
+``AUDIT_WRITE_MODE`` picks how ``record_transaction`` writes a row:
+
+* ``sync`` (default): in the request's own transaction, next to the Asset
+  update it records.
+* ``memory``: queued once the request commits, then bulk inserted by a
+  background thread every ``AUDIT_FLUSH_SECONDS`` or ``AUDIT_FLUSH_ROWS``
+  rows, whichever comes first. Rows still queued when the process dies are
+  lost.
+* ``journal``: as ``memory``, but each row is first appended to a local
+  journal file under ``AUDIT_JOURNAL_DIR``. Journals left behind by a dead
+  process are replayed by the next worker to start. Needs ``fcntl`` file
+  locks, so not on Windows.
+
+Each batch gets its id when its first row is queued. A flush commits a
+marker row for the batch in the same transaction as its rows, so retrying
+a batch, or replaying a journal, that was already inserted never
+duplicates a row.
+
+Buffered rows show up in transaction history after the next flush. With
+sharding on, keep the rebalancer's settle time above the flush interval so
+no row is flushed to a shard its asset just left.
+"""
+import atexit
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, select
+
+from app import codec
+from app.models.database import db, AuditFlush, RoutingSession, Transaction, verification_columns
+from app.models.routing import SHARD_KEY
+from app.models.sharding import next_row_id, shard_engine
+
+SYNC = 'sync'
+MEMORY = 'memory'
+JOURNAL = 'journal'
+MODES = (SYNC, MEMORY, JOURNAL)
+
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_SECONDS = 1.0
+# Markers only have to outlive the oldest journal that could still be replayed
+MARKER_RETENTION = timedelta(days=7)
+PENDING_KEY = 'audit_pending'
+
+logger = logging.getLogger(__name__)
+
+
+def configure_audit(app, settings):
+    mode = settings.AUDIT_WRITE_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown AUDIT_WRITE_MODE: {mode}")
+    app.config['AUDIT_WRITE_MODE'] = mode
+    app.config['AUDIT_JOURNAL_DIR'] = settings.AUDIT_JOURNAL_DIR
+    app.config['AUDIT_FLUSH_ROWS'] = settings.AUDIT_FLUSH_ROWS
+    app.config['AUDIT_FLUSH_SECONDS'] = settings.AUDIT_FLUSH_SECONDS
+
+
+def init_audit(app):
+    """Create the app's buffer when a buffered mode is configured.
+
+    The flush thread starts on the first request of each process rather
+    than here, so a preloading server does not lose it when it forks.
+    """
+    mode = app.config.get('AUDIT_WRITE_MODE', SYNC)
+    if mode == SYNC:
+        return None
+
+    buffer = AuditBuffer(
+        app, mode,
+        journal_dir=app.config.get('AUDIT_JOURNAL_DIR'),
+        flush_rows=app.config.get('AUDIT_FLUSH_ROWS', DEFAULT_FLUSH_ROWS),
+        flush_seconds=app.config.get('AUDIT_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS),
+    )
+    app.extensions['audit_buffer'] = buffer
+    app.before_request(buffer.start)
+    return buffer
+
+
+def audit_buffer() -> Optional['AuditBuffer']:
+    return current_app.extensions.get('audit_buffer')
+
+
+def record_transaction(asset_id: int, transaction_type: str, status: str, details: Dict,
+                       transaction_hash: Optional[str] = None):
+    """Record an audit row for the change the current session is about to commit.
+
+    Unbuffered, the row joins the session. Buffered, it is handed to the
+    buffer only once the session commits, and dropped if it rolls back.
+    """
+    if audit_buffer() is None:
+        db.session.add(Transaction(
+            asset_id=asset_id,
+            transaction_type=transaction_type,
+            transaction_hash=transaction_hash,
+            status=status,
+            details_data=details,
+        ))
+        return
+
+    row = {
+        'asset_id': asset_id,
+        'transaction_type': transaction_type,
+        'transaction_hash': transaction_hash,
+        'status': status,
+        'details': codec.dumps(details),
+        'created_at': datetime.utcnow(),
+        **verification_columns(details),
+    }
+    row_id = next_row_id(Transaction)
+    if row_id is not None:
+        row['id'] = row_id
+    row['shard'] = db.session.info.get(SHARD_KEY)
+    db.session.info.setdefault(PENDING_KEY, []).append(row)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _queue_committed_rows(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending and has_app_context():
+        audit_buffer().extend(pending)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_rows(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+# Journal files -------------------------------------------------------------
+#
+# owner-<owner>.lock              held with flock for as long as its process lives
+# active-<owner>-<batch>.ndjson   being appended to by a live process
+# claimed-<owner>-<batch>.ndjson  being flushed by that process
+# sealed-<batch>.ndjson           waiting for any process to flush it
+#
+# <owner> is a random id per process rather than its pid, which a process
+# started after a restart could be given again.
+
+def _encode(row: Dict) -> str:
+    return codec.dumps(dict(row, created_at=row['created_at'].isoformat())) + '\n'
+
+
+def _decode(line: str) -> Dict:
+    row = codec.loads(line)
+    row['created_at'] = datetime.fromisoformat(row['created_at'])
+    return row
+
+
+def _fcntl():
+    """The module journal mode locks owner files with; None where it does not exist (Windows)."""
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    return fcntl
+
+
+def _lock(fd: int, blocking: bool = True) -> bool:
+    """Take an exclusive flock on ``fd``; False when not blocking and another process holds it."""
+    fcntl = _fcntl()
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class AuditBuffer:
+    """Queued audit rows for one process, flushed in bulk by a daemon thread."""
+
+    def __init__(self, app, mode: str, journal_dir: Optional[str] = None,
+                 flush_rows: int = DEFAULT_FLUSH_ROWS, flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        if mode not in (MEMORY, JOURNAL):
+            raise ValueError(f"AuditBuffer mode must be {MEMORY} or {JOURNAL}")
+        if mode == JOURNAL and not journal_dir:
+            raise ValueError("Journal mode needs AUDIT_JOURNAL_DIR")
+        if mode == JOURNAL and _fcntl() is None:
+            raise ValueError("Journal mode needs fcntl file locks, which this platform lacks; use memory mode")
+
+        self.app = app
+        self.mode = mode
+        self.journal_dir = journal_dir
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._rows: List[Dict] = []
+        self._batch = None
+        self._retry: List[Tuple[str, List[Dict]]] = []
+        self._journal = None
+        self._owner = None
+        self._owner_lock = None
+        self._owner_pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flushing = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self):
+        return len(self._rows) + sum(len(rows) for _, rows in self._retry)
+
+    # Queueing ---------------------------------------------------------------
+
+    def extend(self, rows: List[Dict]):
+        with self._lock:
+            if self._batch is None:
+                self._batch = uuid.uuid4().hex
+            if self.mode == JOURNAL:
+                self._append(rows)
+            self._rows.extend(rows)
+            if len(self._rows) >= self.flush_rows:
+                self._wake.notify()
+
+    def _append(self, rows: List[Dict]):
+        if self._journal is None:
+            self._journal = open(self._path(f"active-{self._owner_id()}-{self._batch}"), 'a', encoding='utf-8')
+        self._journal.write(''.join(_encode(row) for row in rows))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.journal_dir, f"{name}.ndjson")
+
+    def _lock_path(self, owner: str) -> str:
+        return os.path.join(self.journal_dir, f"owner-{owner}.lock")
+
+    def _owner_id(self) -> str:
+        """This process's journal owner id, taking its lock file on first use."""
+        if self._owner_pid == os.getpid():
+            return self._owner
+        if self._owner_lock is not None:
+            # Forked: closing the inherited handle leaves the parent's lock in place
+            os.close(self._owner_lock)
+        os.makedirs(self.journal_dir, exist_ok=True)
+        owner = uuid.uuid4().hex
+        # Locked before it appears under its real name, so a lock file that
+        # anyone can take belongs to a process that has died
+        staging = os.path.join(self.journal_dir, f"staging-{owner}.lock")
+        fd = os.open(staging, os.O_RDWR | os.O_CREAT, 0o644)
+        _lock(fd)
+        os.replace(staging, self._lock_path(owner))
+        self._owner, self._owner_lock, self._owner_pid = owner, fd, os.getpid()
+        return owner
+
+    # Flushing ---------------------------------------------------------------
+
+    def start(self):
+        """Start this process's flush thread, recovering orphaned journals first."""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked: the parent's queue and journal handle belong to the parent
+                self._rows, self._batch, self._retry, self._journal = [], None, [], None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-flush', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                self.recover()
+                self.flush()
+            except Exception as e:
+                logger.error(f"Audit flush failed, will retry: {str(e)}")
+            with self._lock:
+                if len(self._rows) < self.flush_rows:
+                    self._wake.wait(self.flush_seconds)
+
+    def flush(self) -> int:
+        """Insert everything queued so far; return the number of rows written."""
+        with self._flushing:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                batch, self._batch = self._batch, None
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+                    owner = self._owner_id()
+                    claimed = self._path(f"claimed-{owner}-{batch}")
+                    os.replace(self._path(f"active-{owner}-{batch}"), claimed)
+                retry, self._retry = self._retry, []
+
+            if self.mode == MEMORY:
+                return self._flush_batches(retry + [(batch, rows)] if rows else retry)
+            if not rows:
+                return 0
+
+            try:
+                self._insert(batch, rows)
+            except Exception:
+                os.replace(claimed, self._path(f"sealed-{batch}"))
+                raise
+            os.remove(claimed)
+            return len(rows)
+
+    def _flush_batches(self, batches: List[Tuple[str, List[Dict]]]) -> int:
+        """Insert queued batches in order; the failed one and those after it are kept for the next flush."""
+        written = 0
+        for index, (batch, rows) in enumerate(batches):
+            try:
+                self._insert(batch, rows)
+            except Exception:
+                with self._lock:
+                    self._retry[:0] = batches[index:]
+                raise
+            written += len(rows)
+        return written
+
+    def recover(self) -> int:
+        """Flush journals no live process owns; return the number of rows replayed."""
+        if self.mode != JOURNAL or not os.path.isdir(self.journal_dir):
+            return 0
+
+        with self._lock:
+            current = self._owner_id()
+        orphans = {}
+        for name in os.listdir(self.journal_dir):
+            if not name.endswith('.ndjson'):
+                continue
+            state, _, rest = name[:-len('.ndjson')].partition('-')
+            owner, _, batch = rest.partition('-')
+            if state in ('active', 'claimed') and owner != current:
+                orphans.setdefault(owner, []).append((name[:-len('.ndjson')], batch))
+        for owner, journals in orphans.items():
+            self._seal_if_dead(owner, journals)
+
+        replayed = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not (name.startswith('sealed-') and name.endswith('.ndjson')):
+                continue
+            batch = name[len('sealed-'):-len('.ndjson')]
+            claimed = self._path(f"claimed-{current}-{batch}")
+            try:
+                # Renaming claims the file; another worker may win the race
+                os.replace(self._path(f"sealed-{batch}"), claimed)
+            except FileNotFoundError:
+                continue
+
+            try:
+                with open(claimed, encoding='utf-8') as journal:
+                    rows = [_decode(line) for line in journal if line.strip()]
+                self._insert(batch, rows)
+            except Exception:
+                os.replace(claimed, self._path(f"sealed-{batch}"))
+                raise
+            os.remove(claimed)
+            replayed += len(rows)
+            logger.info(f"Replayed {len(rows)} audit rows from journal {batch}")
+        return replayed
+
+    def _seal_if_dead(self, owner: str, journals: List[Tuple[str, str]]):
+        """Seal ``owner``'s journals unless its process still holds its lock file."""
+        lock_path = self._lock_path(owner)
+        try:
+            fd = os.open(lock_path, os.O_RDWR)
+        except FileNotFoundError:
+            # Removed by whoever recovered its journals first
+            fd = None
+        try:
+            if fd is not None and not _lock(fd, blocking=False):
+                return
+            for name, batch in journals:
+                try:
+                    os.replace(self._path(name), self._path(f"sealed-{batch}"))
+                except FileNotFoundError:
+                    continue
+            if fd is not None:
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _insert(self, batch: str, rows: List[Dict]):
+        """Bulk insert ``rows`` shard by shard, once per batch and shard."""
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(row.get('shard'), []).append(
+                {key: value for key, value in row.items() if key != 'shard'}
+            )
+
+        with self.app.app_context():
+            for shard, shard_rows in by_shard.items():
+                engine = db.engines[None] if shard is None else shard_engine(shard)
+                marker = batch if shard is None else f"{batch}:{shard}"
+                with engine.begin() as connection:
+                    done = connection.execute(
+                        select(AuditFlush.batch_id).where(AuditFlush.batch_id == marker)
+                    ).first()
+                    if done:
+                        continue
+                    connection.execute(Transaction.__table__.insert(), shard_rows)
+                    connection.execute(AuditFlush.__table__.insert().values(batch_id=marker))
+                    connection.execute(delete(AuditFlush).where(
+                        AuditFlush.created_at < datetime.utcnow() - MARKER_RETENTION
+                    ))
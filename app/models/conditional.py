@@ -0,0 +1,119 @@
+"""Conditional GET support for asset resources.
+
+Each resource has a cheap version query: one indexed lookup that returns
+what its ETag and ``Last-Modified`` are built from, without loading or
+serializing anything. A route asks for its validators first and answers
+``304 Not Modified`` when the client already holds the current body.
+
+ETags are strong and also cover the query string and response format, since
+every variant of a URL is a different body.
+"""
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from flask import Response, request
+from sqlalchemy import func, select
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+from app.models.database import db, User, Asset, Transaction
+from app.negotiation import content_codings
+
+# (etag, last_modified)
+Validators = Tuple[str, Optional[datetime]]
+
+
+def make_etag(*parts, args=None) -> str:
+    """A strong ETag over ``parts`` and the query string, the request's unless ``args`` pairs are given."""
+    query = sorted(request.args.items(multi=True) if args is None else args)
+    return hashlib.sha1(repr((parts, query)).encode()).hexdigest()[:32]
+
+
+def asset_version_query(asset_id: int):
+    history = select(Transaction.id).where(Transaction.asset_id == asset_id)
+    return (
+        select(
+            Asset.version,
+            Asset.updated_at,
+            history.with_only_columns(func.count()).scalar_subquery(),
+            history.with_only_columns(func.max(Transaction.created_at)).scalar_subquery(),
+        )
+        .where(Asset.id == asset_id)
+    )
+
+
+def asset_row_validators(row, asset_id: int, variant: str, args=None) -> Optional[Validators]:
+    if row is None:
+        return None
+    version, updated_at, transactions, last_transaction = row
+    last_modified = max(filter(None, (updated_at, last_transaction)), default=None)
+    return make_etag('asset', asset_id, version or 1, transactions, variant, args=args), last_modified
+
+
+def asset_validators(asset_id: int, variant: str) -> Optional[Validators]:
+    """Validators for an asset and its transaction history, or None if it does not exist."""
+    row = db.session.execute(asset_version_query(asset_id)).first()
+    return asset_row_validators(row, asset_id, variant)
+
+
+def wallet_version_query(wallet_address: bytes):
+    return (
+        select(User.id, func.count(Asset.id), func.sum(func.coalesce(Asset.version, 1)), func.max(Asset.updated_at))
+        .outerjoin(Asset, Asset.user_id == User.id)
+        .where(User.wallet_address == wallet_address)
+        .group_by(User.id)
+    )
+
+
+def wallet_row_validators(row, variant: str, args=None) -> Validators:
+    if row is None:
+        return make_etag('wallet', None, variant, args=args), None
+    user_id, assets, versions, last_modified = row
+    # Versions only grow, so their sum changes whenever any asset does
+    return make_etag('wallet', user_id, assets, versions or 0, variant, args=args), last_modified
+
+
+def wallet_validators(wallet_address: bytes, variant: str) -> Validators:
+    """Validators for a wallet's asset list; a wallet with no user still gets one."""
+    row = db.session.execute(wallet_version_query(wallet_address)).first()
+    return wallet_row_validators(row, variant)
+
+
+def matched_etag(validators: Validators, environ=None) -> Optional[str]:
+    """The ETag the request's preconditions hold, or None when it needs the body.
+
+    A compressed copy carries the ETag with its coding appended, so a client
+    holding that copy is answered with that ETag. ``environ`` defaults to the
+    request's; only its ``HTTP_IF_*`` keys are read.
+    """
+    etag, last_modified = validators
+    environ = request.environ if environ is None else environ
+    for tag in (etag, *(f"{etag}-{coding}" for coding in content_codings())):
+        if not is_resource_modified(environ, etag=tag, last_modified=last_modified):
+            return tag
+    return None
+
+
+def not_modified(validators: Validators) -> Optional[Response]:
+    """A 304 response if the request's preconditions match ``validators``."""
+    tag = matched_etag(validators)
+    if tag is None:
+        return None
+    response = with_validators(Response(status=304), (tag, validators[1]))
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def validator_headers(validators: Validators) -> Dict[str, str]:
+    etag, last_modified = validators
+    headers = {'ETag': quote_etag(etag)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    # Let browsers keep the body but revalidate on every poll
+    headers['Cache-Control'] = 'private, no-cache'
+    return headers
+
+
+def with_validators(response: Response, validators: Validators) -> Response:
+    response.headers.update(validator_headers(validators))
+    return response
@@ -1,21 +1,31 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import json
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
 
-db = SQLAlchemy()
+from app import codec
+from app.models.addresses import WalletAddress, to_checksum_address
+from app.models.routing import RoutingSession, bucket_for
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def _wallet_bucket(context):
+    return bucket_for(context.get_current_parameters()['wallet_address'])
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    wallet_address = db.Column(db.String(42), unique=True, nullable=False)
+    wallet_address = db.Column(WalletAddress, unique=True, nullable=False)  # 20 raw bytes
+    # Shard bucket of the wallet, so moving a bucket selects its users by index
+    bucket = db.Column(db.Integer, nullable=True, index=True, default=_wallet_bucket)
     email = db.Column(db.String(120), nullable=True)
     kyc_status = db.Column(db.String(20), default='pending')
-    jurisdiction = db.Column(db.String(10), nullable=True)
+    jurisdiction = db.Column(db.String(10), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
             'id': self.id,
-            'wallet_address': self.wallet_address,
+            'wallet_address': to_checksum_address(self.wallet_address),
             'email': self.email,
             'kyc_status': self.kyc_status,
             'jurisdiction': self.jurisdiction,
@@ -25,32 +35,64 @@ class User(db.Model):
 class Asset(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    asset_type = db.Column(db.String(50), nullable=False)
+    # active_history keeps the previous value for the stat counter and portfolio rollup deltas
+    asset_type = db.column_property(db.Column(db.String(50), nullable=False), active_history=True)
     description = db.Column(db.Text, nullable=False)
-    estimated_value = db.Column(db.Float, nullable=False)
+    estimated_value = db.column_property(db.Column(db.Float, nullable=False), active_history=True)
+    # ISO 4217 code of estimated_value; NULL on rows from before it existed, i.e. USD
+    currency = db.column_property(db.Column(db.String(3), nullable=True, default='USD'), active_history=True)
     location = db.Column(db.String(200), nullable=False)
-    verification_status = db.Column(db.String(20), default='pending')
-    token_id = db.Column(db.String(100), nullable=True)
+    verification_status = db.column_property(db.Column(db.String(20), default='pending'), active_history=True)
+    token_id = db.column_property(db.Column(db.String(100), nullable=True), active_history=True)
     requirements = db.Column(db.Text, nullable=True)  # JSON string
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped on every ORM update; with the transaction count it makes the ETag
+    version = db.Column(db.Integer, nullable=True, default=1)
     
     user = db.relationship('User', backref=db.backref('assets', lazy=True))
+
+    @property
+    def requirements_data(self):
+        """Decoded ``requirements``; only parsed when something reads it."""
+        return codec.loads(self.requirements)
+
+    @requirements_data.setter
+    def requirements_data(self, value):
+        self.requirements = codec.dumps(value)
+
+    __table_args__ = (
+        # get_user_assets: assets for a wallet, newest first, keyset paged
+        db.Index('ix_asset_user_created', 'user_id', 'created_at', 'id'),
+        # /api/assets filters: equality filters first, then newest-first keyset order
+        db.Index('ix_asset_status_created', 'verification_status', 'created_at', 'id'),
+        db.Index('ix_asset_type_status_created', 'asset_type', 'verification_status', 'created_at', 'id'),
+        db.Index('ix_asset_created', 'created_at', 'id'),
+        # Tokenized assets only; most rows never get a token_id
+        db.Index(
+            'ix_asset_tokenized', 'token_id',
+            sqlite_where=db.text('token_id IS NOT NULL'),
+            postgresql_where=db.text('token_id IS NOT NULL'),
+        ),
+    )
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_requirements=True):
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'asset_type': self.asset_type,
             'description': self.description,
             'estimated_value': self.estimated_value,
+            'currency': self.currency or 'USD',
             'location': self.location,
             'verification_status': self.verification_status,
             'token_id': self.token_id,
-            'requirements': json.loads(self.requirements) if self.requirements else {},
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+        if include_requirements:
+            data['requirements'] = self.requirements_data
+        return data
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -59,17 +101,305 @@ class Transaction(db.Model):
     transaction_hash = db.Column(db.String(100), nullable=True)
     status = db.Column(db.String(20), default='pending')
     details = db.Column(db.Text, nullable=True)  # JSON string
+    # Typed copies of the verification result in ``details``; NULL on other rows
+    verification_score = db.Column(db.Float, nullable=True)
+    basic_info_score = db.Column(db.Float, nullable=True)
+    value_assessment_score = db.Column(db.Float, nullable=True)
+    compliance_score = db.Column(db.Float, nullable=True)
+    asset_specific_score = db.Column(db.Float, nullable=True)
+    ruleset_version = db.Column(db.String(20), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     asset = db.relationship('Asset', backref=db.backref('transactions', lazy=True))
+
+    @property
+    def details_data(self):
+        """Decoded ``details``; only parsed when something reads it."""
+        return codec.loads(self.details)
+
+    @details_data.setter
+    def details_data(self, value):
+        self.details = codec.dumps(value)
+        for name, column_value in verification_columns(value).items():
+            setattr(self, name, column_value)
+
+    __table_args__ = (
+        # get_asset: transaction history for an asset, newest first, keyset paged
+        db.Index('ix_transaction_asset_created', 'asset_id', 'created_at', 'id'),
+        # tokenize_asset: latest verification for an asset
+        db.Index(
+            'ix_transaction_asset_type_created',
+            asset_id, transaction_type, created_at.desc(),
+        ),
+        # Archival: transactions older than the cutoff
+        db.Index('ix_transaction_created', 'created_at'),
+        # Analytics over verification results; other rows stay out of these
+        *(
+            db.Index(
+                f'ix_transaction_{name}', name,
+                sqlite_where=db.text(f'{name} IS NOT NULL'),
+                postgresql_where=db.text(f'{name} IS NOT NULL'),
+            )
+            for name in ('verification_score', 'basic_info_score', 'value_assessment_score',
+                         'compliance_score', 'asset_specific_score')
+        ),
+        db.Index(
+            'ix_transaction_ruleset_status', 'ruleset_version', 'status',
+            sqlite_where=db.text('ruleset_version IS NOT NULL'),
+            postgresql_where=db.text('ruleset_version IS NOT NULL'),
+        ),
+    )
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_details=True):
+        data = {
             'id': self.id,
             'asset_id': self.asset_id,
             'transaction_type': self.transaction_type,
             'transaction_hash': self.transaction_hash,
             'status': self.status,
-            'details': json.loads(self.details) if self.details else {},
             'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+        if include_details:
+            data['details'] = self.details_data
+        return data
+
+class ArchiveSegment(db.Model):
+    """A compressed NDJSON file holding one month of archived transactions."""
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(7), nullable=False, index=True)  # YYYY-MM
+    path = db.Column(db.String(500), nullable=False, unique=True)
+    row_count = db.Column(db.Integer, nullable=False)
+    min_created_at = db.Column(db.DateTime, nullable=False)
+    max_created_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    entries = db.relationship('ArchiveSegmentEntry', backref='segment', lazy=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'period': self.period,
+            'path': self.path,
+            'row_count': self.row_count,
+            'min_created_at': self.min_created_at.isoformat(),
+            'max_created_at': self.max_created_at.isoformat(),
+            'created_at': self.created_at.isoformat()
+        }
+
+class ArchiveSegmentEntry(db.Model):
+    """Per-segment index: where one asset's transactions sit inside the file."""
+    segment_id = db.Column(db.Integer, db.ForeignKey('archive_segment.id'), primary_key=True)
+    asset_id = db.Column(db.Integer, primary_key=True)
+    byte_offset = db.Column(db.BigInteger, nullable=False)  # start of the asset's gzip member
+    byte_length = db.Column(db.Integer, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_archive_segment_entry_asset', 'asset_id'),
+    )
+
+class StatCounter(db.Model):
+    """Running totals behind /api/stats, kept in step with the rows they count."""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    NAMES = ('total_assets', 'total_users', 'verified_assets', 'tokenized_assets')
+
+
+class PortfolioRollup(db.Model):
+    """Per-wallet totals behind /api/portfolio, one row per asset type and currency."""
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    asset_type = db.Column(db.String(50), primary_key=True)
+    currency = db.Column(db.String(3), primary_key=True)
+    asset_count = db.Column(db.BigInteger, nullable=False, default=0)
+    total_value = db.Column(db.Float, nullable=False, default=0.0)
+    verified_count = db.Column(db.BigInteger, nullable=False, default=0)
+    verified_value = db.Column(db.Float, nullable=False, default=0.0)
+    tokenized_count = db.Column(db.BigInteger, nullable=False, default=0)
+    tokenized_value = db.Column(db.Float, nullable=False, default=0.0)
+
+    METRICS = ('asset_count', 'total_value', 'verified_count', 'verified_value', 'tokenized_count', 'tokenized_value')
+
+class FxRate(db.Model):
+    """US dollars per unit of a currency. Lives on the control database."""
+    currency = db.Column(db.String(3), primary_key=True)
+    usd_rate = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ShardBucket(db.Model):
+    """Which shard holds a wallet bucket. Lives on the control database."""
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    shard = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.String(10), nullable=False, default='active')  # active, moving
+
+class IdBlock(db.Model):
+    """Next unreserved id per sharded table. Lives on the control database."""
+    name = db.Column(db.String(50), primary_key=True)
+    next_id = db.Column(db.BigInteger, nullable=False)
+
+class AuditFlush(db.Model):
+    """Marks a write-behind audit batch as inserted, so a journal replay skips it."""
+    batch_id = db.Column(db.String(64), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class Job(db.Model):
+    """A queued verify or tokenize request. Lives on the control (or job) database."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # verify, tokenize
+    asset_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    progress = db.Column(db.String(100), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(32), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON string
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Workers: next runnable job
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        # Workers: jobs for one asset run in order
+        db.Index('ix_job_asset_status', 'asset_id', 'status', 'id'),
+    )
+
+class AssetEvent(db.Model):
+    """Outbox feeding every worker's event stream. Lives on the control database."""
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(20), nullable=False)  # asset, verification, tokenization, job
+    asset_id = db.Column(db.Integer, nullable=True)
+    wallet_address = db.Column(WalletAddress, nullable=True)
+    data = db.Column(db.Text, nullable=True)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class IdempotencyKey(db.Model):
+    """First response to a POST sent with an ``Idempotency-Key``. Lives on the control database."""
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # method, path and body
+    # NULL while the first request is still running
+    status_code = db.Column(db.Integer, nullable=True)
+    headers = db.Column(db.Text, nullable=True)  # JSON string
+    body = db.Column(db.LargeBinary, nullable=True)
+    locked_by = db.Column(db.String(64), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+# Verification result breakdown key -> Transaction column
+BREAKDOWN_COLUMNS = {
+    'basic_info': 'basic_info_score',
+    'value_assessment': 'value_assessment_score',
+    'compliance': 'compliance_score',
+    'asset_specific': 'asset_specific_score',
+}
+VERIFICATION_COLUMNS = ('verification_score', *BREAKDOWN_COLUMNS.values(), 'ruleset_version')
+
+
+def verification_columns(result):
+    """Typed column values for a verification result; all None for anything else."""
+    columns = dict.fromkeys(VERIFICATION_COLUMNS)
+    if not isinstance(result, dict) or 'overall_score' not in result:
+        return columns
+
+    breakdown = result.get('breakdown') or {}
+    columns['verification_score'] = result['overall_score']
+    for key, name in BREAKDOWN_COLUMNS.items():
+        columns[name] = breakdown.get(key)
+    columns['ruleset_version'] = result.get('ruleset_version')
+    return columns
+
+
+def verification_summary(row):
+    """The hot fields of a verification result, rebuilt from the typed columns."""
+    return {
+        'status': row.status,
+        'overall_score': row.verification_score,
+        'breakdown': {key: getattr(row, name) for key, name in BREAKDOWN_COLUMNS.items()},
+        'ruleset_version': row.ruleset_version,
+    }
+
+
+def dialect_insert(bind, table):
+    """INSERT construct with ON CONFLICT support for the bind's dialect."""
+    if bind.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def bump_stat_counters(connection, deltas):
+    """Atomically add ``deltas`` ({name: delta}) to the stat counters."""
+    table = StatCounter.__table__
+    stmt = dialect_insert(connection, table).values(
+        [{'name': name, 'value': delta} for name, delta in sorted(deltas.items())]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={'value': table.c.value + stmt.excluded.value},
+    )
+    connection.execute(stmt)
+
+
+def previous_value(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _stat_deltas(session):
+    deltas = {}
+
+    def add(name, delta):
+        if delta:
+            deltas[name] = deltas.get(name, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            add('total_users', 1)
+        elif isinstance(obj, Asset):
+            add('total_assets', 1)
+            add('verified_assets', int(obj.verification_status == 'verified'))
+            add('tokenized_assets', int(obj.token_id is not None))
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            add('total_users', -1)
+        elif isinstance(obj, Asset):
+            add('total_assets', -1)
+            add('verified_assets', -int(previous_value(obj, 'verification_status') == 'verified'))
+            add('tokenized_assets', -int(previous_value(obj, 'token_id') is not None))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Asset) or not session.is_modified(obj):
+            continue
+        was_verified = previous_value(obj, 'verification_status') == 'verified'
+        was_tokenized = previous_value(obj, 'token_id') is not None
+        add('verified_assets', int(obj.verification_status == 'verified') - int(was_verified))
+        add('tokenized_assets', int(obj.token_id is not None) - int(was_tokenized))
+
+    return {name: delta for name, delta in deltas.items() if delta}
+
+
+@event.listens_for(Asset, 'before_update')
+def _bump_asset_version(mapper, connection, target):
+    if object_session(target).is_modified(target, include_collections=False):
+        # Rows from before the column existed are NULL, i.e. version 1
+        target.version = (target.version or 1) + 1
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _maintain_stat_counters(session, flush_context):
+    """Update the counters in the same transaction as the rows they count."""
+    deltas = _stat_deltas(session)
+    if deltas:
+        bump_stat_counters(session.connection(), deltas)
+        session.info['stats_changed'] = True
@@ -0,0 +1,381 @@
+"""Asset status events, pushed to clients as Server-Sent Events.
+
+Writes queue events on the session; once it commits they go to the
+``asset_event`` outbox table on the control database. Each process runs one
+relay thread that tails the outbox and publishes new rows to an in-process
+broker, which fans them out to that process's open streams and keeps the
+last ``EVENTS_REPLAY_SIZE`` in memory for clients reconnecting with
+``Last-Event-ID``. Outbox ids are the event ids, so a client can reconnect
+to any worker. ``EVENTS_RELAY=local`` skips the outbox and publishes
+straight to the broker, which only suits a single server process.
+
+An event that commits after one with a higher id still reaches open
+streams, but a client that reconnects with that higher id does not get it
+again.
+
+Stats are not events of their own: any event tells a stream to send fresh
+counters, at most one ``stats`` message per wake-up.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, or_, select
+
+from app import codec
+from app.models.addresses import normalize_address, to_checksum_address
+from app.models.database import db, AssetEvent, RoutingSession
+from app.models.stats import invalidate_counters
+
+DATABASE = 'database'
+LOCAL = 'local'
+
+DEFAULT_REPLAY_SIZE = 1000
+DEFAULT_POLL_SECONDS = 0.5
+DEFAULT_KEEPALIVE_SECONDS = 15
+DEFAULT_STREAM_SECONDS = 300
+SUBSCRIBER_BACKLOG = 256
+RELAY_BATCH_SIZE = 500
+# Outbox ids are taken at insert but become visible at commit, so a lower id
+# can show up after a higher one. Missing ids are re-read for this long
+# before they are taken for rolled back inserts.
+OUTBOX_GAP_SECONDS = 30.0
+MAX_OUTBOX_GAPS = 1000
+OUTBOX_RETENTION_SECONDS = 3600
+PENDING_KEY = 'events_pending'
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    __slots__ = ('id', 'type', 'asset_id', 'wallet_address', 'data')
+
+    def __init__(self, id: int, type: str, asset_id: Optional[int] = None,
+                 wallet_address: Optional[bytes] = None, data: Optional[Dict] = None):
+        self.id = id
+        self.type = type
+        self.asset_id = asset_id
+        self.wallet_address = wallet_address
+        self.data = data
+
+
+def format_event(event_type: str, data, event_id: Optional[int] = None) -> str:
+    """One SSE message."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {codec.dumps(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """One open stream: the events matching its filters, plus a stats flag."""
+
+    def __init__(self, wallet_address: Optional[bytes] = None, asset_id: Optional[int] = None):
+        self.wallet_address = wallet_address
+        self.asset_id = asset_id
+        self.overflowed = False
+        self._events: List[Event] = []
+        self._stats_changed = False
+        self._cond = threading.Condition()
+
+    def matches(self, event: Event) -> bool:
+        if self.wallet_address is not None and event.wallet_address != self.wallet_address:
+            return False
+        if self.asset_id is not None and event.asset_id != self.asset_id:
+            return False
+        return True
+
+    def offer(self, event: Event):
+        with self._cond:
+            if self.matches(event):
+                if len(self._events) >= SUBSCRIBER_BACKLOG:
+                    # A client this far behind resyncs from the API instead
+                    self.overflowed = True
+                else:
+                    self._events.append(event)
+            self._stats_changed = True
+            self._cond.notify()
+
+    def wait(self, timeout: float) -> Tuple[List[Event], bool]:
+        """Events and whether stats changed since the last call; blocks up to ``timeout``."""
+        with self._cond:
+            if not self._events and not self._stats_changed and not self.overflowed:
+                self._cond.wait(timeout)
+            events, self._events = self._events, []
+            stats_changed, self._stats_changed = self._stats_changed, False
+        return events, stats_changed
+
+
+class EventBroker:
+    """Fans events out to this process's subscriptions and keeps a replay buffer."""
+
+    def __init__(self, replay_size: int = DEFAULT_REPLAY_SIZE):
+        self._replay = deque(maxlen=replay_size)
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._last_id = 0
+        # Events up to this id can no longer be replayed
+        self._forgotten_id = 0
+
+    def start_at(self, event_id: int):
+        """Treat everything up to ``event_id`` as already gone."""
+        with self._lock:
+            self._last_id = self._forgotten_id = max(self._last_id, event_id)
+
+    def publish(self, event: Event):
+        with self._lock:
+            self._remember(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def emit(self, event_type: str, asset_id: Optional[int] = None, wallet_address: Optional[bytes] = None,
+             data: Optional[Dict] = None) -> Event:
+        """Publish a new event numbered by this broker (no outbox)."""
+        with self._lock:
+            event = Event(self._last_id + 1, event_type, asset_id, wallet_address, data)
+            self._remember(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(event)
+        return event
+
+    def _remember(self, event: Event):
+        if len(self._replay) == self._replay.maxlen:
+            self._forgotten_id = self._replay[0].id
+        self._replay.append(event)
+        self._last_id = max(self._last_id, event.id)
+
+    def subscribe(self, subscription: Subscription, last_event_id: Optional[int] = None) -> Optional[List[Event]]:
+        """Register ``subscription``; return the events it missed since ``last_event_id``.
+
+        Returns None when some of them have already left the replay buffer,
+        i.e. the client has to reload its state.
+        """
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if last_event_id is None or last_event_id >= self._last_id:
+                return []
+            if last_event_id < self._forgotten_id:
+                return None
+            return [event for event in self._replay if event.id > last_event_id and subscription.matches(event)]
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+def configure_events(app, settings):
+    relay = settings.EVENTS_RELAY
+    if relay not in (DATABASE, LOCAL):
+        raise ValueError(f"Unknown EVENTS_RELAY: {relay}")
+    app.config['EVENTS_RELAY'] = relay
+    app.config['EVENTS_REPLAY_SIZE'] = settings.EVENTS_REPLAY_SIZE
+    app.config['EVENTS_POLL_SECONDS'] = settings.EVENTS_POLL_SECONDS
+    app.config['EVENTS_KEEPALIVE_SECONDS'] = settings.EVENTS_KEEPALIVE_SECONDS
+    app.config['EVENTS_STREAM_SECONDS'] = settings.EVENTS_STREAM_SECONDS
+
+
+def init_events(app):
+    """Create the app's broker; the outbox relay starts on each process's first request."""
+    broker = EventBroker(app.config.get('EVENTS_REPLAY_SIZE', DEFAULT_REPLAY_SIZE))
+    app.extensions['events'] = broker
+    if app.config.get('EVENTS_RELAY', DATABASE) == DATABASE:
+        relay = OutboxRelay(app, broker)
+        app.extensions['events_relay'] = relay
+        app.before_request(relay.start)
+    return broker
+
+
+def event_broker() -> Optional[EventBroker]:
+    return current_app.extensions.get('events')
+
+
+# Publishing ------------------------------------------------------------------
+
+def queue_event(event_type: str, asset_id: Optional[int] = None,
+                wallet_address: Union[str, bytes, None] = None, data: Optional[Dict] = None):
+    """Publish an event once the current session commits; dropped on rollback."""
+    if event_broker() is None:
+        return
+    wallet_address = normalize_address(wallet_address) if wallet_address is not None else None
+    db.session.info.setdefault(PENDING_KEY, []).append((event_type, asset_id, wallet_address, data))
+
+
+def publish_event(event_type: str, asset_id: Optional[int] = None,
+                  wallet_address: Union[str, bytes, None] = None, data: Optional[Dict] = None):
+    """Publish an event now, for changes made outside the session."""
+    if event_broker() is None:
+        return
+    wallet_address = normalize_address(wallet_address) if wallet_address is not None else None
+    _publish([(event_type, asset_id, wallet_address, data)])
+
+
+def _publish(pending: List[Tuple]):
+    if current_app.config.get('EVENTS_RELAY', DATABASE) == LOCAL:
+        broker = event_broker()
+        for event_type, asset_id, wallet_address, data in pending:
+            broker.emit(event_type, asset_id, wallet_address, data)
+        return
+
+    with db.engines[None].begin() as connection:
+        connection.execute(insert(AssetEvent.__table__), [
+            {'event_type': event_type, 'asset_id': asset_id, 'wallet_address': wallet_address,
+             'data': codec.dumps(data) if data is not None else None}
+            for event_type, asset_id, wallet_address, data in pending
+        ])
+    relay = current_app.extensions.get('events_relay')
+    if relay is not None:
+        relay.notify()
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _publish_committed_events(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending and has_app_context():
+        try:
+            _publish(pending)
+        except Exception as e:
+            # The change itself is committed; a lost notification only delays clients
+            logger.error(f"Publishing {len(pending)} events failed: {str(e)}")
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_events(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+# Outbox relay --------------------------------------------------------------------
+
+class OutboxRelay:
+    """Tails the outbox table into the process's broker from a daemon thread."""
+
+    def __init__(self, app, broker: EventBroker):
+        self.app = app
+        self.broker = broker
+        self._wake = threading.Condition()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_id = None
+        # Skipped ids below _last_id that may still commit, with when to give up on them
+        self._gaps: Dict[int, float] = {}
+        self._pruned_at = 0.0
+
+    def notify(self):
+        with self._wake:
+            self._wake.notify()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='event-relay', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        poll = self.app.config.get('EVENTS_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        while True:
+            try:
+                with self.app.app_context():
+                    if self.poll() >= RELAY_BATCH_SIZE:
+                        continue
+            except Exception as e:
+                logger.error(f"Event relay failed, will retry: {str(e)}")
+            with self._wake:
+                self._wake.wait(poll)
+
+    def poll(self) -> int:
+        """Publish outbox rows written since the last poll; return how many."""
+        table = AssetEvent.__table__
+        with db.engines[None].connect() as connection:
+            if self._last_id is None:
+                # Streams start from now; older events are history, not news
+                self._last_id = connection.execute(select(func.max(table.c.id))).scalar() or 0
+                self.broker.start_at(self._last_id)
+                return 0
+
+            now = time.monotonic()
+            self._gaps = {gap: deadline for gap, deadline in self._gaps.items() if deadline > now}
+            condition = table.c.id > self._last_id
+            if self._gaps:
+                condition = or_(condition, table.c.id.in_(sorted(self._gaps)))
+            rows = connection.execute(
+                select(table).where(condition).order_by(table.c.id).limit(RELAY_BATCH_SIZE)
+            ).all()
+
+        if rows:
+            # Counters changed somewhere; let this worker's streams read fresh ones
+            invalidate_counters()
+        for row in rows:
+            self.broker.publish(Event(
+                row.id, row.event_type, row.asset_id, row.wallet_address,
+                codec.loads(row.data) if row.data else None,
+            ))
+            if self._gaps.pop(row.id, None) is None and row.id > self._last_id:
+                self._track_gaps(row.id, now)
+                self._last_id = row.id
+
+        if time.monotonic() - self._pruned_at > 60:
+            self.prune()
+        return len(rows)
+
+    def _track_gaps(self, next_id: int, now: float):
+        """Remember the ids between the last one seen and ``next_id`` as possibly still uncommitted."""
+        # A bigger jump is the sequence skipping ahead, not that many open transactions
+        for gap in range(max(self._last_id + 1, next_id - MAX_OUTBOX_GAPS), next_id):
+            self._gaps[gap] = now + OUTBOX_GAP_SECONDS
+        if len(self._gaps) > MAX_OUTBOX_GAPS:
+            self._gaps = dict(sorted(self._gaps.items())[-MAX_OUTBOX_GAPS:])
+
+    def prune(self):
+        self._pruned_at = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(seconds=OUTBOX_RETENTION_SECONDS)
+        with db.engines[None].begin() as connection:
+            connection.execute(delete(AssetEvent.__table__).where(AssetEvent.created_at < cutoff))
+
+
+# Streaming -------------------------------------------------------------------------
+
+def stream_events(broker: EventBroker, subscription: Subscription, last_event_id: Optional[int],
+                  stats_loader, keepalive: float = DEFAULT_KEEPALIVE_SECONDS,
+                  max_seconds: float = DEFAULT_STREAM_SECONDS) -> Iterator[str]:
+    """SSE messages for ``subscription`` until ``max_seconds`` pass or the client lags too far.
+
+    Browsers reconnect on their own, sending the last id they saw.
+    """
+    backlog = broker.subscribe(subscription, last_event_id)
+    try:
+        yield 'retry: 3000\n\n'
+        if backlog is None:
+            yield format_event('reset', {'reason': 'Missed events are no longer buffered'})
+            backlog = []
+        for item in backlog:
+            yield _message(item)
+
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline and not subscription.overflowed:
+            events, stats_changed = subscription.wait(min(keepalive, max(deadline - time.monotonic(), 0)))
+            for item in events:
+                yield _message(item)
+            if stats_changed:
+                yield format_event('stats', stats_loader())
+            if not events and not stats_changed:
+                yield ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _message(item: Event) -> str:
+    data = dict(item.data or {}, asset_id=item.asset_id)
+    if item.wallet_address is not None:
+        data['wallet_address'] = to_checksum_address(item.wallet_address)
+    return format_event(item.type, data, item.id)
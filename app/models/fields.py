@@ -0,0 +1,66 @@
+"""Sparse fieldsets for list endpoints: ``?fields=id,asset_type,token_id``.
+
+Only the requested columns are selected, so long text and JSON columns a
+client did not ask for are never read from the database, decoded or sent.
+Rows come back as plain tuples rather than ORM objects, which also skips
+identity-map bookkeeping for large pages.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app import codec
+
+JSON_FIELDS = {'requirements', 'details'}
+# What ``to_dict()`` shows for these columns when they are NULL
+NULL_DEFAULTS = {'currency': 'USD'}
+# Keyset pagination needs these on every row, requested or not
+KEYSET_FIELDS = ('created_at', 'id')
+
+
+class InvalidFieldRequest(ValueError):
+    pass
+
+
+def field_names(model) -> List[str]:
+    return [column.name for column in model.__table__.columns]
+
+
+def parse_fields(value: Optional[str], model) -> Optional[List[str]]:
+    """Requested field names in order, or None when the full document is wanted."""
+    if value in (None, ''):
+        return None
+
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in field_names(model)]
+    if unknown or not names:
+        raise InvalidFieldRequest(f"Unknown fields: {', '.join(unknown) or value}")
+    return names
+
+
+def columns(model, fields: List[str]) -> List:
+    """The columns for ``fields`` plus the keyset columns."""
+    return [getattr(model, name) for name in dict.fromkeys([*fields, *KEYSET_FIELDS])]
+
+
+def project(query, model, fields: List[str]):
+    """Narrow ``query`` to ``fields`` plus the keyset columns."""
+    return query.with_entities(*columns(model, fields))
+
+
+def serialize(row, fields: List[str]) -> Dict:
+    """The ``to_dict()`` shape of ``row`` restricted to ``fields``."""
+    data = {}
+    for name in fields:
+        value = getattr(row, name)
+        if value is None and name in NULL_DEFAULTS:
+            value = NULL_DEFAULTS[name]
+        elif name in JSON_FIELDS:
+            value = codec.loads(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        data[name] = value
+    return data
+
+
+def serializer(fields: List[str]) -> Callable:
+    return lambda row: serialize(row, fields)
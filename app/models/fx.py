@@ -0,0 +1,104 @@
+"""Exchange rates for valuing holdings in one currency.
+
+Rates live in the ``fx_rate`` table on the control database as US dollars
+per unit of each currency, so no request ever calls out to a rate
+provider. ``create_schema()`` fills in ``DEFAULT_FX_RATES`` for currencies
+the table lacks; operators refresh them with ``flask set-fx-rate``. Each
+worker reads the whole table at most once every ``FX_CACHE_SECONDS``.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.models.database import db, FxRate, dialect_insert
+
+BASE_CURRENCY = 'USD'
+DEFAULT_CACHE_SECONDS = 300.0
+# Starting points only; refresh them from a real source in production
+DEFAULT_FX_RATES = {
+    'USD': 1.0,
+    'INR': 0.012,
+    'EUR': 1.08,
+    'GBP': 1.27,
+    'CAD': 0.73,
+    'SGD': 0.74,
+    'AED': 0.2723,
+}
+
+
+class UnknownCurrency(ValueError):
+    pass
+
+
+def normalize_currency(value: Optional[str]) -> str:
+    """An upper-case currency code; missing means the base currency."""
+    if value in (None, ''):
+        return BASE_CURRENCY
+    code = value.strip().upper()
+    if len(code) != 3 or not code.isalpha():
+        raise UnknownCurrency(f"Invalid currency: {value}")
+    return code
+
+
+def ensure_fx_rates(connection):
+    """Insert the default rate of every currency the table does not have yet."""
+    table = FxRate.__table__
+    connection.execute(
+        dialect_insert(connection, table)
+        .values([{'currency': code, 'usd_rate': rate} for code, rate in sorted(DEFAULT_FX_RATES.items())])
+        .on_conflict_do_nothing(index_elements=[table.c.currency])
+    )
+
+
+def set_fx_rate(currency: str, usd_rate: float):
+    """Store a rate on the control database; this worker's cache sees it at once."""
+    if usd_rate <= 0:
+        raise ValueError(f"Invalid rate for {currency}: {usd_rate}")
+    table = FxRate.__table__
+    with db.engines[None].begin() as connection:
+        stmt = dialect_insert(connection, table).values(currency=normalize_currency(currency), usd_rate=usd_rate)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.currency],
+            set_={'usd_rate': stmt.excluded.usd_rate, 'updated_at': datetime.utcnow()},
+        ))
+    _cache().invalidate()
+
+
+def load_fx_rates() -> Dict[str, float]:
+    # Always the control database, whichever shard the request is on
+    with db.engines[None].connect() as connection:
+        return dict(connection.execute(select(FxRate.currency, FxRate.usd_rate)).all())
+
+
+def fx_cache(app):
+    from app.models.stats import StatsCache  # stats imports sharding, which imports this module
+
+    caches = app.extensions.setdefault('stats_cache', {})
+    ttl = app.config.get('FX_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+    return caches.setdefault('fx_rates', StatsCache(ttl))
+
+
+def _cache():
+    return fx_cache(current_app)
+
+
+def get_fx_rates() -> Dict[str, float]:
+    return _cache().get(load_fx_rates)
+
+
+def converter(target: str, rates: Dict[str, float]):
+    """A function turning ``(amount, currency)`` into ``target`` units."""
+    if target not in rates:
+        raise UnknownCurrency(f"No exchange rate for {target}")
+    target_rate = rates[target]
+
+    def convert(amount: float, currency: str) -> float:
+        if currency == target:
+            return amount
+        if currency not in rates:
+            raise UnknownCurrency(f"No exchange rate for {currency}")
+        return amount * rates[currency] / target_rate
+
+    return convert
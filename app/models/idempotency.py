@@ -0,0 +1,251 @@
+"""``Idempotency-Key`` support for every POST route.
+
+The first request carrying a key claims it in the ``idempotency_key`` table
+on the control database, so every worker sees the claim. When it finishes,
+its response is stored under the key. A retry with the same key and the
+same request gets the stored response back with ``Idempotent-Replayed:
+true``, and the route does not run again. A duplicate that arrives while
+the first request is still running waits for it and then replays its
+response. It gets a 409 if the wait runs past ``IDEMPOTENCY_WAIT_SECONDS``.
+
+Server errors are not stored, so a retry after a 5xx runs the route again.
+Keys expire after ``IDEMPOTENCY_TTL_SECONDS``. The oldest are dropped
+beyond ``IDEMPOTENCY_MAX_KEYS``. A claim whose worker died is taken over
+once ``IDEMPOTENCY_LEASE_SECONDS`` pass.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from flask import Response, g, jsonify, request
+from sqlalchemy import delete, select, update
+
+from app import codec
+from app.models.database import db, IdempotencyKey, dialect_insert
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Everything else is recomputed on replay (CORS, compression, Vary)
+STORED_HEADERS = ('Content-Type', 'Location')
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_KEYS = 100000
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_WAIT_SECONDS = 30
+POLL_SECONDS = 0.1
+PRUNE_SECONDS = 60
+
+CLAIMED = 'claimed'
+STORED = 'stored'
+BUSY = 'busy'
+MISMATCH = 'mismatch'
+
+logger = logging.getLogger(__name__)
+
+
+def configure_idempotency(app, settings):
+    app.config['IDEMPOTENCY_TTL_SECONDS'] = settings.IDEMPOTENCY_TTL_SECONDS
+    app.config['IDEMPOTENCY_MAX_KEYS'] = settings.IDEMPOTENCY_MAX_KEYS
+    app.config['IDEMPOTENCY_LEASE_SECONDS'] = settings.IDEMPOTENCY_LEASE_SECONDS
+    app.config['IDEMPOTENCY_WAIT_SECONDS'] = settings.IDEMPOTENCY_WAIT_SECONDS
+
+
+def init_idempotency(app):
+    """Handle ``Idempotency-Key`` on all of the app's POST routes.
+
+    Call after any ``after_request`` hook that rewrites bodies (compression),
+    so the stored response is the one the route produced.
+    """
+    store = IdempotencyStore(app)
+    app.extensions['idempotency'] = store
+    app.before_request(store.before_request)
+    app.after_request(store.after_request)
+    app.teardown_request(store.teardown_request)
+    return store
+
+
+def request_fingerprint() -> str:
+    """What a retry must repeat exactly to reuse a key."""
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.query_string.decode('latin-1')):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+class IdempotencyStore:
+    """Claims keys for requests, stores their responses and replays them."""
+
+    def __init__(self, app):
+        self.app = app
+        # Keys claimed by this process, so local duplicates wait on an event instead of polling
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+
+    @property
+    def ttl(self) -> timedelta:
+        return timedelta(seconds=self.app.config.get('IDEMPOTENCY_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+
+    # Request hooks ----------------------------------------------------------------
+
+    def before_request(self):
+        if request.method != 'POST' or HEADER not in request.headers:
+            return None
+        key = request.headers[HEADER]
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            return jsonify({'error': f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"}), 400
+
+        fingerprint = request_fingerprint()
+        deadline = time.monotonic() + self.app.config.get('IDEMPOTENCY_WAIT_SECONDS', DEFAULT_WAIT_SECONDS)
+        while True:
+            outcome, value = self.claim(key, fingerprint)
+            if outcome == CLAIMED:
+                with self._lock:
+                    self._in_flight[key] = threading.Event()
+                g.idempotency_claim = (key, value)
+                return None
+            if outcome == STORED:
+                return self.replay(value)
+            if outcome == MISMATCH:
+                return jsonify({'error': f"{HEADER} was already used for a different request"}), 422
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return jsonify({'error': f"A request with this {HEADER} is still in progress"}), 409, {
+                    'Retry-After': '1'
+                }
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                in_flight.wait(remaining)
+            else:
+                time.sleep(min(POLL_SECONDS, remaining))
+
+    def after_request(self, response: Response) -> Response:
+        claim = g.pop('idempotency_claim', None)
+        if claim is None:
+            return response
+        key, token = claim
+        try:
+            if response.status_code >= 500 or response.is_streamed:
+                self.release(key, token)
+            else:
+                self.store(key, token, response)
+        except Exception as e:
+            # The response itself is fine; only its replay is lost
+            logger.error(f"Failed to store idempotent response for {key}: {str(e)}")
+        finally:
+            self._finish(key)
+        return response
+
+    def teardown_request(self, error=None):
+        # after_request never ran, e.g. an unhandled exception
+        claim = g.pop('idempotency_claim', None)
+        if claim is None:
+            return
+        key, token = claim
+        try:
+            self.release(key, token)
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {key}: {str(e)}")
+        finally:
+            self._finish(key)
+
+    def _finish(self, key: str):
+        with self._lock:
+            in_flight = self._in_flight.pop(key, None)
+        if in_flight is not None:
+            in_flight.set()
+
+    # Store ------------------------------------------------------------------------
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[str, object]:
+        """Try to claim ``key``; return (CLAIMED, token), (STORED, row), (BUSY, None) or (MISMATCH, None)."""
+        table = IdempotencyKey.__table__
+        now = _now()
+        token = uuid.uuid4().hex
+        lease = timedelta(seconds=self.app.config.get('IDEMPOTENCY_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+
+        with db.engines[None].begin() as connection:
+            row = connection.execute(select(table).where(table.c.key == key)).first()
+            if row is not None and row.created_at < now - self.ttl:
+                connection.execute(delete(table).where(table.c.key == key, table.c.created_at == row.created_at))
+                row = None
+
+            if row is None:
+                inserted = connection.execute(
+                    dialect_insert(connection, table).values(
+                        key=key, fingerprint=fingerprint, locked_by=token, locked_until=now + lease, created_at=now,
+                    ).on_conflict_do_nothing(index_elements=[table.c.key])
+                ).rowcount
+                if inserted:
+                    return CLAIMED, token
+                row = connection.execute(select(table).where(table.c.key == key)).first()
+                if row is None:
+                    return BUSY, None
+
+            if row.fingerprint != fingerprint:
+                return MISMATCH, None
+            if row.status_code is not None:
+                return STORED, row
+            if row.locked_until is not None and row.locked_until < now:
+                # The worker holding the claim died; take it over
+                taken = connection.execute(
+                    update(table)
+                    .where(table.c.key == key, table.c.status_code.is_(None), table.c.locked_by == row.locked_by)
+                    .values(locked_by=token, locked_until=now + lease)
+                ).rowcount
+                if taken:
+                    return CLAIMED, token
+            return BUSY, None
+
+    def store(self, key: str, token: str, response: Response):
+        table = IdempotencyKey.__table__
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        with db.engines[None].begin() as connection:
+            connection.execute(
+                update(table).where(table.c.key == key, table.c.locked_by == token).values(
+                    status_code=response.status_code, headers=codec.dumps(headers), body=response.get_data(),
+                    locked_by=None, locked_until=None,
+                )
+            )
+        if time.monotonic() - self._pruned_at > PRUNE_SECONDS:
+            self.prune()
+
+    def release(self, key: str, token: str):
+        """Forget an unfinished claim so the next retry runs the route."""
+        table = IdempotencyKey.__table__
+        with db.engines[None].begin() as connection:
+            connection.execute(delete(table).where(
+                table.c.key == key, table.c.locked_by == token, table.c.status_code.is_(None)
+            ))
+
+    def replay(self, row) -> Response:
+        response = Response(row.body, status=row.status_code, headers=codec.loads(row.headers))
+        response.headers[REPLAYED_HEADER] = 'true'
+        return response
+
+    def prune(self):
+        """Drop expired keys, then the oldest finished ones beyond ``IDEMPOTENCY_MAX_KEYS``."""
+        self._pruned_at = time.monotonic()
+        table = IdempotencyKey.__table__
+        max_keys = self.app.config.get('IDEMPOTENCY_MAX_KEYS', DEFAULT_MAX_KEYS)
+        with db.engines[None].begin() as connection:
+            connection.execute(delete(table).where(table.c.created_at < _now() - self.ttl))
+            oldest_kept = connection.execute(
+                select(table.c.created_at).order_by(table.c.created_at.desc()).offset(max_keys - 1).limit(1)
+            ).scalar()
+            if oldest_kept is not None:
+                connection.execute(delete(table).where(
+                    table.c.created_at < oldest_kept, table.c.status_code.isnot(None)
+                ))
@@ -0,0 +1,341 @@
+"""Durable job queue for verify and tokenize requests.
+
+Jobs are rows in the ``job`` table, on the main (control) database or on
+``JOB_DATABASE_URL`` when set; a local SQLite file is enough for a single
+host. The API enqueues and returns a job id; worker threads claim jobs with
+a single UPDATE, run them and record the result. A claim is a lease: if the
+worker dies, the job becomes claimable again once ``JOB_LEASE_SECONDS``
+pass. Failures are retried with exponential backoff up to
+``JOB_MAX_ATTEMPTS``, except those the handler reports as permanent.
+
+Jobs for one asset run one at a time, oldest first, so a tokenize queued
+right behind a verify waits for it.
+"""
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, exists, insert, or_, select, update
+from werkzeug.exceptions import HTTPException
+
+from app import codec
+from app.models.database import db, Job
+
+JOBS_BIND_KEY = 'jobs'
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_SECONDS = 2.0
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_POLL_SECONDS = 0.5
+
+logger = logging.getLogger(__name__)
+
+# handler(asset_id, progress) -> (response body, HTTP status)
+Handler = Callable[[int, Callable[[str], None]], Tuple[Dict, int]]
+
+
+class PermanentJobError(Exception):
+    """A job failure that retrying will not fix."""
+
+
+def configure_jobs(app, settings):
+    """Register the optional job database bind before ``db.init_app``."""
+    app.config['JOB_QUEUE_ENABLED'] = settings.JOB_QUEUE_ENABLED
+    app.config['JOB_WORKERS'] = settings.JOB_WORKERS
+    app.config['JOB_MAX_ATTEMPTS'] = settings.JOB_MAX_ATTEMPTS
+    app.config['JOB_RETRY_SECONDS'] = settings.JOB_RETRY_SECONDS
+    app.config['JOB_LEASE_SECONDS'] = settings.JOB_LEASE_SECONDS
+    app.config['JOB_POLL_SECONDS'] = settings.JOB_POLL_SECONDS
+
+    if settings.JOB_DATABASE_URI:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[JOBS_BIND_KEY] = settings.JOB_DATABASE_URI
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_jobs(app, db):
+    """Create the app's worker pool; threads start on each process's first request.
+
+    Register handlers on the returned pool with ``@pool.handler(kind)``.
+    """
+    # The job table lives in the default metadata whichever database holds it
+    db.metadatas.pop(JOBS_BIND_KEY, None)
+
+    pool = JobWorkers(app)
+    app.extensions['jobs'] = pool
+    if app.config.get('JOB_QUEUE_ENABLED') and app.config.get('JOB_WORKERS'):
+        app.before_request(pool.start)
+    return pool
+
+
+def job_queue_enabled() -> bool:
+    return 'jobs' in current_app.extensions and bool(current_app.config.get('JOB_QUEUE_ENABLED'))
+
+
+def jobs_engine():
+    return db.engines.get(JOBS_BIND_KEY) or db.engines[None]
+
+
+def create_job_table():
+    Job.__table__.create(jobs_engine(), checkfirst=True)
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def to_dict(row) -> Dict:
+    return {
+        'id': row.id,
+        'kind': row.kind,
+        'asset_id': row.asset_id,
+        'status': row.status,
+        'progress': row.progress,
+        'attempts': row.attempts,
+        'max_attempts': row.max_attempts,
+        'result': codec.loads(row.result) if row.result else None,
+        'error': row.error,
+        'created_at': row.created_at.isoformat(),
+        'updated_at': row.updated_at.isoformat(),
+        'finished_at': row.finished_at.isoformat() if row.finished_at else None,
+    }
+
+
+# Queue operations ------------------------------------------------------------
+
+def enqueue(kind: str, asset_id: int, max_attempts: Optional[int] = None) -> int:
+    """Queue a job and return its id; wakes this process's idle workers."""
+    now = _now()
+    max_attempts = max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    with jobs_engine().begin() as connection:
+        job_id = connection.execute(insert(Job.__table__).values(
+            kind=kind, asset_id=asset_id, status=QUEUED, attempts=0, max_attempts=max_attempts,
+            run_after=now, created_at=now, updated_at=now,
+        )).inserted_primary_key[0]
+
+    pool = current_app.extensions.get('jobs')
+    if pool is not None:
+        pool.notify()
+    return job_id
+
+
+def get_job(job_id: int) -> Optional[Dict]:
+    with jobs_engine().connect() as connection:
+        row = connection.execute(select(Job.__table__).where(Job.id == job_id)).first()
+    return to_dict(row) if row else None
+
+
+def claim(worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+    """Lease the next runnable job to ``worker_id``; return its row or None.
+
+    Runnable: queued and due, or running on a lease that has expired, and
+    with no older unfinished job for the same asset.
+    """
+    now = _now()
+    job = Job.__table__
+    pending = job.alias('pending')
+    earlier = job.alias('earlier')
+    candidate = (
+        select(pending.c.id)
+        .where(or_(
+            and_(pending.c.status == QUEUED, pending.c.run_after <= now),
+            and_(pending.c.status == RUNNING, pending.c.locked_until < now),
+        ))
+        .where(~exists().where(
+            earlier.c.asset_id == pending.c.asset_id,
+            earlier.c.status.in_(ACTIVE_STATES),
+            earlier.c.id < pending.c.id,
+        ))
+        .order_by(pending.c.run_after, pending.c.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+
+    with jobs_engine().begin() as connection:
+        claimed = connection.execute(
+            update(job).where(job.c.id == candidate).values(
+                status=RUNNING, locked_by=token, locked_until=now + timedelta(seconds=lease_seconds),
+                attempts=job.c.attempts + 1, updated_at=now,
+            )
+        ).rowcount
+        if not claimed:
+            return None
+        return connection.execute(select(job).where(job.c.locked_by == token)).first()
+
+
+def _update_leased(job, **values):
+    """Update ``job`` only while its claim still holds; a reclaimed job is left alone."""
+    with jobs_engine().begin() as connection:
+        connection.execute(
+            update(Job.__table__).where(Job.id == job.id, Job.locked_by == job.locked_by).values(**values)
+        )
+
+
+def set_progress(job, progress: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+    """Record progress and renew the lease."""
+    now = _now()
+    _update_leased(job, progress=progress, locked_until=now + timedelta(seconds=lease_seconds), updated_at=now)
+
+
+def complete(job, result: Dict):
+    now = _now()
+    _update_leased(
+        job, status=SUCCEEDED, progress='done', result=codec.dumps(result), error=None,
+        locked_by=None, locked_until=None, updated_at=now, finished_at=now,
+    )
+
+
+def fail(job, error: str, permanent: bool = False, retry_seconds: float = DEFAULT_RETRY_SECONDS,
+         result: Optional[Dict] = None) -> str:
+    """Requeue ``job`` with backoff, or mark it failed once out of attempts; return the new status."""
+    now = _now()
+    values = {'error': error, 'locked_by': None, 'locked_until': None, 'updated_at': now}
+    if permanent or job.attempts >= job.max_attempts:
+        values.update(status=FAILED, finished_at=now, result=codec.dumps(result) if result else None)
+    else:
+        delay = retry_seconds * 2 ** (job.attempts - 1)
+        values.update(status=QUEUED, progress='retrying', run_after=now + timedelta(seconds=delay))
+    _update_leased(job, **values)
+    return values['status']
+
+
+# Workers -----------------------------------------------------------------------
+
+class JobWorkers:
+    """A pool of daemon threads, each running one job at a time."""
+
+    def __init__(self, app, handlers: Optional[Dict[str, Handler]] = None):
+        self.app = app
+        self.handlers = dict(handlers or {})
+        self.listeners = []
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._wake = threading.Condition()
+        # Bumped by notify so a worker that was busy when it came still sees it
+        self._generation = 0
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def handler(self, kind: str):
+        """Decorator registering the function that runs ``kind`` jobs."""
+        def register(function: Handler) -> Handler:
+            self.handlers[kind] = function
+            return function
+        return register
+
+    def on_finished(self, function):
+        """Decorator registering ``function(job, status, error)``, called after every attempt."""
+        self.listeners.append(function)
+        return function
+
+    def notify(self):
+        with self._wake:
+            self._generation += 1
+            self._wake.notify()
+
+    def start(self, workers: Optional[int] = None):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            count = workers if workers is not None else self.app.config.get('JOB_WORKERS', 0)
+            for index in range(count):
+                thread = threading.Thread(target=self._run, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping.clear()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        config = self.app.config
+        while not self._stopping.is_set():
+            seen = self._generation
+            if not self.run_once():
+                with self._wake:
+                    if self._generation == seen:
+                        self._wake.wait(config.get('JOB_POLL_SECONDS', DEFAULT_POLL_SECONDS))
+
+    def run_once(self) -> bool:
+        """Claim and run one job; return False when none was runnable."""
+        config = self.app.config
+        lease = config.get('JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+        with self.app.app_context():
+            try:
+                job = claim(self.worker_id, lease)
+            except Exception as e:
+                logger.error(f"Job claim failed: {str(e)}")
+                return False
+            if job is None:
+                return False
+
+            try:
+                self._execute(job, lease, config.get('JOB_RETRY_SECONDS', DEFAULT_RETRY_SECONDS))
+            finally:
+                db.session.remove()
+            return True
+
+    def _execute(self, job, lease: float, retry_seconds: float):
+        status, error = self._attempt(job, lease, retry_seconds)
+        for listener in self.listeners:
+            try:
+                listener(job, status, error)
+            except Exception as e:
+                logger.error(f"Job listener failed for job {job.id}: {str(e)}")
+            finally:
+                db.session.rollback()
+
+    def _attempt(self, job, lease: float, retry_seconds: float) -> Tuple[str, Optional[str]]:
+        """Run ``job`` once; return its new status and error."""
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            error = f"Unknown job kind: {job.kind}"
+            return fail(job, error, permanent=True), error
+        if job.attempts > job.max_attempts:
+            error = job.error or "Worker lease expired too many times"
+            return fail(job, error, permanent=True), error
+
+        logger.info(f"Running {job.kind} job {job.id} for asset {job.asset_id} (attempt {job.attempts})")
+        try:
+            body, status = handler(job.asset_id, lambda progress: set_progress(job, progress, lease))
+        except PermanentJobError as e:
+            db.session.rollback()
+            return fail(job, str(e), permanent=True), str(e)
+        except HTTPException as e:
+            db.session.rollback()
+            error = e.description or e.name
+            return fail(job, error, permanent=True), error
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"{job.kind} job {job.id} failed: {str(e)}")
+            return fail(job, str(e), retry_seconds=retry_seconds), str(e)
+
+        if status >= 400:
+            # Refused by the handler (e.g. asset not verified); retrying will not help
+            db.session.rollback()
+            error = body.get('error') or f"HTTP {status}"
+            return fail(job, error, permanent=True, result=body), error
+
+        complete(job, body)
+        return SUCCEEDED, None
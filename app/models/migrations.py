@@ -0,0 +1,202 @@
+"""In-place upgrades for databases created by earlier releases.
+
+``db.create_all()`` never alters a table that already exists, so columns
+added to a model later are added here and then filled from data the rows
+already carry.
+"""
+from typing import List
+
+from sqlalchemy import LargeBinary, String, bindparam, delete, func, inspect, select, text, true, type_coerce, update
+
+from app import codec
+from app.models.addresses import InvalidWalletAddress, normalize_address
+from app.models.database import (
+    db, User, Asset, Transaction, VERIFICATION_COLUMNS, verification_columns,
+)
+from app.models.portfolio import merge_portfolio_rollups
+from app.models.sharding import bucket_for
+from app.models.stats import ensure_stat_counters, write_counters
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def add_missing_columns(model) -> List[str]:
+    """ALTER ``model``'s table to add any nullable columns it lacks; return their names."""
+    table = model.__table__
+    connection = db.session.connection()
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    preparer = connection.dialect.identifier_preparer
+
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable:
+            raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} in place")
+        db.session.execute(text(
+            f"ALTER TABLE {preparer.format_table(table)} "
+            f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(connection.dialect)}"
+        ))
+        added.append(column.name)
+
+    db.session.commit()
+    return added
+
+
+def backfill_verification_columns(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Copy scores out of stored verification results into the typed columns.
+
+    Walks the table in primary key order and commits per batch, so it can be
+    stopped and rerun at any point. Returns the number of rows filled.
+    """
+    table = Transaction.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam('row_id'))
+        .values({name: bindparam(f'new_{name}') for name in VERIFICATION_COLUMNS})
+    )
+
+    last_id, filled = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.details)
+            .where(
+                table.c.transaction_type == 'verification',
+                table.c.verification_score.is_(None),
+                table.c.id > last_id,
+            )
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return filled
+        last_id = rows[-1].id
+
+        params = []
+        for row in rows:
+            try:
+                columns = verification_columns(codec.loads(row.details))
+            except ValueError:
+                continue  # Unreadable blob: leave the row for manual review
+            if columns['verification_score'] is not None:
+                params.append({'row_id': row.id, **{f'new_{name}': value for name, value in columns.items()}})
+
+        if params:
+            db.session.execute(stmt, params)
+            filled += len(params)
+        db.session.commit()
+
+
+def _merge_case_duplicates(table, is_text, raw) -> int:
+    """Fold users whose addresses differ only in case into the oldest one."""
+    key = func.lower(func.trim(raw))
+    groups = db.session.execute(
+        select(key, func.min(table.c.id)).where(is_text).group_by(key).having(func.count() > 1)
+    ).all()
+
+    if not groups:
+        return 0
+    # Databases from before the counters existed have none to adjust yet
+    ensure_stat_counters(db.session.connection())
+
+    merged = 0
+    for address, keeper in groups:
+        duplicates = db.session.scalars(
+            select(table.c.id).where(is_text, key == address, table.c.id != keeper)
+        ).all()
+        db.session.execute(
+            update(Asset.__table__).where(Asset.__table__.c.user_id.in_(duplicates)).values(user_id=keeper)
+        )
+        merge_portfolio_rollups(db.session.connection(), duplicates, keeper)
+        db.session.execute(delete(table).where(table.c.id.in_(duplicates)))
+        merged += len(duplicates)
+
+    # A recount rather than a delta, which would be off if the counter already was
+    write_counters(db.session.connection(), {'total_users': db.session.scalar(select(func.count(table.c.id)))})
+    return merged
+
+
+def migrate_wallet_addresses(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Rewrite hex wallet addresses as 20-byte binary; return the rows converted.
+
+    Users whose addresses differ only in letter case are the same wallet and
+    are merged into the oldest first. Runs as one transaction and changes
+    nothing if any stored address is malformed.
+    """
+    connection = db.session.connection()
+    table = User.__table__
+    raw = type_coerce(table.c.wallet_address, String)
+
+    if connection.dialect.name == 'postgresql':
+        column = next(c for c in inspect(connection).get_columns(table.name) if c['name'] == 'wallet_address')
+        if isinstance(column['type'], LargeBinary):
+            return 0
+        is_text = true()
+    else:
+        # SQLite keeps the declared type; converted rows are BLOBs
+        is_text = func.typeof(table.c.wallet_address) == 'text'
+
+    invalid = []
+    for address in db.session.execute(select(raw).where(is_text)).scalars():
+        try:
+            normalize_address(address)
+        except InvalidWalletAddress:
+            invalid.append(address)
+    if invalid:
+        raise RuntimeError(f"{len(invalid)} malformed wallet addresses, e.g. {invalid[:5]}")
+
+    _merge_case_duplicates(table, is_text, raw)
+
+    converted = 0
+    if connection.dialect.name == 'postgresql':
+        preparer = connection.dialect.identifier_preparer
+        converted = db.session.scalar(select(func.count()).select_from(table))
+        db.session.execute(text(
+            f"ALTER TABLE {preparer.format_table(table)} ALTER COLUMN wallet_address TYPE bytea "
+            f"USING decode(substring(lower(trim(wallet_address)) from 3), 'hex')"
+        ))
+    else:
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('row_id'))
+            .values(wallet_address=bindparam('new_address'))
+        )
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, raw).where(is_text).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(stmt, [
+                {'row_id': row_id, 'new_address': normalize_address(address)} for row_id, address in rows
+            ])
+            converted += len(rows)
+
+    db.session.commit()
+    return converted
+
+
+def backfill_user_buckets(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Fill ``user.bucket`` on rows from before it existed; return the rows filled.
+
+    Run after ``migrate_wallet_addresses``. Commits per batch, so it can be
+    stopped and rerun at any point.
+    """
+    table = User.__table__
+    stmt = update(table).where(table.c.id == bindparam('row_id')).values(bucket=bindparam('new_bucket'))
+
+    filled = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.wallet_address)
+            .where(table.c.bucket.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return filled
+        db.session.execute(stmt, [
+            {'row_id': row_id, 'new_bucket': bucket_for(wallet_address)} for row_id, wallet_address in rows
+        ])
+        db.session.commit()
+        filled += len(rows)
@@ -0,0 +1,71 @@
+"""Keyset pagination on ``(created_at, id)`` for newest-first listings.
+
+Cursors are opaque URL-safe tokens naming the last row of the previous page,
+so each page is one index range seek however deep the client has paged.
+"""
+import base64
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+STREAM_BATCH_SIZE = 1000
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def encode_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidPageRequest(f"Invalid cursor: {token}") from e
+
+
+def parse_limit(value: Optional[str]) -> int:
+    """Page size from a query string value, capped at ``MAX_LIMIT``."""
+    if value in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError as e:
+        raise InvalidPageRequest(f"Invalid limit: {value}") from e
+    if limit < 1:
+        raise InvalidPageRequest(f"Invalid limit: {value}")
+    return min(limit, MAX_LIMIT)
+
+
+def newest_first(query, model, cursor: Optional[str] = None):
+    """Order ``query`` newest first and start it after ``cursor`` if given."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < (created_at, row_id))
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def keyset_page(query, model, limit: int, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """Return one page of rows and the cursor for the next page (None at the end)."""
+    return split_page(newest_first(query, model, cursor).limit(limit + 1).all(), limit)
+
+
+def split_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """Trim ``limit + 1`` fetched rows to a page and its next cursor."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def iter_rows(query, model, cursor: Optional[str] = None) -> Iterator:
+    """Yield every row in batches so memory stays flat for full exports."""
+    return iter(newest_first(query, model, cursor).yield_per(STREAM_BATCH_SIZE))
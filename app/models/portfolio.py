@@ -0,0 +1,205 @@
+"""Per-wallet portfolio rollups behind ``/api/portfolio/<wallet>``.
+
+``portfolio_rollup`` holds one row per (user, asset type, currency) with
+asset counts and value sums, overall, verified and tokenized. Rows are
+updated by delta in the same transaction as the assets they sum. ORM
+writes (intake, verification, tokenization) go through a flush hook. The
+bulk paths (seeding, shard moves) call ``bump_portfolio_rollups``
+themselves. Reading a portfolio is a primary-key range read of a handful
+of rows, however many assets the wallet holds.
+
+Values are summed in each asset's own currency and converted to the
+requested one at read time with the cached FX table (``app.models.fx``),
+so a rate change never requires touching the rollups.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, event, func, select
+
+from app.models.database import User, Asset, PortfolioRollup, RoutingSession, dialect_insert, previous_value
+from app.models.fx import BASE_CURRENCY, converter
+
+ROLLUP_ATTRS = ('user_id', 'asset_type', 'currency', 'estimated_value', 'verification_status', 'token_id')
+REBUILD_BATCH_SIZE = 5000
+
+RollupKey = Tuple[int, str, str]
+
+
+def contribution(asset_type, currency, value, verification_status, token_id, sign: int = 1) -> Tuple[RollupKey, Dict]:
+    value = (value or 0.0) * sign
+    verified = verification_status == 'verified'
+    tokenized = token_id is not None
+    return (asset_type, currency or BASE_CURRENCY), {
+        'asset_count': sign,
+        'total_value': value,
+        'verified_count': sign if verified else 0,
+        'verified_value': value if verified else 0.0,
+        'tokenized_count': sign if tokenized else 0,
+        'tokenized_value': value if tokenized else 0.0,
+    }
+
+
+def _add(deltas: Dict, user_id: int, key, metrics: Dict):
+    totals = deltas.setdefault((user_id, *key), dict.fromkeys(PortfolioRollup.METRICS, 0))
+    for name, delta in metrics.items():
+        totals[name] += delta
+
+
+def rollup_deltas(rows: Iterable, sign: int = 1) -> Dict[RollupKey, Dict]:
+    """Deltas for asset rows given as mappings, e.g. from a bulk insert."""
+    deltas = {}
+    for row in rows:
+        key, metrics = contribution(
+            row['asset_type'], row.get('currency'), row['estimated_value'],
+            row.get('verification_status'), row.get('token_id'), sign,
+        )
+        _add(deltas, row['user_id'], key, metrics)
+    return deltas
+
+
+def bump_portfolio_rollups(connection, deltas: Dict[RollupKey, Dict]):
+    """Atomically add ``deltas`` ({(user_id, asset_type, currency): {metric: delta}}) to the rollups."""
+    if not deltas:
+        return
+    table = PortfolioRollup.__table__
+    stmt = dialect_insert(connection, table).values([
+        {'user_id': user_id, 'asset_type': asset_type, 'currency': currency, **metrics}
+        for (user_id, asset_type, currency), metrics in sorted(deltas.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.asset_type, table.c.currency],
+        set_={name: table.c[name] + stmt.excluded[name] for name in PortfolioRollup.METRICS},
+    )
+    connection.execute(stmt)
+
+
+def delete_portfolio_rollups(connection, user_ids: Iterable[int]):
+    table = PortfolioRollup.__table__
+    connection.execute(table.delete().where(table.c.user_id.in_(list(user_ids))))
+
+
+def merge_portfolio_rollups(connection, user_ids: List[int], keeper: int):
+    """Fold the rollups of ``user_ids`` into ``keeper``'s, after their assets moved there."""
+    table = PortfolioRollup.__table__
+    rows = connection.execute(select(table).where(table.c.user_id.in_(user_ids))).mappings().all()
+    deltas = {}
+    for row in rows:
+        _add(deltas, keeper, (row['asset_type'], row['currency']), {name: row[name] for name in PortfolioRollup.METRICS})
+    delete_portfolio_rollups(connection, user_ids)
+    bump_portfolio_rollups(connection, deltas)
+
+
+def _previous_state(asset) -> Tuple:
+    return tuple(previous_value(asset, name) for name in ROLLUP_ATTRS)
+
+
+def _current_state(asset) -> Tuple:
+    return tuple(getattr(asset, name) for name in ROLLUP_ATTRS)
+
+
+def _session_deltas(session) -> Dict[RollupKey, Dict]:
+    deltas = {}
+
+    def add(state, sign):
+        user_id, *fields = state
+        key, metrics = contribution(*fields, sign)
+        _add(deltas, user_id, key, metrics)
+
+    for obj in session.new:
+        if isinstance(obj, Asset):
+            add(_current_state(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Asset):
+            add(_previous_state(obj), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Asset) or not session.is_modified(obj):
+            continue
+        before, after = _previous_state(obj), _current_state(obj)
+        if before != after:
+            add(before, -1)
+            add(after, 1)
+
+    return {key: metrics for key, metrics in deltas.items() if any(metrics.values())}
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _maintain_portfolio_rollups(session, flush_context):
+    """Update the rollups in the same transaction as the assets they sum."""
+    bump_portfolio_rollups(session.connection(), _session_deltas(session))
+
+
+# Rebuilding ----------------------------------------------------------------------
+
+def rebuild_portfolio_rollups(connection) -> int:
+    """Recompute every rollup on ``connection``'s database from its assets; return rows written."""
+    table = Asset.__table__
+    value = table.c.estimated_value
+    verified = table.c.verification_status == 'verified'
+    tokenized = table.c.token_id.isnot(None)
+    currency = func.coalesce(table.c.currency, BASE_CURRENCY)
+    rows = connection.execute(
+        select(
+            table.c.user_id, table.c.asset_type, currency.label('currency'),
+            func.count().label('asset_count'),
+            func.sum(value).label('total_value'),
+            func.sum(case((verified, 1), else_=0)).label('verified_count'),
+            func.sum(case((verified, value), else_=0.0)).label('verified_value'),
+            func.sum(case((tokenized, 1), else_=0)).label('tokenized_count'),
+            func.sum(case((tokenized, value), else_=0.0)).label('tokenized_value'),
+        ).group_by(table.c.user_id, table.c.asset_type, currency)
+    ).mappings().all()
+
+    rollups = PortfolioRollup.__table__
+    connection.execute(rollups.delete())
+    for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+        connection.execute(rollups.insert(), [dict(row) for row in rows[start:start + REBUILD_BATCH_SIZE]])
+    return len(rows)
+
+
+def ensure_portfolio_rollups(connection) -> int:
+    """Build the rollups if there are none yet but assets exist; return rows written."""
+    if connection.execute(select(PortfolioRollup.user_id).limit(1)).first() is not None:
+        return 0
+    if connection.execute(select(Asset.id).limit(1)).first() is None:
+        return 0
+    return rebuild_portfolio_rollups(connection)
+
+
+# Reading -------------------------------------------------------------------------
+
+def portfolio_rows_query(wallet_address: bytes):
+    return (
+        select(PortfolioRollup)
+        .join(User, User.id == PortfolioRollup.user_id)
+        .where(User.wallet_address == wallet_address, PortfolioRollup.asset_count > 0)
+    )
+
+
+def _empty_totals() -> Dict:
+    return dict.fromkeys(PortfolioRollup.METRICS, 0)
+
+
+def summarize_portfolio(rows: Iterable[PortfolioRollup], currency: str, rates: Dict[str, float]) -> Dict:
+    """Totals overall, per asset type and per holding currency, valued in ``currency``."""
+    convert = converter(currency, rates)
+    totals, by_type, by_currency = _empty_totals(), {}, {}
+    for row in rows:
+        type_totals = by_type.setdefault(row.asset_type, _empty_totals())
+        for name in PortfolioRollup.METRICS:
+            amount = getattr(row, name)
+            if name.endswith('_value'):
+                amount = convert(amount, row.currency)
+            totals[name] += amount
+            type_totals[name] += amount
+        held = by_currency.setdefault(row.currency, {'asset_count': 0, 'total_value': 0.0})
+        held['asset_count'] += row.asset_count
+        # In the holding currency itself
+        held['total_value'] += row.total_value
+
+    return dict(
+        totals,
+        currency=currency,
+        by_asset_type=by_type,
+        by_currency=by_currency,
+        fx_rates={code: rates[code] / rates[currency] for code in by_currency},
+    )
@@ -0,0 +1,294 @@
+"""Token-bucket rate limits per wallet and per client IP, and overload shedding.
+
+Every API request spends tokens from its client IP's bucket and, when the
+request names a wallet, from that wallet's bucket as well. Buckets refill
+at ``RATELIMIT_*_RATE`` tokens a second, up to ``RATELIMIT_*_BURST``.
+Routes cost different amounts (``ROUTE_COSTS``): an intake runs the NLP
+pipeline and costs far more than a read. A request that cannot pay gets
+429 with ``Retry-After`` set to when it could.
+
+``RATELIMIT_STORAGE_URL`` picks where buckets live. With ``memory://``
+(the default) each worker process keeps its own, so N workers would allow
+N times the configured rates; the app refuses to start that way when
+there is more than one worker. The count comes from what gunicorn reads:
+``--workers`` in ``GUNICORN_CMD_ARGS``, else ``WEB_CONCURRENCY``, so
+workers must be set there rather than on the command line. With
+``redis://...`` all workers and hosts share them. If Redis is unreachable,
+requests are let through and the failure is logged.
+
+Separately, intake is shed with 503 and ``Retry-After`` while this worker
+is overloaded. That is when ``SHED_NLP_QUEUE_DEPTH`` NLP parses are
+already running or waiting, or when the p95 of parse times over the last
+``SHED_WINDOW_SECONDS`` is above ``SHED_NLP_P95_SECONDS``. Latency-based
+shedding lasts until the slow samples age out of that window.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, jsonify, request
+
+from app.models.addresses import InvalidWalletAddress, normalize_address
+
+# View name (endpoint without its blueprint) -> tokens per request; unlisted API routes cost 1
+ROUTE_COSTS = {
+    'asset_intake': 10,
+    'verify_asset': 5,
+    'tokenize_asset': 5,
+    'query_assets': 2,
+    'search': 2,
+}
+EXEMPT_ENDPOINTS = ('home', 'health_check_basic', 'health_check', 'static')
+# Routes that run the NLP pipeline in the request
+SHED_ENDPOINTS = ('asset_intake',)
+
+DEFAULT_IP_RATE = 5.0
+DEFAULT_IP_BURST = 100.0
+DEFAULT_WALLET_RATE = 1.0
+DEFAULT_WALLET_BURST = 50.0
+DEFAULT_MAX_BUCKETS = 100000
+MIN_LATENCY_SAMPLES = 20
+
+logger = logging.getLogger(__name__)
+
+
+def configure_rate_limits(app, settings):
+    app.config['RATELIMIT_ENABLED'] = settings.RATELIMIT_ENABLED
+    app.config['RATELIMIT_STORAGE_URL'] = settings.RATELIMIT_STORAGE_URL
+    app.config['WEB_CONCURRENCY'] = settings.WEB_CONCURRENCY
+    app.config['RATELIMIT_WALLET_RATE'] = settings.RATELIMIT_WALLET_RATE
+    app.config['RATELIMIT_WALLET_BURST'] = settings.RATELIMIT_WALLET_BURST
+    app.config['RATELIMIT_IP_RATE'] = settings.RATELIMIT_IP_RATE
+    app.config['RATELIMIT_IP_BURST'] = settings.RATELIMIT_IP_BURST
+    app.config['SHED_NLP_QUEUE_DEPTH'] = settings.SHED_NLP_QUEUE_DEPTH
+    app.config['SHED_NLP_P95_SECONDS'] = settings.SHED_NLP_P95_SECONDS
+    app.config['SHED_WINDOW_SECONDS'] = settings.SHED_WINDOW_SECONDS
+    app.config['SHED_RETRY_SECONDS'] = settings.SHED_RETRY_SECONDS
+
+
+def init_rate_limits(app):
+    """Create the app's bucket store and load monitor and check every request against them."""
+    url = app.config.get('RATELIMIT_STORAGE_URL') or 'memory://'
+    workers = app.config.get('WEB_CONCURRENCY', 1)
+    if url.startswith('memory://') and workers > 1 and app.config.get('RATELIMIT_ENABLED', True):
+        raise RuntimeError(
+            f"memory:// rate limit buckets are per process, so {workers} workers would allow {workers}x "
+            f"the configured rates; set RATELIMIT_STORAGE_URL to a shared redis:// store"
+        )
+    limiter = RateLimiter(app, bucket_store(url))
+    app.extensions['rate_limiter'] = limiter
+    app.extensions['load_monitor'] = LoadMonitor(app.config.get('SHED_WINDOW_SECONDS', 30))
+    app.before_request(limiter.before_request)
+    return limiter
+
+
+def load_monitor() -> 'LoadMonitor':
+    return current_app.extensions['load_monitor']
+
+
+def bucket_store(url: str):
+    if url.startswith('memory://'):
+        return MemoryBuckets()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBuckets(url)
+    raise ValueError(f"Unsupported RATELIMIT_STORAGE_URL: {url}")
+
+
+# Bucket stores ---------------------------------------------------------------------
+#
+# take(key, cost, rate, burst) -> (allowed, seconds until ``cost`` tokens are available)
+
+def _refill(tokens: float, at: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(0.0, now - at) * rate)
+
+
+class MemoryBuckets:
+    """Buckets in this process, least recently used dropped beyond ``max_buckets``.
+
+    A dropped bucket comes back full, which only ever errs towards letting
+    a request through.
+    """
+
+    def __init__(self, max_buckets: int = DEFAULT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, at = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, at, now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Refill, spend and save in one round trip, atomically for all workers
+TAKE_SCRIPT = """
+local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBuckets:
+    """Buckets shared by every worker through Redis; idle buckets expire once full again."""
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._take = self._redis.register_script(TAKE_SCRIPT)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        allowed, tokens = self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, cost, time.time()])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+
+# Limits -------------------------------------------------------------------------------
+
+def request_wallet() -> Optional[bytes]:
+    """The wallet a request acts for, if it names one."""
+    candidate = (request.view_args or {}).get('wallet_address') or request.args.get('wallet')
+    if candidate is None and request.method == 'POST' and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            candidate = body.get('wallet_address')
+    return parse_wallet(candidate)
+
+
+def parse_wallet(candidate) -> Optional[bytes]:
+    if not isinstance(candidate, str):
+        return None
+    try:
+        return normalize_address(candidate)
+    except InvalidWalletAddress:
+        return None  # The route itself rejects it
+
+
+class RateLimiter:
+    def __init__(self, app, store):
+        self.app = app
+        self.store = store
+
+    def before_request(self):
+        if request.endpoint is None or request.method == 'OPTIONS':
+            return None
+        view = request.endpoint.rpartition('.')[2]
+        if view in EXEMPT_ENDPOINTS:
+            return None
+        refused = self.check(view, request.remote_addr, request_wallet())
+        if refused is None:
+            return None
+        body, status, headers = refused
+        return jsonify(body), status, headers
+
+    def check(self, view: str, remote_addr: Optional[str],
+              wallet: Optional[bytes]) -> Optional[Tuple[Dict, int, Dict]]:
+        """Spend ``view``'s tokens; None when allowed, else the refusal's (body, status, headers)."""
+        if view in SHED_ENDPOINTS:
+            retry_after = self.app.extensions['load_monitor'].overloaded(self.app.config)
+            if retry_after:
+                return {'error': 'Server is busy, please retry shortly'}, 503, {'Retry-After': str(retry_after)}
+
+        if not self.app.config.get('RATELIMIT_ENABLED', True):
+            return None
+        cost = ROUTE_COSTS.get(view, 1)
+        config = self.app.config
+        buckets = [(
+            f"ip:{remote_addr}",
+            config.get('RATELIMIT_IP_RATE', DEFAULT_IP_RATE), config.get('RATELIMIT_IP_BURST', DEFAULT_IP_BURST),
+        )]
+        if wallet is not None:
+            buckets.append((
+                f"wallet:{wallet.hex()}",
+                config.get('RATELIMIT_WALLET_RATE', DEFAULT_WALLET_RATE),
+                config.get('RATELIMIT_WALLET_BURST', DEFAULT_WALLET_BURST),
+            ))
+
+        for key, rate, burst in buckets:
+            try:
+                allowed, wait = self.store.take(key, cost, rate, burst)
+            except Exception as e:
+                logger.error(f"Rate limit store failed, allowing request: {str(e)}")
+                return None
+            if not allowed:
+                return {'error': 'Rate limit exceeded', 'details': key.split(':')[0]}, 429, {
+                    'Retry-After': str(max(1, math.ceil(wait)))
+                }
+        return None
+
+
+# Load shedding -------------------------------------------------------------------------
+
+class LoadMonitor:
+    """This worker's NLP queue depth and recent NLP latencies."""
+
+    def __init__(self, window_seconds: float = 30, max_samples: int = 512):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._samples = deque(maxlen=max_samples)  # (finished at, seconds)
+
+    @contextmanager
+    def track(self):
+        """Count a block as queued/running NLP work and record how long it took."""
+        with self._lock:
+            self._in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._in_flight -= 1
+                self._samples.append((finished, finished - started))
+
+    @property
+    def depth(self) -> int:
+        return self._in_flight
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency over the window, or None with too few samples to tell."""
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            recent = sorted(seconds for finished, seconds in self._samples if finished >= cutoff)
+        if len(recent) < MIN_LATENCY_SAMPLES:
+            return None
+        return recent[min(len(recent) - 1, math.ceil(0.95 * len(recent)) - 1)]
+
+    def overloaded(self, config) -> int:
+        """Seconds a client should back off for, or 0 when there is capacity."""
+        max_depth = config.get('SHED_NLP_QUEUE_DEPTH')
+        max_p95 = config.get('SHED_NLP_P95_SECONDS')
+        if max_depth and self.depth >= max_depth:
+            return int(config.get('SHED_RETRY_SECONDS', 5))
+        if max_p95:
+            p95 = self.p95()
+            if p95 is not None and p95 > max_p95:
+                return max(int(config.get('SHED_RETRY_SECONDS', 5)), math.ceil(p95))
+        return 0
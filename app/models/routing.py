@@ -0,0 +1,148 @@
+import hashlib
+import time
+from typing import Dict, Union
+
+from flask import request
+from sqlalchemy import inspect
+from flask_sqlalchemy.session import Session
+
+from app.models.addresses import normalize_address
+
+REPLICA_BIND_KEY = 'replica'
+USE_REPLICA = 'use_replica'
+SHARD_KEY = 'shard'
+# Wallet data tables; with sharding on they only exist per shard
+SHARDED_TABLES = {'user', 'asset', 'transaction', 'stat_counter', 'archive_segment', 'archive_segment_entry',
+                  'audit_flush', 'portfolio_rollup'}
+READ_YOUR_WRITES_COOKIE = 'rwa_primary_until'
+NUM_BUCKETS = 1024
+
+
+def shard_bind_key(index: int) -> str:
+    return f'shard{index}'
+
+
+def bucket_for(wallet_address: Union[str, bytes]) -> int:
+    digest = hashlib.blake2b(normalize_address(wallet_address), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % NUM_BUCKETS
+
+
+def _table_name(mapper, clause):
+    if mapper is not None:
+        table = getattr(inspect(mapper, raiseerr=False), 'local_table', None)
+    else:
+        table = getattr(clause, 'table', None)
+    return getattr(table, 'name', None)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica engine when the request allows it.
+
+    Writes, flushes and anything issued after the session has pending changes
+    stay on the primary, so a request never reads back stale rows it just wrote.
+
+    With sharding on, everything goes to the shard chosen for the request
+    (``info[SHARD_KEY]``); touching wallet data with no shard chosen is an error
+    rather than a silent read of the control database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engines = self._db.engines
+            shard = self.info.get(SHARD_KEY)
+            if shard is not None:
+                return engines[shard_bind_key(shard)]
+            if shard_bind_key(0) in engines and _table_name(mapper, clause) in SHARDED_TABLES:
+                raise RuntimeError("Sharding is enabled but no shard was selected for this session")
+
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        if not self.info.get(USE_REPLICA) or self._flushing or self.new or self.dirty or self.deleted:
+            return engine
+
+        engines = self._db.engines
+        if REPLICA_BIND_KEY in engines and engine is engines.get(None):
+            return engines[REPLICA_BIND_KEY]
+
+        return engine
+
+
+def engine_options(settings) -> Dict:
+    """Engine options for the primary (and replica) from a config object.
+
+    Pool sizing applies per process, i.e. per gunicorn worker. SQLite pools
+    are managed by SQLAlchemy itself and only get pre-ping and recycle.
+    """
+    options = {
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+    }
+
+    if not settings.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        options.update({
+            'pool_size': settings.DB_POOL_SIZE,
+            'max_overflow': settings.DB_MAX_OVERFLOW,
+            'pool_timeout': settings.DB_POOL_TIMEOUT,
+        })
+
+    return options
+
+
+def configure_engines(app, settings):
+    """Copy database URIs and engine options onto ``app`` before ``db.init_app``."""
+    app.config['SQLALCHEMY_DATABASE_URI'] = settings.SQLALCHEMY_DATABASE_URI
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(settings)
+    app.config['READ_YOUR_WRITES_SECONDS'] = settings.READ_YOUR_WRITES_SECONDS
+
+    if settings.SQLALCHEMY_REPLICA_URI:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND_KEY] = settings.SQLALCHEMY_REPLICA_URI
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def replica_read(view):
+    """Mark a route as read-only so its queries may be served by the replica."""
+    view.replica_read = True
+    return view
+
+
+def init_read_routing(app, db):
+    """Route ``@replica_read`` views to the replica, with read-your-writes stickiness.
+
+    A successful write request sets a short-lived cookie; while it is valid the
+    same client's reads go to the primary so it always sees its own writes.
+    """
+    if REPLICA_BIND_KEY not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+
+    # The replica mirrors the primary's tables and has no models of its own.
+    # Dropping its empty metadata keeps create_all()/drop_all() off the replica.
+    db.metadatas.pop(REPLICA_BIND_KEY, None)
+
+    window = app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+
+    @app.before_request
+    def _route_reads_to_replica():
+        view = app.view_functions.get(request.endpoint)
+        if not getattr(view, 'replica_read', False):
+            return
+
+        try:
+            primary_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+
+        if primary_until <= time.time():
+            db.session.info[USE_REPLICA] = True
+
+    @app.after_request
+    def _stick_to_primary_after_write(response):
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                str(time.time() + window),
+                max_age=window,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
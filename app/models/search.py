@@ -0,0 +1,269 @@
+"""Full-text search over assets: description, location and extracted entities.
+
+The index is the ``asset_search`` table, one row per asset:
+
+- SQLite: an FTS5 table whose rowid is the asset id, ranked with bm25.
+- PostgreSQL: a weighted ``tsvector`` under a GIN index, ranked with
+  ``ts_rank_cd``.
+
+Either way a description match outranks a location match, which outranks
+an entity match. The index is written in the same transaction as the
+asset. ORM writes go through a flush hook. The bulk paths (seeding, shard
+moves) call ``index_asset_rows`` and ``unindex_assets`` themselves.
+``rebuild_search_index()`` refills the index from the asset table.
+
+Results are paged with an opaque cursor on (score, asset id). With
+sharding on, each shard is searched and the pages are merged.
+"""
+import base64
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, event, inspect, select, text
+
+from app import codec
+from app.models.database import db, Asset
+from app.models.routing import SHARD_KEY, RoutingSession
+
+TABLE = 'asset_search'
+# Relative weight of a match in each field
+DESCRIPTION_WEIGHT = 10.0
+LOCATION_WEIGHT = 5.0
+ENTITY_WEIGHT = 1.0
+MAX_QUERY_TERMS = 16
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+INDEXED_ATTRS = ('description', 'location', 'requirements')
+REBUILD_BATCH_SIZE = 5000
+
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+    "USING fts5(description, location, entities, tokenize='porter unicode61')",
+)
+POSTGRES_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {TABLE} (asset_id INTEGER PRIMARY KEY, document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_document ON {TABLE} USING GIN (document)",
+)
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', :description), 'A') || "
+    "setweight(to_tsvector('english', :location), 'B') || "
+    "setweight(to_tsvector('english', :entities), 'C')"
+)
+
+
+class InvalidSearchRequest(ValueError):
+    pass
+
+
+def _postgres(connection) -> bool:
+    return connection.dialect.name == 'postgresql'
+
+
+# Schema --------------------------------------------------------------------------
+
+def create_search_index(connection):
+    for statement in POSTGRES_DDL if _postgres(connection) else SQLITE_DDL:
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection):
+    connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+@event.listens_for(Asset.__table__, 'after_create')
+def _create_with_assets(target, connection, **kwargs):
+    create_search_index(connection)
+
+
+@event.listens_for(Asset.__table__, 'after_drop')
+def _drop_with_assets(target, connection, **kwargs):
+    drop_search_index(connection)
+
+
+def ensure_search_index(connection) -> int:
+    """Create the index if missing and fill it if it is empty but assets exist; return rows indexed."""
+    create_search_index(connection)
+    if connection.execute(text(f"SELECT 1 FROM {TABLE} LIMIT 1")).first() is not None:
+        return 0
+    if connection.execute(select(Asset.id).limit(1)).first() is None:
+        return 0
+    return rebuild_search_index(connection)
+
+
+def rebuild_search_index(connection, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Reindex every asset on ``connection``'s database; return the number indexed."""
+    connection.execute(text(f"DELETE FROM {TABLE}"))
+    table = Asset.__table__
+    last_id, indexed = 0, 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.description, table.c.location, table.c.requirements)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            return indexed
+        index_asset_rows(connection, rows)
+        indexed += len(rows)
+        last_id = rows[-1]['id']
+
+
+# Writing -------------------------------------------------------------------------
+
+def entity_text(requirements) -> str:
+    """The extracted entities' text from an asset's ``requirements`` JSON."""
+    data = codec.loads(requirements) if isinstance(requirements, (str, bytes)) else requirements
+    if not isinstance(data, dict):
+        return ''
+    entities = data.get('entities') or []
+    return ' '.join(
+        entity.get('text', '') if isinstance(entity, dict) else str(entity)
+        for entity in entities
+    )
+
+
+def search_document(row) -> Dict:
+    return {
+        'id': row['id'],
+        'description': row.get('description') or '',
+        'location': row.get('location') or '',
+        'entities': entity_text(row.get('requirements')),
+    }
+
+
+def index_asset_rows(connection, rows: Iterable):
+    """(Re)index asset rows, given as mappings with id, description, location and requirements."""
+    documents = [search_document(row) for row in rows]
+    if not documents:
+        return
+    unindex_assets(connection, [document['id'] for document in documents])
+    if _postgres(connection):
+        statement = f"INSERT INTO {TABLE} (asset_id, document) VALUES (:id, {POSTGRES_DOCUMENT})"
+    else:
+        statement = (
+            f"INSERT INTO {TABLE} (rowid, description, location, entities) "
+            "VALUES (:id, :description, :location, :entities)"
+        )
+    connection.execute(text(statement), documents)
+
+
+def unindex_assets(connection, asset_ids: List[int]):
+    if not asset_ids:
+        return
+    key = 'asset_id' if _postgres(connection) else 'rowid'
+    connection.execute(
+        text(f"DELETE FROM {TABLE} WHERE {key} IN :ids").bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(asset_ids)},
+    )
+
+
+def _search_fields_changed(asset) -> bool:
+    state = inspect(asset)
+    return any(state.attrs[name].history.has_changes() for name in INDEXED_ATTRS)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _maintain_search_index(session, flush_context):
+    """Index new and edited assets in the same transaction that writes them."""
+    changed = [obj for obj in session.new if isinstance(obj, Asset)]
+    changed.extend(obj for obj in session.dirty if isinstance(obj, Asset) and _search_fields_changed(obj))
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Asset)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    unindex_assets(connection, deleted)
+    index_asset_rows(connection, [
+        {'id': obj.id, 'description': obj.description, 'location': obj.location, 'requirements': obj.requirements}
+        for obj in changed
+    ])
+
+
+# Searching -----------------------------------------------------------------------
+
+def parse_query(value: Optional[str]) -> List[str]:
+    """Search terms from ``?q=``; every term must match."""
+    terms = TERM_RE.findall((value or '').lower())
+    if not terms:
+        raise InvalidSearchRequest("Missing search query: q")
+    return terms[:MAX_QUERY_TERMS]
+
+
+def encode_cursor(score: float, asset_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{score!r}|{asset_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[float, int]:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        score, asset_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return float(score), int(asset_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidSearchRequest(f"Invalid cursor: {token}") from e
+
+
+def _matches_statement(connection, after: Optional[Tuple[float, int]], limit: int):
+    """``(asset_id, score)`` rows, best first (lowest score), after the ``after`` position."""
+    if _postgres(connection):
+        matches = (
+            f"SELECT asset_id, -ts_rank_cd(document, query) AS score "
+            f"FROM {TABLE}, plainto_tsquery('english', :terms) AS query WHERE document @@ query"
+        )
+    else:
+        matches = (
+            f"SELECT rowid AS asset_id, "
+            f"bm25({TABLE}, {DESCRIPTION_WEIGHT}, {LOCATION_WEIGHT}, {ENTITY_WEIGHT}) AS score "
+            f"FROM {TABLE} WHERE {TABLE} MATCH :terms"
+        )
+    where = "WHERE score > :score OR (score = :score AND asset_id > :asset_id)" if after else ""
+    return text(f"SELECT asset_id, score FROM ({matches}) AS matches {where} ORDER BY score, asset_id LIMIT :limit")
+
+
+def _match_terms(connection, terms: List[str]) -> str:
+    if _postgres(connection):
+        return ' '.join(terms)
+    # Quoted, so FTS5 reads them as plain terms rather than query syntax
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search_matches(connection, terms: List[str], limit: int,
+                   after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+    params = {'terms': _match_terms(connection, terms), 'limit': limit}
+    if after:
+        params.update(score=after[0], asset_id=after[1])
+    return [tuple(row) for row in connection.execute(_matches_statement(connection, after, limit), params)]
+
+
+def search_assets(terms: List[str], limit: int, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """One page of matching assets, best first, and the cursor for the next page."""
+    from app.models.sharding import each_shard  # sharding imports this module
+
+    after = decode_cursor(cursor) if cursor else None
+    matches = []
+    for shard in each_shard():
+        matches.extend((score, asset_id, shard) for asset_id, score in search_matches(
+            db.session.connection(), terms, limit + 1, after
+        ))
+    matches.sort()
+    matches = matches[:limit + 1]
+
+    page = matches[:limit]
+    assets = _load_assets(page)
+    next_cursor = encode_cursor(*page[-1][:2]) if len(matches) > limit else None
+    return [(assets[asset_id], score) for score, asset_id, shard in page if asset_id in assets], next_cursor
+
+
+def _load_assets(page) -> Dict[int, Asset]:
+    assets = {}
+    by_shard = {}
+    for score, asset_id, shard in page:
+        by_shard.setdefault(shard, []).append(asset_id)
+    previous = db.session.info.get(SHARD_KEY)
+    try:
+        for shard, asset_ids in by_shard.items():
+            db.session.info[SHARD_KEY] = shard
+            for asset in db.session.scalars(select(Asset).where(Asset.id.in_(asset_ids))):
+                assets[asset.id] = asset
+    finally:
+        db.session.info[SHARD_KEY] = previous
+    return assets
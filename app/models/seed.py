@@ -0,0 +1,285 @@
+"""Deterministic synthetic Users, Assets and Transactions for scale testing.
+
+The same seed always produces the same rows. Rows are generated wallet by
+wallet and bulk inserted in fixed-size batches with pre-assigned ids, so
+loading tens of millions of rows needs no per-row round trips and little
+memory.
+"""
+import hashlib
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app import codec
+from app.agents.verification_agent import VerificationAgent
+from app.models.database import db, User, Asset, Transaction, bump_stat_counters, verification_columns
+from app.models.portfolio import bump_portfolio_rollups, rollup_deltas
+from app.models.search import index_asset_rows
+from app.models.sharding import sharding_enabled
+
+# (weight, median value, spread) per asset type; the spread is the sigma of a
+# log-normal, so a small share of values fall outside the verifier's ranges.
+ASSET_MIX = {
+    'real_estate': (0.35, 450000, 0.9),
+    'vehicle': (0.25, 35000, 0.8),
+    'artwork': (0.15, 20000, 1.4),
+    'equipment': (0.14, 60000, 1.0),
+    'commodity': (0.08, 15000, 1.1),
+    'unknown': (0.03, 5000, 1.5),
+}
+
+DESCRIPTIONS = {
+    'real_estate': [
+        '{beds} bedroom apartment with {baths} bathroom, {sqft} sqft, {value} {location}',
+        'Villa on {acres} acre land {location}, valued at {value}',
+        'Commercial building, {floors} floor property {location} worth {value}',
+    ],
+    'vehicle': [
+        '{year} {make} sedan, {miles} mileage, automatic transmission {location}, {value}',
+        '{year} {make} SUV model with low mileage, worth {value} {location}',
+        'Vintage motorcycle from {year}, engine rebuilt, valued at {value} {location}',
+    ],
+    'artwork': [
+        'Oil painting on canvas by artist {artist}, signed, {value} {location}',
+        'Bronze sculpture by {artist}, {year}, valued at {value} {location}',
+        'Watercolor artwork in original frame, {value} {location}',
+    ],
+    'equipment': [
+        'Industrial machinery, serial number {serial}, {hours} operating hours, {value} {location}',
+        'CNC machine from manufacturer {make}, under warranty, worth {value} {location}',
+    ],
+    'commodity': [
+        '{oz} oz gold bars, 999.9 purity, assay certificate, {value} {location}',
+        'Silver bullion, {oz} oz, grade A quality, valued at {value} {location}',
+    ],
+    'unknown': [
+        'Collection of rare items inherited from family, {value} {location}',
+        'Private holding, details available on request {location}',
+    ],
+}
+
+LOCATIONS = [
+    ('in New York', 'US', 'USD'), ('in California', 'US', 'USD'), ('in Texas', 'US', 'USD'),
+    ('in London', 'UK', 'USD'), ('in Toronto', 'CA', 'USD'), ('in Singapore', 'SG', 'USD'),
+    ('in Germany', 'EU', 'USD'), ('in France', 'EU', 'USD'),
+    ('in Mumbai', 'IN', 'INR'), ('in Bangalore', 'IN', 'INR'), ('in Dubai', 'AE', 'USD'),
+]
+MAKES = ['Honda', 'Toyota', 'Tesla', 'Ford', 'BMW', 'Caterpillar', 'Siemens']
+ARTISTS = ['Raza', 'Hussain', 'Monet', 'Basquiat', 'Kahlo', 'Hockney']
+INR_PER_USD = 83.0
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class SeedGenerator:
+    """Generates rows for ``users`` wallets from ``seed``, ending at ``end``."""
+
+    def __init__(self, seed: int = 42, users: int = 1000, end: datetime = datetime(2025, 1, 1),
+                 days: int = 730, mean_assets_per_user: float = 5.0):
+        self.seed = seed
+        self.users = users
+        self.end = end
+        self.days = days
+        self.mean_assets_per_user = mean_assets_per_user
+        self.verification_agent = VerificationAgent()
+        self._types = list(ASSET_MIX)
+        self._weights = [ASSET_MIX[t][0] for t in self._types]
+
+    # Values and text ---------------------------------------------------
+
+    def _timestamp(self, rng: random.Random, after: Optional[datetime] = None) -> datetime:
+        start = after or self.end - timedelta(days=self.days)
+        span = max((self.end - start).total_seconds(), 1)
+        return start + timedelta(seconds=rng.random() * span)
+
+    def _value(self, rng: random.Random, asset_type: str) -> float:
+        _, median, spread = ASSET_MIX[asset_type]
+        return round(math.exp(rng.gauss(math.log(median), spread)), 2)
+
+    def _amount(self, value: float, currency: str) -> float:
+        """A US dollar ``value`` in ``currency``, as stored and described."""
+        return round(value * INR_PER_USD, 2) if currency == 'INR' else value
+
+    def _format_value(self, rng: random.Random, value: float, currency: str) -> str:
+        if currency == 'INR':
+            if value >= 1e7 and rng.random() < 0.7:
+                return f"{value / 1e7:.1f} crore"
+            if value >= 1e5 and rng.random() < 0.7:
+                return f"{value / 1e5:.1f} lakh"
+            return f"INR {value:,.0f}"
+        return rng.choice([f"${value:,.2f}", f"USD {value:,.0f}", f"{value:,.0f} dollars"])
+
+    def _description(self, rng: random.Random, asset_type: str, value: float, location: str,
+                     currency: str) -> str:
+        template = rng.choice(DESCRIPTIONS[asset_type])
+        return template.format(
+            beds=rng.randint(1, 6), baths=rng.randint(1, 4), sqft=rng.randint(400, 6000),
+            acres=rng.randint(1, 40), floors=rng.randint(2, 30), year=rng.randint(1965, 2024),
+            make=rng.choice(MAKES), miles=rng.randint(1000, 180000), artist=rng.choice(ARTISTS),
+            serial=f"SN{rng.getrandbits(32):08X}", hours=rng.randint(50, 40000),
+            oz=rng.choice([10, 50, 100, 400, 1000]), value=self._format_value(rng, value, currency),
+            location=location,
+        )[:500]
+
+    def _requirements(self, rng: random.Random, location: str) -> Dict:
+        compound = round(rng.uniform(-0.2, 0.9), 4)
+        positive = round(max(compound, 0) * 0.4, 3)
+        return {
+            'confidence_score': rng.choice([0.5, 0.75, 0.75, 1.0, 1.0]),
+            'sentiment': {
+                'compound': compound,
+                'positive': positive,
+                'negative': round(max(-compound, 0) * 0.4, 3),
+                'neutral': round(1 - positive, 3),
+            },
+            'entities': [{'text': location[3:].lower(), 'label': 'GPE',
+                          'description': 'Countries, cities, states'}],
+        }
+
+    # Rows ------------------------------------------------------------------
+
+    def wallet(self, rng: random.Random) -> str:
+        return f"0x{rng.getrandbits(160):040x}"
+
+    def _assets_for_user(self, rng: random.Random) -> int:
+        # Heavy tail: most wallets hold a handful, custodial ones thousands
+        return max(1, int(rng.paretovariate(1.5) * self.mean_assets_per_user / 3))
+
+    def _history(self, rng: random.Random, asset: Dict, asset_id: int) -> Tuple[List[Dict], Dict]:
+        """Verification/tokenization transactions for one asset, and its final state."""
+        transactions = []
+        state = {'verification_status': 'pending', 'token_id': None, 'updated_at': asset['created_at']}
+        if rng.random() > 0.7:
+            return transactions, state
+
+        at = asset['created_at']
+        for _ in range(1 if rng.random() < 0.85 else rng.randint(2, 4)):
+            at = self._timestamp(rng, after=at)
+            result = self.verification_agent.verify_asset(dict(asset, id=asset_id))
+            transactions.append({
+                'asset_id': asset_id, 'transaction_type': 'verification',
+                'transaction_hash': None, 'status': result['status'],
+                'details': codec.dumps(result), 'created_at': at,
+                **verification_columns(result),
+            })
+            state.update(verification_status=result['status'], updated_at=at)
+
+        if state['verification_status'] == 'verified' and rng.random() < 0.6:
+            at = self._timestamp(rng, after=at)
+            digest = hashlib.sha256(f"{self.seed}:{asset_id}".encode()).hexdigest()
+            token_id = f"RWA_{digest[:16].upper()}"
+            tx_hash = f"0x{hashlib.sha256(digest.encode()).hexdigest()}"
+            result = {
+                'success': True, 'token_id': token_id, 'contract_address': f"0x{digest[24:64]}",
+                'transaction_hash': tx_hash, 'network': 'RWA-TestNet', 'standard': 'RWA-721',
+                'metadata': {'name': f"RWA Token - {asset['asset_type'].title()}"},
+                'created_at': at.isoformat(), 'status': 'minted',
+            }
+            transactions.append({
+                'asset_id': asset_id, 'transaction_type': 'tokenization',
+                'transaction_hash': tx_hash, 'status': 'completed',
+                'details': codec.dumps(result), 'created_at': at,
+                **verification_columns(None),
+            })
+            state.update(token_id=token_id, updated_at=at)
+
+        return transactions, state
+
+    def generate(self, first_user_id: int = 1, first_asset_id: int = 1,
+                 first_transaction_id: int = 1) -> Iterator[Tuple[str, Dict]]:
+        """Yield ``(table, row)`` pairs with ids assigned from the given offsets."""
+        user_id, asset_id, transaction_id = first_user_id, first_asset_id, first_transaction_id
+
+        for index in range(self.users):
+            # One RNG per wallet keeps output identical whatever the batch size
+            rng = random.Random(f"{self.seed}:{index}")
+            home = rng.choice(LOCATIONS)
+            jurisdiction = home[1]
+            created_at = self._timestamp(rng)
+
+            yield 'user', {
+                'id': user_id, 'wallet_address': self.wallet(rng),
+                'email': f"holder{index}@example.com" if rng.random() < 0.6 else None,
+                'kyc_status': rng.choice(['pending', 'pending', 'approved']),
+                'jurisdiction': jurisdiction, 'created_at': created_at,
+            }
+
+            for _ in range(self._assets_for_user(rng)):
+                asset_type = rng.choices(self._types, self._weights)[0]
+                asset_location, _, currency = home if rng.random() < 0.8 else rng.choice(LOCATIONS)
+                value = self._amount(self._value(rng, asset_type), currency)
+                asset = {
+                    'user_id': user_id, 'asset_type': asset_type,
+                    'description': self._description(rng, asset_type, value, asset_location, currency),
+                    # In the currency the description states, as intake would store it
+                    'estimated_value': value, 'currency': currency, 'location': asset_location[3:],
+                    'requirements': codec.dumps(self._requirements(rng, asset_location)),
+                    'created_at': self._timestamp(rng, after=created_at),
+                }
+                transactions, state = self._history(rng, asset, asset_id)
+                yield 'asset', dict(asset, id=asset_id, **state)
+
+                for transaction in transactions:
+                    yield 'transaction', dict(transaction, id=transaction_id)
+                    transaction_id += 1
+                asset_id += 1
+
+            user_id += 1
+
+
+def _next_id(model) -> int:
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def load(generator: SeedGenerator, batch_size: int = DEFAULT_BATCH_SIZE, progress=None) -> Dict[str, int]:
+    """Bulk insert everything ``generator`` yields; return row counts per table.
+
+    Core inserts bypass the ORM flush hooks, so the stat counters and
+    portfolio rollups are bumped and the assets indexed for search here, in
+    the same transaction as each batch.
+    """
+    if sharding_enabled():
+        raise RuntimeError("Seeding a sharded deployment is not supported; seed one database and move buckets")
+    tables = {'user': User.__table__, 'asset': Asset.__table__, 'transaction': Transaction.__table__}
+    buffers = {name: [] for name in tables}
+    totals = dict.fromkeys(tables, 0)
+    deltas = dict.fromkeys(('total_users', 'total_assets', 'verified_assets', 'tokenized_assets'), 0)
+
+    def flush():
+        connection = db.session.connection()
+        # Parents first so foreign keys always point at existing rows
+        for name in ('user', 'asset', 'transaction'):
+            if buffers[name]:
+                connection.execute(tables[name].insert(), buffers[name])
+                if name == 'asset':
+                    index_asset_rows(connection, buffers[name])
+                    bump_portfolio_rollups(connection, rollup_deltas(buffers[name]))
+                totals[name] += len(buffers[name])
+                buffers[name] = []
+        changed = {name: delta for name, delta in deltas.items() if delta}
+        if changed:
+            bump_stat_counters(connection, changed)
+        db.session.commit()
+        for name in deltas:
+            deltas[name] = 0
+        if progress:
+            progress(totals)
+
+    rows = generator.generate(_next_id(User), _next_id(Asset), _next_id(Transaction))
+    for table, row in rows:
+        buffers[table].append(row)
+        if table == 'user':
+            deltas['total_users'] += 1
+        elif table == 'asset':
+            deltas['total_assets'] += 1
+            deltas['verified_assets'] += row['verification_status'] == 'verified'
+            deltas['tokenized_assets'] += row['token_id'] is not None
+
+        if sum(len(buffer) for buffer in buffers.values()) >= batch_size:
+            flush()
+
+    flush()
+    return totals
@@ -0,0 +1,475 @@
+"""Optional wallet sharding for User, Asset and Transaction rows.
+
+Turned on by listing one database URL per shard in DATABASE_SHARD_URLS. The
+primary database (SQLALCHEMY_DATABASE_URI) then becomes the control
+database: it holds the bucket map and the id allocator, never wallet data,
+and must not be one of the shards.
+
+Each wallet hashes to one of NUM_BUCKETS buckets and each bucket lives on
+one shard, so all of a wallet's rows sit together and per-wallet requests
+touch one database. Rebalancing moves whole buckets (``move_bucket``).
+Row ids come from a shared block allocator, so they are unique across
+shards and keep their value when a bucket moves.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from flask import abort, current_app, has_app_context
+from sqlalchemy import event, func, select, update
+
+from app.models.database import (
+    db, User, Asset, Transaction, ArchiveSegment, ArchiveSegmentEntry, ShardBucket, IdBlock,
+    bump_stat_counters, dialect_insert,
+)
+from app.models.routing import NUM_BUCKETS, SHARD_KEY, bucket_for, shard_bind_key
+from app.models.portfolio import bump_portfolio_rollups, delete_portfolio_rollups, rollup_deltas
+from app.models.search import index_asset_rows, unindex_assets
+
+ID_BLOCK_SIZE = 1000
+DEFAULT_MAP_SECONDS = 5
+ASSET_LOCATIONS_SIZE = 10000
+COPY_BATCH_SIZE = 500
+
+ACTIVE = 'active'
+MOVING = 'moving'
+
+ALLOCATED_MODELS = (User, Asset, Transaction)
+
+
+class ShardUnavailable(RuntimeError):
+    """The wallet's bucket is being moved between shards; retry the write shortly."""
+
+
+def configure_shards(app, settings):
+    """Register one bind per shard URL before ``db.init_app``."""
+    uris = list(settings.SHARD_URIS or [])
+    app.config['SHARD_COUNT'] = len(uris)
+    app.config['SHARD_MAP_SECONDS'] = settings.SHARD_MAP_SECONDS
+
+    if uris:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.update({shard_bind_key(index): uri for index, uri in enumerate(uris)})
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_sharding(app, db):
+    if not app.config.get('SHARD_COUNT'):
+        return
+    # Shards hold copies of the default tables and have no models of their own
+    for index in range(app.config['SHARD_COUNT']):
+        db.metadatas.pop(shard_bind_key(index), None)
+
+
+def sharding_enabled() -> bool:
+    return has_app_context() and bool(current_app.config.get('SHARD_COUNT'))
+
+
+def shard_count() -> int:
+    return current_app.config.get('SHARD_COUNT', 0)
+
+
+def shard_engine(index: int):
+    return db.engines[shard_bind_key(index)]
+
+
+# Per-worker state ----------------------------------------------------------
+
+def load_bucket_map() -> Dict[int, Tuple[int, str]]:
+    with db.engines[None].connect() as connection:
+        rows = connection.execute(select(ShardBucket.bucket, ShardBucket.shard, ShardBucket.state)).all()
+    return {bucket: (shard, state) for bucket, shard, state in rows}
+
+
+class BucketMap:
+    """This worker's copy of the bucket map, reloaded every ``ttl`` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._buckets = None
+        self._expires_at = 0.0
+
+    def get(self, bucket: int) -> Tuple[int, str]:
+        with self._lock:
+            if self._buckets is None or time.monotonic() >= self._expires_at:
+                self._buckets = load_bucket_map()
+                self._expires_at = time.monotonic() + self.ttl
+            return self._buckets[bucket]
+
+    def invalidate(self):
+        with self._lock:
+            self._buckets = None
+
+
+class IdAllocator:
+    """Hands out ids from blocks reserved on the control database."""
+
+    def __init__(self, block_size: int = ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def _reserve(self, name: str) -> List[int]:
+        table = IdBlock.__table__
+        with db.engines[None].begin() as connection:
+            end = connection.execute(
+                update(table)
+                .where(table.c.name == name)
+                .values(next_id=table.c.next_id + self.block_size)
+                .returning(table.c.next_id)
+            ).scalar()
+        if end is None:
+            raise RuntimeError(f"No id block for {name}; run init_shards() first")
+        return [end - self.block_size, end]
+
+    def next_id(self, name: str) -> int:
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[name] = self._reserve(name)
+            block[0] += 1
+            return block[0] - 1
+
+
+class AssetLocations:
+    """LRU of asset id -> shard, so asset routes usually skip the scatter lookup."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, asset_id: int) -> Optional[int]:
+        with self._lock:
+            shard = self._entries.get(asset_id)
+            if shard is not None:
+                self._entries.move_to_end(asset_id)
+            return shard
+
+    def put(self, asset_id: int, shard: int):
+        with self._lock:
+            self._entries[asset_id] = shard
+            self._entries.move_to_end(asset_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def _state() -> Dict:
+    state = current_app.extensions.setdefault('sharding', {})
+    if not state:
+        state['buckets'] = BucketMap(current_app.config.get('SHARD_MAP_SECONDS', DEFAULT_MAP_SECONDS))
+        state['ids'] = IdAllocator()
+        state['assets'] = AssetLocations(ASSET_LOCATIONS_SIZE)
+    return state
+
+
+def next_row_id(model) -> Optional[int]:
+    """A globally unique id for a new ``model`` row, or None when unsharded."""
+    if not sharding_enabled():
+        return None
+    return _state()['ids'].next_id(model.__tablename__)
+
+
+def _assign_global_id(mapper, connection, target):
+    if target.id is None:
+        target.id = next_row_id(type(target))
+
+
+for _model in ALLOCATED_MODELS:
+    event.listen(_model, 'before_insert', _assign_global_id)
+
+
+# Request routing -----------------------------------------------------------
+
+def route_wallet(wallet_address: Union[str, bytes], write: bool = False) -> Optional[int]:
+    """Point the session at the wallet's shard; return it (None when unsharded).
+
+    Raises ShardUnavailable for writes while the wallet's bucket is moving.
+    """
+    if not sharding_enabled():
+        return None
+
+    shard, state = _state()['buckets'].get(bucket_for(wallet_address))
+    if write and state == MOVING:
+        raise ShardUnavailable("Wallet is being moved between shards, retry shortly")
+    db.session.info[SHARD_KEY] = shard
+    return shard
+
+
+def _asset_wallet(index: int, asset_id: int) -> Optional[bytes]:
+    with shard_engine(index).connect() as connection:
+        return connection.execute(
+            select(User.wallet_address).join(Asset, Asset.user_id == User.id).where(Asset.id == asset_id)
+        ).scalar()
+
+
+def route_asset(asset_id: int, write: bool = False) -> Optional[int]:
+    """Point the session at the shard holding ``asset_id``; 404 if no shard has it."""
+    if not sharding_enabled():
+        return None
+
+    locations = _state()['assets']
+    cached = locations.get(asset_id)
+    candidates = [cached] if cached is not None else []
+    candidates += [index for index in range(shard_count()) if index != cached]
+
+    for index in candidates:
+        wallet_address = _asset_wallet(index, asset_id)
+        if wallet_address is not None:
+            locations.put(asset_id, index)
+            return route_wallet(wallet_address, write)
+
+    abort(404)
+
+
+def each_shard() -> Iterator[Optional[int]]:
+    """Point the session at every shard in turn; once, at the database, when unsharded.
+
+    Commit inside the loop: a session transaction spanning shards is not atomic.
+    """
+    if not sharding_enabled():
+        yield None
+        return
+
+    previous = db.session.info.get(SHARD_KEY)
+    try:
+        for index in range(shard_count()):
+            db.session.info[SHARD_KEY] = index
+            yield index
+    finally:
+        db.session.info[SHARD_KEY] = previous
+
+
+def shard_engines() -> List:
+    return [shard_engine(index) for index in range(shard_count())]
+
+
+# Setup and rebalancing -----------------------------------------------------
+
+def init_shards():
+    """Create tables on every shard and seed the bucket map and id allocator.
+
+    Safe to rerun: an existing bucket map and id counters are left alone, so
+    adding a shard URL never moves data by itself; use ``move_bucket``.
+    """
+    for engine in shard_engines():
+        db.metadata.create_all(engine)
+
+    with db.engines[None].begin() as connection:
+        if not connection.execute(select(func.count()).select_from(ShardBucket.__table__)).scalar():
+            connection.execute(ShardBucket.__table__.insert(), [
+                {'bucket': bucket, 'shard': bucket % shard_count(), 'state': ACTIVE}
+                for bucket in range(NUM_BUCKETS)
+            ])
+
+        for model in ALLOCATED_MODELS:
+            highest = 0
+            for engine in shard_engines():
+                with engine.connect() as shard:
+                    highest = max(highest, shard.execute(select(func.max(model.id))).scalar() or 0)
+            connection.execute(
+                dialect_insert(connection, IdBlock.__table__)
+                .values(name=model.__tablename__, next_id=highest + 1)
+                .on_conflict_do_nothing(index_elements=[IdBlock.__table__.c.name])
+            )
+
+
+def set_bucket(bucket: int, shard: int, state: str = ACTIVE):
+    with db.engines[None].begin() as connection:
+        connection.execute(
+            update(ShardBucket.__table__)
+            .where(ShardBucket.__table__.c.bucket == bucket)
+            .values(shard=shard, state=state)
+        )
+    _state()['buckets'].invalidate()
+
+
+def _chunks(values: List, size: int = COPY_BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _user_pages(connection, bucket: int) -> Iterator[List[Dict]]:
+    """``bucket``'s users on one shard, ``COPY_BATCH_SIZE`` at a time in id order."""
+    table = User.__table__
+    last_id = 0
+    while True:
+        users = [dict(row) for row in connection.execute(
+            select(table).where(table.c.bucket == bucket, table.c.id > last_id)
+            .order_by(table.c.id).limit(COPY_BATCH_SIZE)
+        ).mappings()]
+        if not users:
+            return
+        yield users
+        last_id = users[-1]['id']
+
+
+def _rows_of(connection, table, column, ids: List[int]) -> List[Dict]:
+    rows = []
+    for chunk in _chunks(ids):
+        rows.extend(dict(row) for row in connection.execute(select(table).where(column.in_(chunk))).mappings())
+    return rows
+
+
+def _counter_deltas(users: List[Dict], assets: List[Dict], sign: int) -> Dict[str, int]:
+    deltas = {
+        'total_users': len(users),
+        'total_assets': len(assets),
+        'verified_assets': sum(asset['verification_status'] == 'verified' for asset in assets),
+        'tokenized_assets': sum(asset['token_id'] is not None for asset in assets),
+    }
+    return {name: sign * delta for name, delta in deltas.items() if delta}
+
+
+def _target_segments(source, target, paths: List[str]) -> Dict[str, int]:
+    """Ids of the archive segments at ``paths`` in ``target``'s catalog, copying over the missing ones."""
+    segments = ArchiveSegment.__table__
+    found = dict(target.execute(select(segments.c.path, segments.c.id).where(segments.c.path.in_(paths))).all())
+    missing = [path for path in paths if path not in found]
+    if missing:
+        rows = [
+            {key: value for key, value in row.items() if key != 'id'}
+            for row in _rows_of(source, segments, segments.c.path, missing)
+        ]
+        target.execute(segments.insert(), rows)
+        found.update(target.execute(
+            select(segments.c.path, segments.c.id).where(segments.c.path.in_(missing))
+        ).all())
+    return found
+
+
+def _copy_archive_entries(source, target, asset_ids: List[int]) -> int:
+    """Point ``target``'s archive catalog at the segment members of ``asset_ids``."""
+    segments, entries = ArchiveSegment.__table__, ArchiveSegmentEntry.__table__
+    rows = []
+    for chunk in _chunks(asset_ids):
+        rows.extend(source.execute(
+            select(entries, segments.c.path)
+            .join(segments, segments.c.id == entries.c.segment_id)
+            .where(entries.c.asset_id.in_(chunk))
+        ).mappings())
+    if not rows:
+        return 0
+
+    # Segment files stay where they are; only the catalog rows move
+    segment_ids = _target_segments(source, target, sorted({row['path'] for row in rows}))
+    target.execute(entries.insert(), [
+        dict({key: value for key, value in row.items() if key != 'path'}, segment_id=segment_ids[row['path']])
+        for row in rows
+    ])
+    return len(rows)
+
+
+def _copy_users(source, target, users: List[Dict]) -> Dict[str, int]:
+    """Copy ``users`` and everything hanging off them from ``source`` to ``target``."""
+    assets = _rows_of(source, Asset.__table__, Asset.__table__.c.user_id, [user['id'] for user in users])
+    asset_ids = [asset['id'] for asset in assets]
+
+    target.execute(User.__table__.insert(), users)
+    if assets:
+        target.execute(Asset.__table__.insert(), assets)
+    transactions = 0
+    for chunk in _chunks(asset_ids):
+        rows = _rows_of(source, Transaction.__table__, Transaction.__table__.c.asset_id, chunk)
+        if rows:
+            target.execute(Transaction.__table__.insert(), rows)
+        transactions += len(rows)
+    archive_entries = _copy_archive_entries(source, target, asset_ids)
+
+    index_asset_rows(target, assets)
+    bump_portfolio_rollups(target, rollup_deltas(assets))
+    deltas = _counter_deltas(users, assets, 1)
+    if deltas:
+        bump_stat_counters(target, deltas)
+    return {'users': len(users), 'assets': len(assets), 'transactions': transactions,
+            'archive_entries': archive_entries}
+
+
+def _delete_users(connection, users: List[Dict]):
+    """Delete ``users`` and everything hanging off them from one shard."""
+    user_ids = [user['id'] for user in users]
+    assets = _rows_of(connection, Asset.__table__, Asset.__table__.c.user_id, user_ids)
+    for asset_ids in _chunks([asset['id'] for asset in assets]):
+        for table in (ArchiveSegmentEntry.__table__, Transaction.__table__):
+            connection.execute(table.delete().where(table.c.asset_id.in_(asset_ids)))
+        unindex_assets(connection, asset_ids)
+        connection.execute(Asset.__table__.delete().where(Asset.__table__.c.id.in_(asset_ids)))
+    connection.execute(User.__table__.delete().where(User.__table__.c.id.in_(user_ids)))
+    delete_portfolio_rollups(connection, user_ids)
+    deltas = _counter_deltas(users, assets, -1)
+    if deltas:
+        bump_stat_counters(connection, deltas)
+
+
+def move_bucket(bucket: int, target: int, settle_seconds: Optional[float] = None) -> Dict[str, int]:
+    """Move one bucket's wallets to shard ``target`` while the app keeps serving.
+
+    The bucket is marked moving (writes to its wallets get ShardUnavailable)
+    and left for one map refresh interval so every worker has seen that.
+    Rows are then copied to the target in one transaction, ``COPY_BATCH_SIZE``
+    users at a time, the map is flipped, and after another interval the
+    source copy is deleted. Reads are served from whichever shard the map
+    names throughout. Archived transactions move with their assets: the
+    target's archive catalog gets entries pointing into the same segment
+    files.
+    """
+    if settle_seconds is None:
+        settle_seconds = current_app.config.get('SHARD_MAP_SECONDS', DEFAULT_MAP_SECONDS)
+
+    if not 0 <= target < shard_count():
+        raise ValueError(f"No shard {target}; {shard_count()} configured")
+    source, _ = load_bucket_map()[bucket]
+    if source == target:
+        return {}
+
+    set_bucket(bucket, source, MOVING)
+    time.sleep(settle_seconds)
+
+    moved = dict.fromkeys(('users', 'assets', 'transactions', 'archive_entries'), 0)
+    try:
+        with shard_engine(source).connect() as reader, shard_engine(target).begin() as writer:
+            for users in _user_pages(reader, bucket):
+                for key, count in _copy_users(reader, writer, users).items():
+                    moved[key] += count
+    except Exception:
+        set_bucket(bucket, source, ACTIVE)
+        raise
+
+    set_bucket(bucket, target, ACTIVE)
+    time.sleep(settle_seconds)
+
+    with shard_engine(source).begin() as connection:
+        # Deleting a page moves the next one to the front
+        while True:
+            users = next(_user_pages(connection, bucket), None)
+            if users is None:
+                break
+            _delete_users(connection, users)
+
+    return moved
+
+
+def plan_rebalance(bucket_map: Dict[int, Tuple[int, str]], shards: int) -> List[Tuple[int, int]]:
+    """(bucket, target) moves that leave every shard within one bucket of even."""
+    owned = {index: [] for index in range(shards)}
+    for bucket, (shard, _) in sorted(bucket_map.items()):
+        owned.setdefault(shard, []).append(bucket)
+
+    moves = []
+    quota = len(bucket_map) // shards
+    spare = [bucket for shard in sorted(owned) if shard >= shards for bucket in owned.pop(shard)]
+    for shard in sorted(owned):
+        extra = len(owned[shard]) - quota - (1 if shard < len(bucket_map) % shards else 0)
+        if extra > 0:
+            spare.extend(owned[shard][-extra:])
+            del owned[shard][-extra:]
+
+    for shard in sorted(owned):
+        wanted = quota + (1 if shard < len(bucket_map) % shards else 0) - len(owned[shard])
+        for _ in range(max(wanted, 0)):
+            if spare:
+                moves.append((spare.pop(0), shard))
+
+    return moves
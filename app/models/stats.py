@@ -0,0 +1,160 @@
+"""Read side of the /api/stats counters.
+
+The counters themselves are maintained on every flush in
+``app.models.database``; this module serves them through a short per-worker
+TTL cache and can rebuild them from the underlying tables.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+
+from app.models.database import db, User, Asset, StatCounter, RoutingSession, dialect_insert
+from app.models.sharding import each_shard, shard_engines, sharding_enabled
+
+DEFAULT_CACHE_SECONDS = 2.0
+
+
+class StatsCache:
+    """Holds the last counter snapshot for ``ttl`` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._expires_at = 0.0
+
+    def get(self, loader) -> Dict[str, int]:
+        snapshot = self.peek()
+        if snapshot is None:
+            snapshot = loader()
+            self.put(snapshot)
+        return snapshot
+
+    def peek(self) -> Optional[Dict[str, int]]:
+        """The snapshot while it is fresh, else None."""
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() < self._expires_at:
+                return self._snapshot
+        return None
+
+    def put(self, snapshot: Dict[str, int]):
+        with self._lock:
+            self._snapshot = snapshot
+            self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+def stats_cache(app) -> StatsCache:
+    caches = app.extensions.setdefault('stats_cache', {})
+    ttl = app.config.get('STATS_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+    return caches.setdefault('counters', StatsCache(ttl))
+
+
+def _cache() -> StatsCache:
+    return stats_cache(current_app)
+
+
+def counters_query():
+    return select(StatCounter.name, StatCounter.value).where(StatCounter.name.in_(StatCounter.NAMES))
+
+
+def sum_counters(rows) -> Dict[str, int]:
+    counters = dict.fromkeys(StatCounter.NAMES, 0)
+    for name, value in rows:
+        counters[name] += value
+    return counters
+
+
+def load_counters() -> Dict[str, int]:
+    """Read every counter in one primary-key lookup per database, summed over shards."""
+    stmt = counters_query()
+    if sharding_enabled():
+        rows = []
+        for engine in shard_engines():
+            with engine.connect() as connection:
+                rows.extend(connection.execute(stmt).all())
+    else:
+        rows = db.session.execute(stmt).all()
+    return sum_counters(rows)
+
+
+def get_counters() -> Dict[str, int]:
+    return _cache().get(load_counters)
+
+
+def invalidate_counters():
+    """Drop this worker's snapshot, e.g. after hearing of another worker's writes."""
+    _cache().invalidate()
+
+
+def count_rows(connection) -> Dict[str, int]:
+    """The true value of every counter on ``connection``'s database."""
+    return {
+        'total_assets': connection.scalar(select(func.count(Asset.id))),
+        'total_users': connection.scalar(select(func.count(User.id))),
+        'verified_assets': connection.scalar(
+            select(func.count(Asset.id)).where(Asset.verification_status == 'verified')
+        ),
+        'tokenized_assets': connection.scalar(
+            select(func.count(Asset.id)).where(Asset.token_id.isnot(None))
+        ),
+    }
+
+
+def write_counters(connection, counts: Dict[str, int]):
+    """Overwrite the counters on ``connection``'s database with ``counts``."""
+    table = StatCounter.__table__
+    stmt = dialect_insert(connection, table).values(
+        [{'name': name, 'value': value} for name, value in sorted(counts.items())]
+    )
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.name], set_={'value': stmt.excluded.value},
+    ))
+
+
+def reconcile_counters() -> Dict[str, int]:
+    """Recount every table and overwrite the counters with the true values.
+
+    Writes that land while the counts run can be missed, so run this when
+    intake is quiet (or again afterwards) on a live database.
+    """
+    totals = dict.fromkeys(StatCounter.NAMES, 0)
+    for _ in each_shard():
+        counts = count_rows(db.session.connection())
+        write_counters(db.session.connection(), counts)
+        db.session.commit()
+        for name, value in counts.items():
+            totals[name] += value
+
+    _cache().invalidate()
+    return totals
+
+
+def ensure_stat_counters(connection) -> Dict[str, int]:
+    """Count the rows if there are no counters yet but users or assets exist; return the counts written.
+
+    Databases from before the counters existed have the rows but an empty table.
+    """
+    if connection.execute(select(StatCounter.name).limit(1)).first() is not None:
+        return {}
+    if connection.execute(select(User.id).limit(1)).first() is None \
+            and connection.execute(select(Asset.id).limit(1)).first() is None:
+        return {}
+    counts = count_rows(connection)
+    write_counters(connection, counts)
+    if has_app_context():
+        _cache().invalidate()
+    return counts
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_after_commit(session):
+    """Writes made by this worker show up in its own stats straight away."""
+    if session.info.pop('stats_changed', False) and has_app_context():
+        _cache().invalidate()
@@ -0,0 +1,117 @@
+"""Race-safe wallet -> user lookup with a bounded per-worker cache.
+
+Addresses are normalized to their 20-byte form first, so every casing of a
+wallet maps to one user and one cache entry. Parallel intakes for a new wallet both try ``INSERT ... ON CONFLICT DO
+NOTHING``; exactly one inserts and the other reads the winner's row, so the
+unique constraint on ``wallet_address`` is never violated.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+
+from app.models.addresses import normalize_address
+from app.models.database import db, User, RoutingSession, bump_stat_counters, dialect_insert
+from app.models.sharding import next_row_id
+
+DEFAULT_CACHE_SIZE = 10000
+PENDING_KEY = 'wallet_cache_pending'
+
+
+class WalletCache:
+    """LRU map of 20-byte wallet address -> user id, bounded to ``max_size`` entries."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, wallet_address: bytes) -> Optional[int]:
+        with self._lock:
+            user_id = self._entries.get(wallet_address)
+            if user_id is not None:
+                self._entries.move_to_end(wallet_address)
+            return user_id
+
+    def put(self, wallet_address: bytes, user_id: int):
+        with self._lock:
+            self._entries[wallet_address] = user_id
+            self._entries.move_to_end(wallet_address)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def wallet_cache() -> WalletCache:
+    caches = current_app.extensions.setdefault('wallet_cache', {})
+    size = current_app.config.get('WALLET_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+    return caches.setdefault('users', WalletCache(size))
+
+
+def _find_user_id(wallet_address: bytes) -> Optional[int]:
+    return db.session.execute(
+        select(User.id).where(User.wallet_address == wallet_address)
+    ).scalar_one_or_none()
+
+
+def get_or_create_user_id(wallet_address: Union[str, bytes], email: Optional[str] = None,
+                          jurisdiction: Optional[str] = None) -> int:
+    """Return the id of the wallet's user, inserting the user if it is new.
+
+    The insert joins the caller's transaction. A newly created id only enters
+    the cache once that transaction commits, so a rolled back intake can never
+    leave a dangling id behind. Raises InvalidWalletAddress for malformed input.
+    """
+    wallet_address = normalize_address(wallet_address)
+    cache = wallet_cache()
+    user_id = cache.get(wallet_address)
+    if user_id is not None:
+        return user_id
+
+    user_id = _find_user_id(wallet_address)
+    if user_id is not None:
+        cache.put(wallet_address, user_id)
+        return user_id
+
+    row = {'wallet_address': wallet_address, 'email': email, 'jurisdiction': jurisdiction}
+    user_id = next_row_id(User)
+    if user_id is not None:
+        row['id'] = user_id
+
+    connection = db.session.connection()
+    stmt = dialect_insert(connection, User.__table__).values(**row).on_conflict_do_nothing(index_elements=[User.__table__.c.wallet_address])
+    result = connection.execute(stmt)
+
+    if result.rowcount == 1:
+        user_id = result.inserted_primary_key[0]
+        bump_stat_counters(connection, {'total_users': 1})
+        db.session.info['stats_changed'] = True
+        db.session.info.setdefault(PENDING_KEY, {})[wallet_address] = user_id
+        return user_id
+
+    # Another request created the wallet between our lookup and insert
+    user_id = _find_user_id(wallet_address)
+    cache.put(wallet_address, user_id)
+    return user_id
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _publish_created_wallets(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending and has_app_context():
+        cache = wallet_cache()
+        for wallet_address, user_id in pending.items():
+            cache.put(wallet_address, user_id)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_created_wallets(session):
+    session.info.pop(PENDING_KEY, None)
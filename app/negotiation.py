@@ -0,0 +1,136 @@
+"""Response formats and content-coding negotiation for the API.
+
+Payloads can go out as MessagePack for clients that send
+``Accept: application/msgpack`` or ``?format=msgpack``. Responses at or
+above ``COMPRESS_MIN_SIZE`` bytes are compressed with brotli or gzip,
+whichever the client prefers. Streams are compressed as they are produced,
+except event streams, which must reach the client one event at a time.
+
+``msgpack`` and ``brotli`` are optional. Without them JSON and gzip are
+used.
+"""
+import gzip
+import zlib
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from flask import Response, current_app, request
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+# Pages and static files are left to nginx
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', MSGPACK_MIMETYPE)
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# Quality 5 compresses better than gzip -6 at a similar speed; 11 is for static files
+BROTLI_QUALITY = 5
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def init_compression(app):
+    if app.config.get('COMPRESS_RESPONSES', True):
+        app.after_request(compress_response)
+
+
+# Formats ---------------------------------------------------------------------
+
+def wants_msgpack() -> bool:
+    return prefers_msgpack(request.args.get('format'), request.accept_mimetypes)
+
+
+def prefers_msgpack(format_arg: Optional[str], accept_mimetypes) -> bool:
+    """Whether ``?format=`` or a parsed ``Accept`` header asks for MessagePack."""
+    if msgpack is None:
+        return False
+    return (format_arg == 'msgpack'
+            or accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE)
+
+
+def pack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True, datetime=False, default=str)
+
+
+def msgpack_response(payload: Any, status: int = 200) -> Response:
+    return Response(pack(payload), status=status, mimetype=MSGPACK_MIMETYPE)
+
+
+# Content coding ----------------------------------------------------------------
+
+def content_codings():
+    """Codings this server can apply, preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_coding() -> Optional[str]:
+    """The coding to apply to this request's response, or None for identity."""
+    return best_coding(request.accept_encodings)
+
+
+def best_coding(accept_encodings) -> Optional[str]:
+    """The preferred coding in a parsed ``Accept-Encoding`` header, or None for identity."""
+    best, best_quality = None, 0
+    for coding in content_codings():
+        quality = accept_encodings[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data: bytes, coding: str) -> bytes:
+    if coding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def stream_compressor(coding: str) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """``(feed, finish)``: ``feed`` compresses the next chunk, ``finish`` returns the tail."""
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def compress_stream(chunks: Iterable, coding: str) -> Iterator[bytes]:
+    feed, finish = stream_compressor(coding)
+    for chunk in chunks:
+        data = feed(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response: Response) -> Response:
+    """``after_request`` hook: compress the body when it is worth it and the client accepts it."""
+    if response.status_code not in (200, 201, 202) or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    coding = choose_coding()
+    if coding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, coding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+        response.set_data(compress(data, coding))
+
+    response.headers['Content-Encoding'] = coding
+    etag, weak = response.get_etag()
+    if etag:
+        # Each coding is a different representation, so it needs its own strong ETag
+        response.set_etag(f"{etag}-{coding}", weak)
+    return response
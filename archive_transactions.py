@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+sys.path.append('.')
+
+from app.main import create_app
+from app.models.archive import archive_transactions
+from app.models.sharding import each_shard
+from config import Config
+
+def main():
+    parser = argparse.ArgumentParser(description='Move old transactions into compressed archive segments')
+    parser.add_argument('--older-than-days', type=int, default=Config.TRANSACTION_ARCHIVE_AFTER_DAYS,
+                        help='archive transactions created more than this many days ago')
+    parser.add_argument('--archive-dir', default=Config.ARCHIVE_DIR,
+                        help='directory that holds the segment files')
+    args = parser.parse_args()
+
+    print(f"🗃  Archiving transactions older than {args.older_than_days} days...")
+
+    app = create_app()
+    with app.app_context():
+        try:
+            archived, segment_count = 0, 0
+            for _ in each_shard():
+                for segment in archive_transactions(args.older_than_days, args.archive_dir):
+                    print(f"✅ {segment.period}: {segment.row_count} transactions -> {segment.path}")
+                    archived += segment.row_count
+                    segment_count += 1
+            print(f"🎉 Archived {archived} transactions in {segment_count} segment(s)")
+
+        except Exception as e:
+            print(f"❌ Archiving failed: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
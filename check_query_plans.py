@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Run EXPLAIN QUERY PLAN on every query the API routes issue.
+
+Drives each route against a scratch SQLite database, captures the SELECT
+statements it sends and fails if SQLite plans any of them as a full table scan.
+"""
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import event
+
+from app.main import create_app, create_schema
+from app.models.database import db
+from config import TestingConfig
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+
+SCAN_RE = re.compile(r'^SCAN (\S+)')
+# Small reference tables that are read whole on purpose, then cached
+WHOLE_TABLE_READS = {'fx_rate'}
+
+
+def build_check_app(database_uri):
+    """A testing app bound to ``database_uri``."""
+    class PlanCheckConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        SHARD_URIS = []
+        SQLALCHEMY_REPLICA_URI = None
+        JOB_DATABASE_URI = None
+
+    return create_app(PlanCheckConfig)
+
+
+def exercise_routes(client):
+    """Hit every API route once, in the order a client would."""
+    response = client.post('/api/intake', json={
+        'wallet_address': WALLET,
+        'user_input': 'Tokenize my 3 bedroom apartment in New York worth $450,000',
+        'email': 'plans@example.com',
+    })
+    asset_id = response.get_json()['asset']['id']
+
+    client.post('/api/intake', json={
+        'wallet_address': WALLET,
+        'user_input': 'Tokenize my 2020 Honda Civic sedan in Texas worth $18,000',
+    })
+
+    client.post(f'/api/verify/{asset_id}')
+    client.post(f'/api/tokenize/{asset_id}')
+    first_page = client.get(f'/api/asset/{asset_id}?limit=1').get_json()
+    client.get(f"/api/asset/{asset_id}?limit=1&cursor={first_page['next_cursor']}")
+    client.get(f'/api/asset/{asset_id}?format=ndjson').get_data()
+    client.get(f'/api/asset/{asset_id}?history=full')
+    first_page = client.get(f'/api/assets/{WALLET}?limit=1').get_json()
+    client.get(f"/api/assets/{WALLET}?limit=1&cursor={first_page['next_cursor']}")
+    client.get(f'/api/assets/{WALLET}?format=ndjson').get_data()
+    client.get(f'/api/assets/{WALLET}?fields=id,asset_type,token_id')
+    client.get(f'/api/asset/{asset_id}?fields=transaction_type,status,created_at')
+    client.get('/api/stats')
+    client.get(f'/api/portfolio/{WALLET}?currency=INR')
+    first_page = client.get('/api/assets?asset_type=vehicle,real_estate&min_value=1000&limit=1').get_json()
+    client.get(f"/api/assets?asset_type=vehicle,real_estate&min_value=1000&limit=1&cursor={first_page['next_cursor']}")
+    client.get('/api/assets?verification_status=verified&since=2020-01-01&tokenized=true')
+    client.get('/api/assets?jurisdiction=NE&fields=id,estimated_value')
+    first_page = client.get('/api/search?q=tokenize&limit=1').get_json()
+    client.get(f"/api/search?q=tokenize&limit=1&cursor={first_page['next_cursor']}")
+    client.get('/api/health')
+
+
+def is_full_scan(detail, tables):
+    """True when a plan step walks a whole table (or a whole index of it)."""
+    match = SCAN_RE.match(detail)
+    return bool(match) and match.group(1).strip('"') in tables
+
+
+def collect_query_plans():
+    """Return ``[(statement, [plan detail, ...]), ...]`` for every route query."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        check_app = build_check_app(f"sqlite:///{os.path.join(tmpdir, 'plans.db')}")
+        statements = []
+
+        with check_app.app_context():
+            create_schema()
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    statements.append((statement, parameters))
+
+            event.listen(db.engine, 'before_cursor_execute', capture)
+            try:
+                exercise_routes(check_app.test_client())
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', capture)
+
+            plans = []
+            with db.engine.connect() as conn:
+                for statement, parameters in statements:
+                    rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+                    plans.append((statement, [row[3] for row in rows]))
+
+            db.session.remove()
+            db.engine.dispose()
+
+    return plans
+
+
+def find_full_scans(plans):
+    tables = set(db.metadata.tables) - WHOLE_TABLE_READS
+    return [
+        (statement, detail)
+        for statement, details in plans
+        for detail in details
+        if is_full_scan(detail, tables)
+    ]
+
+
+def main():
+    print("🔍 Checking route query plans...")
+    plans = collect_query_plans()
+    scans = find_full_scans(plans)
+
+    for statement, details in plans:
+        print(f"  {' | '.join(details)}")
+
+    if scans:
+        print(f"\n❌ {len(scans)} full table scan(s):")
+        for statement, detail in scans:
+            print(f"  {detail}\n    {' '.join(statement.split())}")
+        return 1
+
+    print(f"\n✅ {len(plans)} queries checked, no full table scans")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,123 @@
 import os
+import shlex
 from datetime import timedelta
 
+
+def _worker_count():
+    """Worker processes the server will fork, read the way gunicorn reads them.
+
+    ``--workers`` in ``GUNICORN_CMD_ARGS`` wins; otherwise gunicorn (and
+    uvicorn) default to ``WEB_CONCURRENCY``, then 1.
+    """
+    args = shlex.split(os.environ.get('GUNICORN_CMD_ARGS') or '')
+    for index, arg in enumerate(args):
+        if arg in ('-w', '--workers') and index + 1 < len(args):
+            return int(args[index + 1])
+        if arg.startswith('--workers='):
+            return int(arg.split('=', 1)[1])
+    return int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-this'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///rwa_tokenization.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database connection pool (sized per gunicorn worker)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 30)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+    # Read replica for read-only routes; unset sends everything to the primary
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS') or 5)
+
+    # Optional wallet sharding: comma-separated database URLs, one per shard.
+    # DATABASE_URL then only holds the shard map and id allocator.
+    SHARD_URIS = [uri.strip() for uri in (os.environ.get('DATABASE_SHARD_URLS') or '').split(',') if uri.strip()]
+    SHARD_MAP_SECONDS = float(os.environ.get('SHARD_MAP_SECONDS') or 5)
     
+    # Seconds each worker may serve /api/stats from memory
+    STATS_CACHE_SECONDS = float(os.environ.get('STATS_CACHE_SECONDS') or 2)
+
+    # Seconds each worker may use exchange rates read from the fx_rate table
+    FX_CACHE_SECONDS = float(os.environ.get('FX_CACHE_SECONDS') or 300)
+
+    # Wallet address -> user id entries each worker keeps in memory
+    WALLET_CACHE_SIZE = int(os.environ.get('WALLET_CACHE_SIZE') or 10000)
+
+    # Audit Transaction rows: sync (same transaction as the Asset update),
+    # memory or journal (write-behind, bulk inserted every N rows or seconds)
+    AUDIT_WRITE_MODE = os.environ.get('AUDIT_WRITE_MODE') or 'sync'
+    AUDIT_JOURNAL_DIR = os.environ.get('AUDIT_JOURNAL_DIR') or 'audit_journal'
+    AUDIT_FLUSH_ROWS = int(os.environ.get('AUDIT_FLUSH_ROWS') or 500)
+    AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS') or 1)
+
+    # Verify/tokenize job queue. Enabled, the POST routes return 202 and a job
+    # id; JOB_WORKERS threads per process run jobs (0 leaves them to run_jobs.py).
+    # JOB_DATABASE_URL moves the queue off the main database, e.g. to local SQLite.
+    JOB_QUEUE_ENABLED = os.environ.get('JOB_QUEUE', 'true').lower() == 'true'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 3)
+    JOB_RETRY_SECONDS = float(os.environ.get('JOB_RETRY_SECONDS') or 2)
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS') or 300)
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS') or 0.5)
+    JOB_DATABASE_URI = os.environ.get('JOB_DATABASE_URL')
+
+    # /api/events (Server-Sent Events). The database relay lets every worker
+    # stream every worker's events; local only suits a single process.
+    EVENTS_RELAY = os.environ.get('EVENTS_RELAY') or 'database'
+    EVENTS_REPLAY_SIZE = int(os.environ.get('EVENTS_REPLAY_SIZE') or 1000)
+    EVENTS_POLL_SECONDS = float(os.environ.get('EVENTS_POLL_SECONDS') or 0.5)
+    EVENTS_KEEPALIVE_SECONDS = float(os.environ.get('EVENTS_KEEPALIVE_SECONDS') or 15)
+    EVENTS_STREAM_SECONDS = float(os.environ.get('EVENTS_STREAM_SECONDS') or 300)
+
+    # Transaction archive (cold storage for old audit rows)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or 'archive'
+    TRANSACTION_ARCHIVE_AFTER_DAYS = int(os.environ.get('TRANSACTION_ARCHIVE_AFTER_DAYS') or 365)
+
+    # JSON codec for JSON columns and API responses: auto, orjson or json
+    JSON_CODEC = os.environ.get('JSON_CODEC') or 'auto'
+
+    # Idempotency-Key on POST routes: stored responses and their retention
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS') or 86400)
+    IDEMPOTENCY_MAX_KEYS = int(os.environ.get('IDEMPOTENCY_MAX_KEYS') or 100000)
+    IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS') or 120)
+    IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS') or 30)
+
+    # ASGI mode (app.asgi): threads running the Flask app for the routes that are not async
+    ASYNC_EXECUTOR_THREADS = int(os.environ.get('ASYNC_EXECUTOR_THREADS') or 32)
+
+    # API response compression (brotli when installed, else gzip)
+    COMPRESS_RESPONSES = (os.environ.get('COMPRESS_RESPONSES') or 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     LOG_FILE = os.environ.get('LOG_FILE') or 'logs/app.log'
     
-    # API Rate Limiting
-    RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL') or 'memory://'
+    # API Rate Limiting: token buckets per client IP and per wallet.
+    # memory:// keeps buckets per worker; redis://host:6379/0 shares them
+    RATELIMIT_ENABLED = (os.environ.get('RATELIMIT_ENABLED') or 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or os.environ.get('REDIS_URL') or 'memory://'
+    RATELIMIT_IP_RATE = float(os.environ.get('RATELIMIT_IP_RATE') or 5)  # tokens per second
+    RATELIMIT_IP_BURST = float(os.environ.get('RATELIMIT_IP_BURST') or 100)
+    RATELIMIT_WALLET_RATE = float(os.environ.get('RATELIMIT_WALLET_RATE') or 1)
+    RATELIMIT_WALLET_BURST = float(os.environ.get('RATELIMIT_WALLET_BURST') or 50)
+    # Proxies in front of the app whose X-Forwarded-For to trust (1 behind nginx)
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES') or 0)
+    # Server worker processes, from the settings gunicorn itself reads, so
+    # start it without a --workers flag; more than one needs a shared
+    # RATELIMIT_STORAGE_URL
+    WEB_CONCURRENCY = _worker_count()
+
+    # Overload shedding for intake (0 disables a check)
+    SHED_NLP_QUEUE_DEPTH = int(os.environ.get('SHED_NLP_QUEUE_DEPTH') or 32)
+    SHED_NLP_P95_SECONDS = float(os.environ.get('SHED_NLP_P95_SECONDS') or 5)
+    SHED_WINDOW_SECONDS = float(os.environ.get('SHED_WINDOW_SECONDS') or 30)
+    SHED_RETRY_SECONDS = int(os.environ.get('SHED_RETRY_SECONDS') or 5)
     
     # File Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
@@ -55,6 +161,14 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    LOG_FILE = None
+
+    # Run everything inline in the request; no background threads
+    JOB_QUEUE_ENABLED = False
+    EVENTS_RELAY = 'local'
+    AUDIT_WRITE_MODE = 'sync'
+    RATELIMIT_ENABLED = False
+    RATELIMIT_STORAGE_URL = 'memory://'
 
 config = {
     'development': DevelopmentConfig,
@@ -134,9 +134,10 @@ python -c "
 import sys
 sys.path.append('.')
 try:
-    from app.main import app, db
+    from app.main import create_app, create_schema
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        create_schema()
     print('Database initialized successfully!')
 except Exception as e:
     print(f'Database initialization error: {e}')
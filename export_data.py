@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+from datetime import datetime
+sys.path.append('.')
+
+from app.main import create_app
+from app.models.export import EXPORTERS, TABLES, DEFAULT_BATCH_SIZE, export_table
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Stream users, assets and transactions to CSV, NDJSON or Parquet')
+    parser.add_argument('tables', nargs='*', choices=list(TABLES), default=list(TABLES),
+                        help='tables to export (default: all)')
+    parser.add_argument('--format', choices=list(EXPORTERS), default='ndjson')
+    parser.add_argument('--output', default='exports',
+                        help="output directory, or '-' to write a single csv/ndjson table to stdout")
+    parser.add_argument('--since', type=datetime.fromisoformat, help='only rows created at or after this time')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='only rows created before this time')
+    parser.add_argument('--wallet', help='only rows belonging to this wallet address')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.output == '-' and (args.format == 'parquet' or len(args.tables) != 1):
+        parser.error("--output - needs exactly one table and csv or ndjson format")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    filters = dict(since=args.since, until=args.until, wallet=args.wallet, batch_size=args.batch_size)
+
+    app = create_app()
+    with app.app_context():
+        if args.output == '-':
+            export_table(args.tables[0], sys.stdout, args.format, **filters)
+            return
+
+        os.makedirs(args.output, exist_ok=True)
+        for table in args.tables:
+            path = os.path.join(args.output, f"{table}.{args.format}")
+            mode, newline = ('wb', None) if args.format == 'parquet' else ('w', '')
+            encoding = None if args.format == 'parquet' else 'utf-8'
+            with open(path, mode, newline=newline, encoding=encoding) as out:
+                count = export_table(table, out, args.format, **filters)
+            print(f"✅ {table}: {count} rows -> {path}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,14 @@ class RWAApp {
         this.currentWallet = null;
         this.currentAssets = [];
         this.currentAsset = null;
+        // Only the columns the list and history views render
+        this.listFields = 'id,asset_type,description,estimated_value,currency,verification_status,token_id';
+        this.historyFields = 'transaction_type,transaction_hash,status,created_at';
+        // Server-Sent Events stream for the current wallet; see subscribeEvents()
+        this.events = null;
+        this.eventsWallet = null;
+        // asset id -> 'verify' | 'tokenize' while a queued job is outstanding
+        this.pendingActions = {};
         this.init();
     }
 
@@ -73,8 +81,10 @@ class RWAApp {
                 this.showAlert('success', 'Asset submitted successfully!');
                 this.showFollowUpQuestions(result.follow_up_questions);
                 this.resetForm();
-                this.loadUserAssets();
-                this.loadStats();
+                // The new asset and counters arrive on the event stream
+                if (walletAddress !== this.eventsWallet) {
+                    this.loadUserAssets();
+                }
             } else {
                 this.showAlert('danger', `Error: ${result.error}`);
             }
@@ -91,30 +101,91 @@ class RWAApp {
         if (!walletAddress) return;
 
         try {
-            const response = await fetch(`${this.baseURL}/api/assets/${walletAddress}`);
+            const response = await fetch(`${this.baseURL}/api/assets/${walletAddress}?fields=${this.listFields}`);
             const result = await response.json();
             
             this.currentAssets = result.assets || [];
             this.renderAssets(this.currentAssets);
+            this.subscribeEvents(walletAddress);
         } catch (error) {
             console.error('Error loading assets:', error);
         }
     }
 
+    subscribeEvents(walletAddress) {
+        // One stream per wallet replaces re-fetching assets and stats after every action
+        if (this.events && this.eventsWallet === walletAddress) return;
+        if (this.events) this.events.close();
+
+        this.eventsWallet = walletAddress;
+        this.events = new EventSource(`${this.baseURL}/api/events?wallet=${walletAddress}`);
+
+        this.events.addEventListener('asset', (e) => {
+            this.upsertAsset(JSON.parse(e.data).asset);
+        });
+        this.events.addEventListener('verification', (e) => {
+            const event = JSON.parse(e.data);
+            this.upsertAsset(event.asset);
+            if (this.finishAction(event.asset_id, 'verify')) {
+                this.showVerificationResults(event.verification_result);
+            }
+        });
+        this.events.addEventListener('tokenization', (e) => {
+            const event = JSON.parse(e.data);
+            this.upsertAsset(event.asset);
+            if (this.finishAction(event.asset_id, 'tokenize')) {
+                this.showTokenizationResults(event.tokenization_result);
+            }
+        });
+        this.events.addEventListener('job', (e) => {
+            const event = JSON.parse(e.data);
+            if (event.status === 'failed' && this.finishAction(event.asset_id, event.kind)) {
+                const action = event.kind === 'verify' ? 'Verification' : 'Tokenization';
+                this.showAlert('danger', `${action} failed: ${event.error}`);
+            }
+        });
+        this.events.addEventListener('stats', (e) => {
+            this.renderStats(JSON.parse(e.data));
+        });
+        // Sent when the server no longer has the events missed while disconnected
+        this.events.addEventListener('reset', () => {
+            this.loadUserAssets();
+            this.loadStats();
+        });
+    }
+
+    upsertAsset(asset) {
+        const index = this.currentAssets.findIndex(existing => existing.id === asset.id);
+        if (index === -1) {
+            this.currentAssets.unshift(asset);
+        } else {
+            this.currentAssets[index] = { ...this.currentAssets[index], ...asset };
+        }
+        this.renderAssets(this.currentAssets);
+    }
+
+    finishAction(assetId, kind) {
+        if (this.pendingActions[assetId] !== kind) return false;
+        delete this.pendingActions[assetId];
+        return true;
+    }
+
     async loadStats() {
         try {
             const response = await fetch(`${this.baseURL}/api/stats`);
-            const stats = await response.json();
-            
-            document.getElementById('total-assets').textContent = stats.total_assets || 0;
-            document.getElementById('verified-assets').textContent = stats.verified_assets || 0;
-            document.getElementById('tokenized-assets').textContent = stats.tokenized_assets || 0;
-            document.getElementById('total-users').textContent = stats.total_users || 0;
+            this.renderStats(await response.json());
         } catch (error) {
             console.error('Error loading stats:', error);
         }
     }
 
+    renderStats(stats) {
+        document.getElementById('total-assets').textContent = stats.total_assets || 0;
+        document.getElementById('verified-assets').textContent = stats.verified_assets || 0;
+        document.getElementById('tokenized-assets').textContent = stats.tokenized_assets || 0;
+        document.getElementById('total-users').textContent = stats.total_users || 0;
+    }
+
     renderAssets(assets) {
         const assetsList = document.getElementById('assets-list');
         
@@ -151,7 +222,7 @@ class RWAApp {
 
     async showAssetDetails(assetId) {
         try {
-            const response = await fetch(`${this.baseURL}/api/asset/${assetId}`);
+            const response = await fetch(`${this.baseURL}/api/asset/${assetId}?fields=${this.historyFields}`);
             const result = await response.json();
             const asset = result.asset;
             const transactions = result.transactions || [];
@@ -218,10 +289,13 @@ class RWAApp {
 
             const result = await response.json();
 
-            if (result.success) {
+            if (response.status === 202) {
+                // Queued: the outcome arrives on the event stream
+                this.pendingActions[this.currentAsset.id] = 'verify';
+                this.showAlert('info', 'Request queued, the result will appear here shortly');
+                bootstrap.Modal.getInstance(document.getElementById('asset-modal')).hide();
+            } else if (result.success) {
                 this.showAlert('success', 'Asset verification completed!');
-                this.loadUserAssets();
-                this.loadStats();
                 
                 // Close modal and show results
                 bootstrap.Modal.getInstance(document.getElementById('asset-modal')).hide();
@@ -247,10 +321,13 @@ class RWAApp {
 
             const result = await response.json();
 
-            if (result.success) {
+            if (response.status === 202) {
+                // Queued: the outcome arrives on the event stream
+                this.pendingActions[this.currentAsset.id] = 'tokenize';
+                this.showAlert('info', 'Request queued, the result will appear here shortly');
+                bootstrap.Modal.getInstance(document.getElementById('asset-modal')).hide();
+            } else if (result.success) {
                 this.showAlert('success', 'Asset tokenized successfully!');
-                this.loadUserAssets();
-                this.loadStats();
                 
                 // Close modal and show results
                 bootstrap.Modal.getInstance(document.getElementById('asset-modal')).hide();
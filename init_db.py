@@ -4,18 +4,19 @@ import os
 # Add the root project path to sys.path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from app.main import app, db  # ✅ this works now!
+from app.main import create_app, create_schema, db
 
 from sqlalchemy import inspect
 
 try:
     print("🗄 Initializing database...")
 
+    app = create_app()
     with app.app_context():
         db.drop_all()
         print("📤 Dropped existing tables")
 
-        db.create_all()
+        create_schema()
         print("📥 Created new tables")
 
         inspector = inspect(db.engine)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import sys
+sys.path.append('.')
+
+from app.main import create_app, create_schema, db
+from app.models.migrations import (
+    add_missing_columns, backfill_user_buckets, backfill_verification_columns, migrate_wallet_addresses,
+)
+from app.models.portfolio import ensure_portfolio_rollups
+from app.models.search import ensure_search_index
+from app.models.sharding import each_shard
+from app.models.stats import ensure_stat_counters
+
+def migrate_database(app=None):
+    print("🚚 Migrating database schema...")
+
+    app = app or create_app()
+    with app.app_context():
+        try:
+            create_schema()
+
+            for shard in each_shard():
+                label = '' if shard is None else f"[shard {shard}] "
+
+                for model in db.Model.__subclasses__():
+                    for name in add_missing_columns(model):
+                        print(f"✅ {label}Added column: {model.__tablename__}.{name}")
+
+                for table in db.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(bind=db.session.get_bind(), checkfirst=True)
+
+                # Before the wallet merge, whose user count delta needs counters to apply to
+                counted = ensure_stat_counters(db.session.connection())
+                db.session.commit()
+                if counted:
+                    print(f"✅ {label}Counted {counted['total_users']} users and {counted['total_assets']} assets")
+
+                converted = migrate_wallet_addresses()
+                print(f"✅ {label}Converted {converted} wallet addresses to binary")
+
+                bucketed = backfill_user_buckets()
+                print(f"✅ {label}Assigned shard buckets to {bucketed} users")
+
+                filled = backfill_verification_columns()
+                print(f"✅ {label}Backfilled verification scores on {filled} transactions")
+
+                # Both read columns added above, so they come last
+                indexed = ensure_search_index(db.session.connection())
+                rolled_up = ensure_portfolio_rollups(db.session.connection())
+                db.session.commit()
+                print(f"✅ {label}Indexed {indexed} assets for search, built {rolled_up} portfolio rollups")
+
+            print("🎉 Migration complete!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    migrate_database()
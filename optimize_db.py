@@ -2,34 +2,46 @@
 import sys
 sys.path.append('.')
 
-from app.main import app, db
+from app.main import create_app, db
+from app.models.sharding import each_shard
 from sqlalchemy import text
 
+# Ad hoc indexes created by earlier versions of this script. They are covered
+# by the indexes declared on the models in app/models/database.py.
+LEGACY_INDEXES = [
+    'idx_assets_user_id',
+    'idx_assets_verification_status',
+    'idx_assets_token_id',
+    'idx_transactions_asset_id',
+    'idx_transactions_type',
+    'idx_users_wallet',
+    # Superseded by ix_asset_status_created
+    'ix_asset_verification_status',
+]
+
 def optimize_database():
     print("🔧 Optimizing database...")
 
+    app = create_app()
     with app.app_context():
         try:
-            indexes = [
-                "CREATE INDEX IF NOT EXISTS idx_assets_user_id ON asset(user_id);",
-                "CREATE INDEX IF NOT EXISTS idx_assets_verification_status ON asset(verification_status);",
-                "CREATE INDEX IF NOT EXISTS idx_assets_token_id ON asset(token_id);",
-                "CREATE INDEX IF NOT EXISTS idx_transactions_asset_id ON transaction(asset_id);",
-                "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transaction(transaction_type);",
-                "CREATE INDEX IF NOT EXISTS idx_users_wallet ON user(wallet_address);"
-            ]
-
-            for index_sql in indexes:
-                try:
-                    db.session.execute(text(index_sql))
-                    print(f"✅ Created index: {index_sql.split('idx_')[1].split(' ')[0]}")
-                except Exception as e:
-                    print(f"⚠️  Index creation skipped (may already exist): {e}")
-
-            db.session.commit()
-
-            db.session.execute(text("ANALYZE;"))
-            db.session.commit()
+            # create_all() only adds indexes for tables it creates, so bring
+            # existing databases (every shard, when sharded) up to date with
+            # the declared indexes.
+            for _ in each_shard():
+                for table in db.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(bind=db.session.get_bind(), checkfirst=True)
+                        print(f"✅ Index ready: {index.name}")
+
+                for name in LEGACY_INDEXES:
+                    db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+                    print(f"🧹 Dropped legacy index (if present): {name}")
+
+                db.session.commit()
+
+                db.session.execute(text("ANALYZE;"))
+                db.session.commit()
 
             print("🎉 Database optimization complete!")
 
@@ -1,31 +1,18 @@
-from app.main import app
-from app.models.database import db, User, Asset, Transaction
+import sys
+
+from app.main import create_app
+from app.models.export import TABLES, export_table
 
 def print_records():
+    """Print every table as NDJSON, streamed rather than loaded with .all()."""
+    app = create_app()
     with app.app_context():
-        print("=== USERS ===")
-        users = User.query.all()
-        if users:
-            for user in users:
-                print(user.to_dict())
-        else:
-            print("No users found.")
-
-        print("\n=== ASSETS ===")
-        assets = Asset.query.all()
-        if assets:
-            for asset in assets:
-                print(asset.to_dict())
-        else:
-            print("No assets found.")
-
-        print("\n=== TRANSACTIONS ===")
-        transactions = Transaction.query.all()
-        if transactions:
-            for tx in transactions:
-                print(tx.to_dict())
-        else:
-            print("No transactions found.")
+        for table in TABLES:
+            print(f"=== {table.upper()} ===")
+            sys.stdout.flush()
+            if not export_table(table, sys.stdout, 'ndjson'):
+                print(f"No {table} found.")
+            print()
 
 if __name__ == '__main__':
     print_records()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+from collections import Counter
+sys.path.append('.')
+
+from app.main import create_app
+from app.models.sharding import (
+    NUM_BUCKETS, bucket_for, load_bucket_map, move_bucket, plan_rebalance, shard_count, sharding_enabled,
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect and rebalance wallet shards while the app is running')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--move', nargs=2, type=int, metavar=('BUCKET', 'SHARD'),
+                        help=f'move one bucket (0-{NUM_BUCKETS - 1}) to a shard')
+    action.add_argument('--wallet', nargs=2, metavar=('ADDRESS', 'SHARD'),
+                        help="move the bucket holding a wallet to a shard")
+    action.add_argument('--spread', action='store_true',
+                        help='move buckets until every configured shard holds an even share')
+    parser.add_argument('--dry-run', action='store_true', help='print the moves without making them')
+    return parser.parse_args(argv)
+
+def print_layout():
+    owners = Counter(shard for shard, _ in load_bucket_map().values())
+    for shard in range(shard_count()):
+        print(f"  shard {shard}: {owners.get(shard, 0)} buckets")
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if not sharding_enabled():
+            print("❌ Sharding is not enabled (set DATABASE_SHARD_URLS)")
+            sys.exit(1)
+
+        try:
+            if args.move:
+                moves = [tuple(args.move)]
+            elif args.wallet:
+                moves = [(bucket_for(args.wallet[0]), int(args.wallet[1]))]
+            elif args.spread:
+                moves = plan_rebalance(load_bucket_map(), shard_count())
+            else:
+                moves = []
+
+            print(f"🧭 {len(moves)} bucket move(s) planned")
+            for bucket, target in moves:
+                if args.dry_run:
+                    print(f"  bucket {bucket} -> shard {target}")
+                    continue
+                moved = move_bucket(bucket, target)
+                print(f"✅ bucket {bucket} -> shard {target}: "
+                      f"{moved.get('users', 0)} users, {moved.get('assets', 0)} assets, "
+                      f"{moved.get('transactions', 0)} transactions, "
+                      f"{moved.get('archive_entries', 0)} archived asset histories")
+
+            print("📊 Bucket layout:")
+            print_layout()
+
+        except Exception as e:
+            print(f"❌ Rebalance failed: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
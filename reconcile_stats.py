@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+import sys
+sys.path.append('.')
+
+from app.main import create_app, db
+from app.models.portfolio import rebuild_portfolio_rollups
+from app.models.sharding import each_shard
+from app.models.stats import reconcile_counters
+
+def reconcile_stats():
+    print("🧮 Rebuilding /api/stats counters and portfolio rollups...")
+
+    app = create_app()
+    with app.app_context():
+        try:
+            counts = reconcile_counters()
+            for name, value in counts.items():
+                print(f"✅ {name}: {value}")
+
+            rollups = 0
+            for _ in each_shard():
+                rollups += rebuild_portfolio_rollups(db.session.connection())
+                db.session.commit()
+            print(f"✅ portfolio rollups: {rollups} rows")
+            print("🎉 Stats counters reconciled!")
+
+        except Exception as e:
+            print(f"❌ Reconcile failed: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    reconcile_stats()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+sys.path.append('.')
+
+from app.main import create_app
+from app.models.jobs import create_job_table, job_queue_enabled
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run verify/tokenize jobs outside the web workers')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='jobs to run at once in this process (default: JOB_WORKERS)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app()
+    workers = args.workers or app.config['JOB_WORKERS'] or 2
+
+    with app.app_context():
+        if not job_queue_enabled():
+            print("❌ The job queue is disabled (JOB_QUEUE=false)")
+            sys.exit(1)
+        create_job_table()
+
+    pool = app.extensions['jobs']
+    print(f"⚙️ Running jobs with {workers} workers, Ctrl+C to stop...")
+    try:
+        pool.start(workers)
+        pool.join()
+    except KeyboardInterrupt:
+        print("🛑 Stopping, waiting for running jobs to finish...")
+        pool.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from datetime import datetime
+sys.path.append('.')
+
+from sqlalchemy import text
+
+from app.main import create_app, create_schema, db
+from app.models.seed import DEFAULT_BATCH_SIZE, SeedGenerator, load
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load a deterministic synthetic dataset for performance testing')
+    parser.add_argument('--users', type=int, default=1000, help='number of wallets to generate')
+    parser.add_argument('--assets-per-user', type=float, default=5.0,
+                        help='mean assets per wallet (heavy-tailed)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=datetime.fromisoformat, default=datetime(2025, 1, 1),
+                        help='latest timestamp in the dataset')
+    parser.add_argument('--days', type=int, default=730, help='days of history before --end')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--fast', action='store_true',
+                        help='SQLite only: trade crash safety for load speed (WAL, synchronous=OFF)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    generator = SeedGenerator(
+        seed=args.seed, users=args.users, end=args.end, days=args.days,
+        mean_assets_per_user=args.assets_per_user,
+    )
+
+    print(f"🌱 Seeding {args.users} wallets (seed {args.seed})...")
+    started = time.time()
+
+    def progress(totals):
+        elapsed = time.time() - started
+        rows = sum(totals.values())
+        print(f"  {totals['user']} users, {totals['asset']} assets, {totals['transaction']} transactions "
+              f"({rows / max(elapsed, 1e-6):,.0f} rows/s)", end='\r')
+
+    app = create_app()
+    with app.app_context():
+        try:
+            create_schema()
+            if args.fast and db.engine.dialect.name == 'sqlite':
+                db.session.execute(text('PRAGMA journal_mode=WAL'))
+                db.session.execute(text('PRAGMA synchronous=OFF'))
+
+            totals = load(generator, args.batch_size, progress)
+            print(f"\n✅ Loaded {totals['user']} users, {totals['asset']} assets, "
+                  f"{totals['transaction']} transactions in {time.time() - started:.1f}s")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Seeding failed: {e}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
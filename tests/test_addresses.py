@@ -0,0 +1,53 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models.addresses import InvalidWalletAddress, keccak256, normalize_address, to_checksum_address
+from app.models.database import db, User
+
+# Test vectors from EIP-55
+CHECKSUMMED = [
+    '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed',
+    '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359',
+    '0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB',
+    '0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb',
+]
+
+
+def test_keccak256():
+    assert keccak256(b'').hex() == 'c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470'
+
+
+@pytest.mark.parametrize('address', CHECKSUMMED)
+def test_checksum_address(address):
+    assert to_checksum_address(address.lower()) == address
+    assert to_checksum_address(normalize_address(address.upper().replace('0X', '0x'))) == address
+
+
+@pytest.mark.parametrize('value', ['', '0x', '5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed',
+                                   '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeZ', b'\x00' * 19, None])
+def test_invalid_addresses(value):
+    with pytest.raises(InvalidWalletAddress):
+        normalize_address(value)
+
+
+def test_stored_as_twenty_bytes():
+    """Any casing finds the row; it is stored and returned as raw bytes"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(wallet_address=CHECKSUMMED[0]))
+        db.session.commit()
+        db.session.expire_all()
+
+        user = User.query.filter_by(wallet_address=CHECKSUMMED[0].lower()).one()
+        assert user.wallet_address == bytes.fromhex(CHECKSUMMED[0][2:])
+        assert user.to_dict()['wallet_address'] == CHECKSUMMED[0]
+        assert db.session.execute(db.text('SELECT length(wallet_address) FROM user')).scalar() == 20
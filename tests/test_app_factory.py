@@ -0,0 +1,43 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import create_app, create_schema
+from app.models.database import db
+from config import TestingConfig
+
+
+def test_create_app_has_no_import_side_effects(tmp_path):
+    """Building the app does not touch the database; create_schema does"""
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'factory.db'}"
+
+    app = create_app(Settings)
+    assert 'api.asset_intake' in app.view_functions
+    assert not (tmp_path / 'factory.db').exists()
+
+    with app.app_context():
+        create_schema()
+        assert 'asset' in db.inspect(db.engine).get_table_names()
+
+
+def test_apps_are_independent(tmp_path):
+    """Each call builds its own app with its own configuration"""
+    first = create_app('testing')
+    second = create_app('testing')
+    assert first is not second
+    assert first.extensions['jobs'] is not second.extensions['jobs']
+    assert first.config['TESTING'] and not first.config['JOB_QUEUE_ENABLED']
+
+
+def test_init_db_command(tmp_path):
+    """``flask init-db`` creates the tables"""
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'cli.db'}"
+
+    app = create_app(Settings)
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert 'asset' in db.inspect(db.engine).get_table_names()
@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models.database import db, User, Asset, Transaction, ArchiveSegment
+from app.models.archive import archive_transactions, read_archived_transactions
+
+NOW = datetime(2025, 6, 15)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def make_history():
+    user = User(wallet_address='0x742d35Cc6e34d8d7C15fE14c123456789abcdef0')
+    db.session.add(user)
+    db.session.flush()
+
+    assets = []
+    for asset_type in ('vehicle', 'artwork'):
+        asset = Asset(user_id=user.id, asset_type=asset_type, description='desc',
+                      estimated_value=1000, location='Texas')
+        db.session.add(asset)
+        assets.append(asset)
+    db.session.flush()
+
+    for asset in assets:
+        for month in (1, 2, 3, 7):
+            db.session.add(Transaction(
+                asset_id=asset.id,
+                transaction_type='verification',
+                status='verified',
+                details_data={'overall_score': 0.8, 'month': month},
+                created_at=datetime(2024, month, 10),
+            ))
+    db.session.commit()
+    return assets
+
+
+def test_old_transactions_move_to_monthly_segments(app, tmp_path):
+    vehicle, artwork = make_history()
+    expected = [tx.to_dict() for tx in Transaction.query.filter_by(asset_id=vehicle.id)
+                .order_by(Transaction.created_at.desc()).all()
+                if tx.created_at < datetime(2024, 7, 1)]
+
+    segments = archive_transactions(older_than_days=365, archive_dir=str(tmp_path), now=NOW)
+
+    assert [s.period for s in segments] == ['2024-01', '2024-02', '2024-03']
+    assert all(s.row_count == 2 for s in segments)
+    assert ArchiveSegment.query.count() == 3
+
+    # July is newer than the cutoff and stays live
+    assert Transaction.query.count() == 2
+    assert read_archived_transactions(vehicle.id) == expected
+    assert [tx['details']['month'] for tx in read_archived_transactions(artwork.id)] == [3, 2, 1]
+
+
+def test_archiving_is_repeatable(app, tmp_path):
+    make_history()
+    archive_transactions(older_than_days=365, archive_dir=str(tmp_path), now=NOW)
+
+    assert archive_transactions(older_than_days=365, archive_dir=str(tmp_path), now=NOW) == []
+    assert read_archived_transactions(999) == []
@@ -0,0 +1,142 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+pytest.importorskip('starlette')
+pytest.importorskip('a2wsgi')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient
+
+from app.asgi import create_asgi_app
+from app.main import create_schema
+from app.models.database import db, User, Asset, Transaction
+from app.models.jobs import enqueue
+from config import TestingConfig
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+OTHER_WALLET = '0x1111111111111111111111111111111111111111'
+
+
+@pytest.fixture
+def clients(tmp_path):
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'asgi.db'}"
+        COMPRESS_MIN_SIZE = 200
+
+    asgi_app = create_asgi_app(Settings)
+    flask_app = asgi_app.state.flask_app
+
+    with flask_app.app_context():
+        create_schema()
+        user = User(wallet_address=WALLET, email='owner@example.com')
+        db.session.add(user)
+        db.session.flush()
+        start = datetime(2024, 1, 1)
+        for index in range(3):
+            asset = Asset(user_id=user.id, asset_type='vehicle', description=f'Sedan {index}',
+                          estimated_value=20000 + index, location='Austin, TX',
+                          created_at=start + timedelta(days=index), updated_at=start + timedelta(days=index))
+            asset.requirements_data = {'confidence_score': 0.9}
+            db.session.add(asset)
+        db.session.flush()
+        for index in range(4):
+            tx = Transaction(asset_id=1, transaction_type='verification', status='verified',
+                             created_at=start + timedelta(hours=index))
+            tx.details_data = {'status': 'verified', 'verification_score': 0.8}
+            db.session.add(tx)
+        db.session.commit()
+        enqueue('verify', 1)
+
+    # httpx asks for gzip by default; the Flask test client asks for nothing
+    with TestClient(asgi_app, headers={'Accept-Encoding': 'identity'}) as asgi_client:
+        yield flask_app.test_client(), asgi_client
+
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+PARITY_URLS = [
+    '/health',
+    '/api/asset/1',
+    '/api/asset/1?limit=2',
+    '/api/asset/1?fields=transaction_type,status,created_at',
+    '/api/asset/1?history=full',
+    '/api/asset/99',
+    '/api/asset/1?cursor=not-a-cursor',
+    '/api/asset/1?fields=nope',
+    f'/api/assets/{WALLET}',
+    f'/api/assets/{WALLET}?limit=1',
+    f'/api/assets/{WALLET}?fields=id,asset_type',
+    f'/api/assets/{OTHER_WALLET}',
+    '/api/assets/not-a-wallet',
+    '/api/stats',
+    '/api/jobs/1',
+    '/api/jobs/99',
+]
+
+
+@pytest.mark.parametrize('url', PARITY_URLS)
+def test_read_routes_match_flask(clients, url):
+    """Async routes answer with the Flask routes' status, body and validators"""
+    flask_client, asgi_client = clients
+    expected = flask_client.get(url)
+    actual = asgi_client.get(url)
+
+    assert actual.status_code == expected.status_code
+    assert actual.headers['content-type'] == expected.headers['Content-Type']
+    assert actual.json() == expected.get_json()
+    assert actual.headers.get('etag') == expected.headers.get('ETag')
+    assert actual.headers.get('last-modified') == expected.headers.get('Last-Modified')
+
+
+def test_pages_follow_cursors_like_flask(clients):
+    flask_client, asgi_client = clients
+    url = f'/api/assets/{WALLET}?limit=1'
+    while url:
+        expected = flask_client.get(url).get_json()
+        assert asgi_client.get(url).json() == expected
+        url = f"/api/assets/{WALLET}?limit=1&cursor={expected['next_cursor']}" if expected['next_cursor'] else None
+
+
+def test_ndjson_streams_match_flask(clients):
+    flask_client, asgi_client = clients
+    for url in ('/api/asset/1?format=ndjson', '/api/asset/1?format=ndjson&history=full',
+                f'/api/assets/{WALLET}?format=ndjson', f'/api/assets/{OTHER_WALLET}?format=ndjson'):
+        expected = flask_client.get(url)
+        actual = asgi_client.get(url)
+        assert actual.headers['content-type'] == expected.headers['Content-Type']
+        assert actual.text.splitlines() == expected.get_data(as_text=True).splitlines()
+
+
+def test_conditional_and_compressed_reads(clients):
+    """A Flask ETag revalidates against the async route, compressed copies included"""
+    flask_client, asgi_client = clients
+    url = f'/api/assets/{WALLET}'
+    etag = flask_client.get(url).headers['ETag']
+    revalidated = asgi_client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['etag'] == etag
+
+    expected = flask_client.get(url, headers={'Accept-Encoding': 'gzip'})
+    actual = asgi_client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert expected.headers['Content-Encoding'] == actual.headers['content-encoding'] == 'gzip'
+    assert actual.headers['etag'] == expected.headers['ETag']
+    assert asgi_client.get(url, headers={'If-None-Match': actual.headers['etag']}).status_code == 304
+
+
+def test_writes_go_through_flask(clients):
+    """Routes without an async twin, such as verify, are served by the Flask app"""
+    flask_client, asgi_client = clients
+    response = asgi_client.post('/api/verify/2')
+    assert response.status_code == 200
+    assert response.json()['asset']['id'] == 2
+
+    status = response.json()['asset']['verification_status']
+    assert asgi_client.get('/api/asset/2').json()['asset']['verification_status'] == status
+    assert asgi_client.post('/api/verify/99').status_code == 500
@@ -0,0 +1,197 @@
+import pytest
+import sys
+import os
+import shutil
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models import audit
+from app.models.audit import JOURNAL, MEMORY, audit_buffer, init_audit, record_transaction
+from app.models.database import db, User, Asset, Transaction
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+RESULT = {
+    'status': 'verified', 'overall_score': 0.82, 'ruleset_version': '1.0',
+    'breakdown': {'basic_info': 0.9, 'value_assessment': 0.8, 'compliance': 0.7, 'asset_specific': 0.85},
+}
+
+
+def make_app(tmp_path, mode='sync', **config):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'audit.db'}"
+    app.config['AUDIT_WRITE_MODE'] = mode
+    app.config['AUDIT_JOURNAL_DIR'] = str(tmp_path / 'journal')
+    app.config.update(config)
+    db.init_app(app)
+    init_audit(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(wallet_address=WALLET)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Asset(user_id=user.id, asset_type='vehicle', description='2019 sedan',
+                             estimated_value=20000, location='Texas'))
+        db.session.commit()
+    return app
+
+
+def transaction_count():
+    return db.session.query(Transaction).count()
+
+
+def journals(journal_dir):
+    return sorted(name for name in os.listdir(journal_dir) if name.endswith('.ndjson'))
+
+
+def test_sync_mode_writes_in_the_request_transaction(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        assert audit_buffer() is None
+        record_transaction(1, 'verification', 'verified', RESULT)
+        db.session.commit()
+
+        transaction = db.session.query(Transaction).one()
+        assert transaction.verification_score == 0.82
+        assert transaction.details_data == RESULT
+
+
+def test_memory_mode_queues_after_commit_and_flushes_in_bulk(tmp_path):
+    app = make_app(tmp_path, MEMORY)
+    with app.app_context():
+        db.session.get(Asset, 1)
+        record_transaction(1, 'verification', 'verified', RESULT)
+        db.session.rollback()
+        assert len(audit_buffer()) == 0
+
+        record_transaction(1, 'verification', 'verified', RESULT)
+        record_transaction(1, 'tokenization', 'completed', {'token_id': 'RWA_1'}, transaction_hash='0xabc')
+        db.session.commit()
+        assert len(audit_buffer()) == 2
+        assert transaction_count() == 0
+
+        assert audit_buffer().flush() == 2
+        rows = db.session.query(Transaction).order_by(Transaction.id).all()
+        assert [row.transaction_type for row in rows] == ['verification', 'tokenization']
+        assert rows[0].compliance_score == 0.7
+        assert rows[1].transaction_hash == '0xabc'
+        assert rows[1].verification_score is None
+
+
+def test_memory_retry_keeps_the_batch_id(tmp_path):
+    app = make_app(tmp_path, MEMORY)
+    buffer = app.extensions['audit_buffer']
+    insert = buffer._insert
+    batches = []
+
+    def insert_then_fail(batch, rows):
+        # The rows commit but the connection drops before the flush hears so
+        batches.append(batch)
+        insert(batch, rows)
+        raise ConnectionError("connection lost")
+
+    with app.app_context():
+        record_transaction(1, 'verification', 'verified', RESULT)
+        db.session.commit()
+        buffer._insert = insert_then_fail
+        with pytest.raises(ConnectionError):
+            buffer.flush()
+        assert len(buffer) == 1
+
+        buffer._insert = insert
+        record_transaction(1, 'tokenization', 'completed', {'token_id': 'RWA_1'})
+        db.session.commit()
+        assert buffer.flush() == 2
+        assert len(buffer) == 0
+        # The retried batch was recognised as inserted already
+        assert [row.transaction_type for row in db.session.query(Transaction).order_by(Transaction.id)] == [
+            'verification', 'tokenization',
+        ]
+
+
+def test_flush_thread_starts_on_size(tmp_path):
+    app = make_app(tmp_path, MEMORY, AUDIT_FLUSH_ROWS=2, AUDIT_FLUSH_SECONDS=60)
+    with app.app_context():
+        audit_buffer().start()
+        for _ in range(2):
+            record_transaction(1, 'verification', 'verified', RESULT)
+        db.session.commit()
+
+        deadline = time.monotonic() + 5
+        while transaction_count() < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert transaction_count() == 2
+
+
+def test_journal_of_a_dead_process_is_replayed_once(tmp_path):
+    app = make_app(tmp_path, JOURNAL)
+    with app.app_context():
+        record_transaction(1, 'verification', 'verified', RESULT)
+        db.session.commit()
+
+    # Simulate a crash: the journal stays behind under an owner whose lock is gone
+    journal_dir = tmp_path / 'journal'
+    (active,) = [name for name in os.listdir(journal_dir) if name.startswith('active-')]
+    batch = active.rsplit('-', 1)[1]
+    os.replace(journal_dir / active, journal_dir / f"active-deadbeef-{batch}")
+    (journal_dir / 'owner-deadbeef.lock').touch()
+    saved = tmp_path / 'saved.ndjson'
+    shutil.copy(journal_dir / f"active-deadbeef-{batch}", saved)
+
+    with app.app_context():
+        assert audit_buffer().recover() == 1
+        assert journals(journal_dir) == []
+        assert db.session.query(Transaction).one().verification_score == 0.82
+
+        # A journal whose rows were already inserted is skipped, not duplicated
+        shutil.copy(saved, journal_dir / f"sealed-{batch}")
+        audit_buffer().recover()
+        assert transaction_count() == 1
+        assert journals(journal_dir) == []
+
+
+def test_journal_mode_needs_file_locks(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, '_fcntl', lambda: None)
+    with pytest.raises(ValueError):
+        make_app(tmp_path, JOURNAL)
+    # The other modes never lock anything
+    make_app(tmp_path, MEMORY)
+
+
+def test_journal_of_a_live_process_is_left_alone(tmp_path):
+    fcntl = pytest.importorskip('fcntl')
+    app = make_app(tmp_path, JOURNAL)
+    journal_dir = tmp_path / 'journal'
+    os.makedirs(journal_dir)
+    (journal_dir / 'active-cafe-0123.ndjson').write_text('')
+    # Another worker holds its lock, whatever pid it has
+    with open(journal_dir / 'owner-cafe.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with app.app_context():
+            assert audit_buffer().recover() == 0
+        assert journals(journal_dir) == ['active-cafe-0123.ndjson']
+
+    with app.app_context():
+        audit_buffer().recover()
+    assert journals(journal_dir) == []
+    assert not (journal_dir / 'owner-cafe.lock').exists()
+
+
+def test_journal_is_kept_when_the_flush_fails(tmp_path):
+    app = make_app(tmp_path, JOURNAL)
+    with app.app_context():
+        record_transaction(1, 'verification', 'verified', RESULT)
+        db.session.commit()
+        db.session.execute(db.text('DROP TABLE audit_flush'))
+        db.session.commit()
+
+        with pytest.raises(Exception):
+            audit_buffer().flush()
+        assert [name.split('-')[0] for name in journals(tmp_path / 'journal')] == ['sealed']
+
+        db.create_all()
+        assert audit_buffer().recover() == 1
+        assert transaction_count() == 1
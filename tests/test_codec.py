@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+
+from app import codec
+from app.models.database import Asset
+
+
+@pytest.fixture(autouse=True)
+def restore_codec():
+    yield
+    codec.use_codec('auto')
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson'])
+def test_round_trip(name):
+    """Both codecs read back what they wrote"""
+    if name == 'orjson':
+        pytest.importorskip('orjson')
+    codec.use_codec(name)
+    value = {'confidence_score': 0.75, 'entities': [{'text': 'Mumbai', 'label': 'GPE'}], 'note': '₹ 2 crore'}
+    assert codec.loads(codec.dumps(value)) == value
+    assert codec.loads(None) == {}
+
+
+def test_unknown_codec_rejected():
+    with pytest.raises(ValueError):
+        codec.use_codec('yaml')
+
+
+def test_blob_decoded_only_when_included():
+    """to_dict leaves the requirements blob alone unless it is requested"""
+    asset = Asset(requirements='not json')
+    asset.created_at = asset.updated_at = datetime(2024, 1, 1)
+    assert 'requirements' not in asset.to_dict(include_requirements=False)
+
+    asset.requirements_data = {'confidence_score': 1.0}
+    assert asset.to_dict()['requirements'] == {'confidence_score': 1.0}
+
+
+def test_flask_responses_use_codec():
+    app = Flask(__name__)
+    app.json = codec.CodecJSONProvider(app)
+
+    with app.test_request_context():
+        response = jsonify({'status': 'healthy', 'count': 2})
+    assert response.get_json() == {'status': 'healthy', 'count': 2}
@@ -0,0 +1,102 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from werkzeug.http import http_date
+
+from app.models.addresses import normalize_address
+from app.models.conditional import asset_validators, not_modified, wallet_validators, with_validators
+from app.models.database import db, User, Asset, Transaction
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'conditional.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(wallet_address=WALLET)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Asset(user_id=user.id, asset_type='vehicle', description='2019 sedan',
+                             estimated_value=20000, location='Texas'))
+        db.session.commit()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_asset_etag_follows_updates_and_history(app):
+    with app.test_request_context('/api/asset/1'):
+        etag, last_modified = asset_validators(1, 'json')
+        assert asset_validators(2, 'json') is None
+        assert asset_validators(1, 'json')[0] == etag
+        assert asset_validators(1, 'ndjson')[0] != etag
+
+        asset = db.session.get(Asset, 1)
+        asset.verification_status = 'verified'
+        db.session.commit()
+        assert asset.version == 2
+        updated, _ = asset_validators(1, 'json')
+        assert updated != etag
+
+        later = datetime.utcnow() + timedelta(minutes=5)
+        db.session.add(Transaction(asset_id=1, transaction_type='verification', status='verified',
+                                   created_at=later))
+        db.session.commit()
+        recorded, recorded_at = asset_validators(1, 'json')
+        assert recorded != updated
+        assert recorded_at == later
+
+
+def test_unchanged_asset_answers_304(app):
+    with app.test_request_context('/api/asset/1'):
+        validators = asset_validators(1, 'json')
+        response = with_validators(app.response_class('{}'), validators)
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/')
+        assert response.headers['Cache-Control'] in ('private, no-cache', 'no-cache, private')
+
+    with app.test_request_context('/api/asset/1', headers={'If-None-Match': etag}):
+        cached = not_modified(asset_validators(1, 'json'))
+        assert cached.status_code == 304
+        assert cached.headers['ETag'] == etag
+        assert cached.get_data() == b''
+
+    with app.test_request_context('/api/asset/1', headers={'If-None-Match': '"stale"'}):
+        assert not_modified(asset_validators(1, 'json')) is None
+
+    since = http_date(datetime.utcnow() + timedelta(minutes=1))
+    with app.test_request_context('/api/asset/1', headers={'If-Modified-Since': since}):
+        assert not_modified(asset_validators(1, 'json')).status_code == 304
+
+
+def test_wallet_etag_covers_assets_and_query(app):
+    wallet = normalize_address(WALLET)
+    with app.test_request_context(f'/api/assets/{WALLET}'):
+        etag, _ = wallet_validators(wallet, 'json')
+        unknown, last_modified = wallet_validators(normalize_address('0x' + '00' * 20), 'json')
+        assert unknown != etag and last_modified is None
+
+        db.session.add(Asset(user_id=1, asset_type='real_estate', description='condo',
+                             estimated_value=250000, location='Austin'))
+        db.session.commit()
+        added, _ = wallet_validators(wallet, 'json')
+        assert added != etag
+
+        db.session.get(Asset, 1).token_id = 'RWA_1'
+        db.session.commit()
+        assert wallet_validators(wallet, 'json')[0] != added
+
+    with app.test_request_context(f'/api/assets/{WALLET}?limit=1'):
+        assert wallet_validators(wallet, 'json')[0] != added
@@ -0,0 +1,139 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.main import create_app, create_schema
+from app.models.addresses import normalize_address
+from app.models.database import db, AssetEvent, User
+from app.models.events import (
+    Event, EventBroker, Subscription, event_broker, init_events, queue_event, stream_events,
+)
+from config import TestingConfig
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+OTHER_WALLET = '0x0000000000000000000000000000000000000001'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'events.db'}"
+    app.config['EVENTS_REPLAY_SIZE'] = 3
+    db.init_app(app)
+    init_events(app)
+
+    with app.app_context():
+        db.create_all()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_subscriptions_filter_by_wallet_and_asset():
+    broker = EventBroker()
+    by_wallet = Subscription(wallet_address=normalize_address(WALLET))
+    by_asset = Subscription(asset_id=2)
+    broker.subscribe(by_wallet)
+    broker.subscribe(by_asset)
+
+    broker.emit('asset', 1, normalize_address(WALLET), {'asset': {'id': 1}})
+    broker.emit('asset', 2, normalize_address(OTHER_WALLET), {'asset': {'id': 2}})
+
+    events, stats_changed = by_wallet.wait(0)
+    assert [event.asset_id for event in events] == [1]
+    assert stats_changed
+    events, stats_changed = by_asset.wait(0)
+    assert [event.asset_id for event in events] == [2]
+    assert by_asset.wait(0) == ([], False)
+
+
+def test_reconnect_replays_missed_events_until_they_age_out():
+    broker = EventBroker(replay_size=3)
+    for asset_id in range(1, 5):
+        broker.emit('asset', asset_id)
+
+    assert [event.id for event in broker.subscribe(Subscription(), last_event_id=2)] == [3, 4]
+    assert broker.subscribe(Subscription(), last_event_id=4) == []
+    # Event 1 has been evicted, so a client that stopped at 0 must reload
+    assert broker.subscribe(Subscription(), last_event_id=0) is None
+
+
+def test_committed_events_go_through_the_outbox(app):
+    with app.app_context():
+        relay = app.extensions['events_relay']
+        relay.poll()
+        subscription = Subscription(wallet_address=normalize_address(WALLET))
+        event_broker().subscribe(subscription)
+
+        db.session.add(User(wallet_address=WALLET))
+        queue_event('asset', 1, WALLET, {'asset': {'id': 1}})
+        db.session.rollback()
+
+        queue_event('asset', 7, WALLET, {'asset': {'id': 7}})
+        db.session.add(User(wallet_address=WALLET))
+        db.session.commit()
+        assert db.session.query(AssetEvent).count() == 1
+
+        assert relay.poll() == 1
+        (event,), _ = subscription.wait(0)
+        assert (event.type, event.asset_id, event.data) == ('asset', 7, {'asset': {'id': 7}})
+        assert event.id == db.session.query(AssetEvent.id).scalar()
+
+
+def test_relay_picks_up_events_that_commit_out_of_order(app):
+    with app.app_context():
+        relay = app.extensions['events_relay']
+        relay.poll()
+        subscription = Subscription()
+        event_broker().subscribe(subscription)
+
+        # Event 2 commits first; event 1 was allocated earlier but commits later
+        db.session.add(AssetEvent(id=2, event_type='asset', asset_id=2))
+        db.session.commit()
+        assert relay.poll() == 1
+        db.session.add(AssetEvent(id=1, event_type='asset', asset_id=1))
+        db.session.commit()
+        assert relay.poll() == 1
+        assert relay.poll() == 0
+
+        events, _ = subscription.wait(0)
+        assert [event.id for event in events] == [2, 1]
+
+
+def test_stream_formats_events_and_ends():
+    broker = EventBroker(replay_size=1)
+    broker.emit('asset', 1, normalize_address(WALLET), {'asset': {'id': 1}})
+    broker.emit('verification', 1, normalize_address(WALLET), {'asset': {'id': 1}})
+
+    messages = list(stream_events(broker, Subscription(), 1, lambda: {'total_assets': 1}, max_seconds=0))
+    assert messages[0].startswith('retry:')
+    assert messages[1].startswith('id: 2\nevent: verification\ndata: ')
+    assert f'"wallet_address":"{WALLET.lower()}"' in messages[1].replace(' ', '').lower()
+    assert len(broker) == 0
+
+    messages = list(stream_events(broker, Subscription(), 0, dict, max_seconds=0))
+    assert messages[1].startswith('event: reset')
+
+
+def test_events_route_rejects_a_bad_filter(tmp_path):
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'routes.db'}"
+
+    app = create_app(Settings)
+    with app.app_context():
+        create_schema()
+    client = app.test_client()
+
+    response = client.get('/api/events?asset=abc')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid asset: abc'}
+    assert client.get('/api/events?wallet=nope').status_code == 400
+
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,78 @@
+import pytest
+import sys
+import os
+import csv
+import io
+import json
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models.database import db, User, Asset, Transaction
+from app.models.export import export_table
+
+WALLETS = ['0x742d35Cc6e34d8d7C15fE14c123456789abcdef0', '0x0000000000000000000000000000000000000001']
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        for n, wallet in enumerate(WALLETS):
+            user = User(wallet_address=wallet, created_at=datetime(2024, 1, 1))
+            db.session.add(user)
+            db.session.flush()
+            for day in range(1, 4):
+                asset = Asset(user_id=user.id, asset_type='commodity', description='gold bars',
+                              estimated_value=1000.0 * day, location='Singapore',
+                              requirements_data={'confidence_score': 0.5 * n},
+                              created_at=datetime(2024, 2, day))
+                db.session.add(asset)
+                db.session.flush()
+                db.session.add(Transaction(asset_id=asset.id, transaction_type='verification',
+                                           status='verified', details_data={'day': day},
+                                           created_at=datetime(2024, 2, day)))
+        db.session.commit()
+        yield app
+
+
+def test_ndjson_streams_in_batches(app):
+    out = io.StringIO()
+    assert export_table('transactions', out, 'ndjson', batch_size=2) == 6
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row['id'] for row in rows] == [1, 2, 3, 4, 5, 6]
+    assert rows[0]['details'] == {'day': 1}
+    assert rows[0]['created_at'] == '2024-02-01T00:00:00'
+
+
+def test_csv_filters_by_wallet_and_time(app):
+    out = io.StringIO()
+    count = export_table('assets', out, 'csv', wallet=WALLETS[1],
+                         since=datetime(2024, 2, 2), until=datetime(2024, 2, 3))
+    assert count == 1
+
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert rows[0]['estimated_value'] == '2000.0'
+    assert json.loads(rows[0]['requirements']) == {'confidence_score': 0.5}
+
+
+def test_transactions_filter_by_wallet(app):
+    assert export_table('transactions', io.StringIO(), 'ndjson', wallet=WALLETS[0]) == 3
+    assert export_table('users', io.StringIO(), 'ndjson', wallet='0x' + 'f' * 40) == 0
+
+
+def test_parquet_row_groups(app):
+    pq = pytest.importorskip('pyarrow.parquet')
+    out = io.BytesIO()
+    assert export_table('assets', out, 'parquet', batch_size=4) == 6
+
+    parquet = pq.ParquetFile(io.BytesIO(out.getvalue()))
+    assert parquet.metadata.num_rows == 6
+    assert parquet.metadata.num_row_groups == 2
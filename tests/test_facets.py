@@ -0,0 +1,132 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from werkzeug.datastructures import MultiDict
+
+from app.main import create_app, create_schema
+from app.models.database import db, User, Asset
+from app.models.facets import InvalidAssetQuery, parse_filters
+from config import TestingConfig
+
+US_WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+UK_WALLET = '0x1111111111111111111111111111111111111111'
+
+# (wallet, asset_type, value, status, tokenized, days after the start)
+ASSETS = [
+    (US_WALLET, 'vehicle', 20000, 'verified', True, 0),
+    (US_WALLET, 'vehicle', 120000, 'verified', True, 1),
+    (US_WALLET, 'vehicle', 600000, 'verified', False, 2),
+    (US_WALLET, 'real_estate', 450000, 'pending', False, 3),
+    (UK_WALLET, 'vehicle', 80000, 'verified', True, 4),
+    (UK_WALLET, 'art', 300000, 'rejected', False, 5),
+]
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def client(tmp_path):
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'facets.db'}"
+
+    app = create_app(Settings)
+    with app.app_context():
+        create_schema()
+        users = {
+            US_WALLET: User(wallet_address=US_WALLET, jurisdiction='US'),
+            UK_WALLET: User(wallet_address=UK_WALLET, jurisdiction='UK'),
+        }
+        db.session.add_all(users.values())
+        db.session.flush()
+        for index, (wallet, asset_type, value, status, tokenized, days) in enumerate(ASSETS):
+            created_at = START + timedelta(days=days)
+            db.session.add(Asset(
+                user_id=users[wallet].id, asset_type=asset_type, description=f'Asset {index}',
+                estimated_value=value, location='Somewhere', verification_status=status,
+                token_id=f'token-{index}' if tokenized else None,
+                created_at=created_at, updated_at=created_at,
+            ))
+        db.session.commit()
+
+    yield app.test_client()
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def values(bucket_list):
+    return {bucket['value']: bucket['count'] for bucket in bucket_list}
+
+
+def test_filters_combine(client):
+    body = client.get(
+        '/api/assets?asset_type=vehicle&verification_status=verified'
+        '&min_value=50000&max_value=500000&jurisdiction=us'
+    ).get_json()
+    assert [asset['estimated_value'] for asset in body['assets']] == [120000]
+
+    body = client.get('/api/assets?tokenized=true&since=2024-01-02&until=2024-01-06').get_json()
+    assert [asset['estimated_value'] for asset in body['assets']] == [80000, 120000]
+
+    body = client.get('/api/assets?asset_type=art,real_estate').get_json()
+    assert [asset['asset_type'] for asset in body['assets']] == ['art', 'real_estate']
+
+
+def test_facets_count_matching_assets(client):
+    body = client.get('/api/assets?asset_type=vehicle').get_json()
+    assert body['total'] == 4
+    assert body['total_value'] == 820000
+    assert values(body['facets']['asset_type']) == {'vehicle': 4}
+    assert values(body['facets']['verification_status']) == {'verified': 4}
+    assert body['facets']['jurisdiction'] == [
+        {'value': 'US', 'count': 3, 'total_value': 740000},
+        {'value': 'UK', 'count': 1, 'total_value': 80000},
+    ]
+
+    body = client.get('/api/assets').get_json()
+    assert body['total'] == len(ASSETS)
+    assert values(body['facets']['verification_status']) == {'verified': 4, 'pending': 1, 'rejected': 1}
+
+    body = client.get('/api/assets?min_value=1000000').get_json()
+    assert body['assets'] == [] and body['total'] == 0
+    assert body['facets'] == {'asset_type': [], 'verification_status': [], 'jurisdiction': []}
+
+
+def test_pages_are_newest_first(client):
+    url = '/api/assets?verification_status=verified&limit=3&fields=id,estimated_value'
+    first = client.get(url).get_json()
+    assert [asset['estimated_value'] for asset in first['assets']] == [80000, 600000, 120000]
+    assert set(first['assets'][0]) == {'id', 'estimated_value'}
+    assert first['total'] == 4
+
+    second = client.get(f"{url}&cursor={first['next_cursor']}").get_json()
+    assert [asset['estimated_value'] for asset in second['assets']] == [20000]
+    assert second['next_cursor'] is None
+    # Facets describe the whole result, so only the first page carries them
+    assert 'facets' not in second
+
+
+@pytest.mark.parametrize('query', [
+    'min_value=abc', 'min_value=10&max_value=5', 'since=yesterday', 'tokenized=maybe',
+    'fields=nope', 'cursor=bad', 'limit=0',
+])
+def test_bad_queries_are_rejected(client, query):
+    response = client.get(f'/api/assets?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_parse_filters():
+    filters = parse_filters(MultiDict([
+        ('asset_type', 'vehicle, art'), ('asset_type', 'vehicle'), ('jurisdiction', 'us'),
+        ('min_value', '5'), ('tokenized', 'false'), ('since', '2024-01-01'), ('verification_status', ''),
+    ]))
+    assert filters == {
+        'asset_type': ['vehicle', 'art'], 'jurisdiction': ['US'], 'min_value': 5.0,
+        'since': datetime(2024, 1, 1), 'tokenized': False,
+    }
+    with pytest.raises(InvalidAssetQuery):
+        parse_filters(MultiDict([('asset_type', ','.join(str(n) for n in range(51)))]))
@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.models.database import db, User, Asset
+from app.models.fields import InvalidFieldRequest, parse_fields, project, serialize
+from app.models.pagination import keyset_page
+
+
+@pytest.fixture
+def holdings():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(wallet_address='0x742d35Cc6e34d8d7C15fE14c123456789abcdef0')
+        db.session.add(user)
+        db.session.commit()
+
+        for i in range(5):
+            asset = Asset(
+                user_id=user.id,
+                asset_type='artwork',
+                description='Oil painting ' * 50,
+                estimated_value=1000 * i,
+                location='London',
+                # NULL, as on rows from before currencies were stored
+                currency='GBP' if i else None,
+                created_at=datetime(2024, 1, i + 1),
+            )
+            asset.requirements_data = {'confidence_score': 0.5}
+            db.session.add(asset)
+        db.session.commit()
+
+        yield Asset.query.filter_by(user_id=user.id)
+
+
+def test_parse_fields():
+    assert parse_fields(None, Asset) is None
+    assert parse_fields('', Asset) is None
+    assert parse_fields('token_id, id,token_id', Asset) == ['token_id', 'id']
+    with pytest.raises(InvalidFieldRequest):
+        parse_fields('id,owner_secret', Asset)
+    with pytest.raises(InvalidFieldRequest):
+        parse_fields(',', Asset)
+
+
+def test_projection_selects_only_requested_columns(holdings):
+    """Unrequested columns never appear in the SQL"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        fields = ['asset_type', 'estimated_value']
+        rows, next_cursor = keyset_page(project(holdings, Asset, fields), Asset, 2)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    assert next_cursor is not None
+    assert [serialize(row, fields) for row in rows] == [
+        {'asset_type': 'artwork', 'estimated_value': 4000},
+        {'asset_type': 'artwork', 'estimated_value': 3000},
+    ]
+    assert 'description' not in statements[-1]
+    assert 'requirements' not in statements[-1]
+
+
+def test_projection_matches_full_document(holdings):
+    fields = ['id', 'requirements', 'created_at', 'verification_status', 'currency']
+    projected = project(holdings, Asset, fields).order_by(Asset.id).all()
+    full = holdings.order_by(Asset.id).all()
+
+    for row, asset in zip(projected, full):
+        document = asset.to_dict()
+        assert serialize(row, fields) == {name: document[name] for name in fields}
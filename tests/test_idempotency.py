@@ -0,0 +1,111 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify, request
+
+from app.models.database import db, IdempotencyKey
+from app.models.idempotency import init_idempotency
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'idempotency.db'}"
+    app.config['IDEMPOTENCY_WAIT_SECONDS'] = 5
+    db.init_app(app)
+    init_idempotency(app)
+    app.calls = []
+
+    @app.route('/api/intake', methods=['POST'])
+    def intake():
+        app.calls.append(request.get_json())
+        time.sleep(request.get_json().get('delay', 0))
+        if request.get_json().get('fail'):
+            return jsonify({'error': 'Internal server error'}), 500
+        return jsonify({'success': True, 'asset_id': len(app.calls)}), 202, {'Location': '/api/jobs/1'}
+
+    with app.app_context():
+        db.create_all()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def post(client, key, body):
+    return client.post('/api/intake', json=body, headers={'Idempotency-Key': key})
+
+
+def test_retry_replays_the_stored_response(app):
+    client = app.test_client()
+    first = post(client, 'abc', {'user_input': 'sedan'})
+    retry = post(client, 'abc', {'user_input': 'sedan'})
+
+    assert len(app.calls) == 1
+    assert (retry.status_code, retry.get_json()) == (202, {'success': True, 'asset_id': 1})
+    assert retry.headers['Location'] == first.headers['Location']
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+
+    # No key, or a new key, runs the route again
+    client.post('/api/intake', json={'user_input': 'sedan'})
+    post(client, 'def', {'user_input': 'sedan'})
+    assert len(app.calls) == 3
+
+
+def test_key_reused_for_another_request_is_refused(app):
+    client = app.test_client()
+    post(client, 'abc', {'user_input': 'sedan'})
+    response = post(client, 'abc', {'user_input': 'condo'})
+    assert response.status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_server_errors_are_not_stored(app):
+    client = app.test_client()
+    assert post(client, 'abc', {'fail': True}).status_code == 500
+    assert post(client, 'abc', {'fail': True}).status_code == 500
+    assert len(app.calls) == 2
+    with app.app_context():
+        assert db.session.query(IdempotencyKey).count() == 0
+
+
+def test_concurrent_duplicates_wait_for_the_first(app):
+    responses = []
+
+    def send():
+        responses.append(post(app.test_client(), 'abc', {'delay': 0.3}))
+
+    threads = [threading.Thread(target=send) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(app.calls) == 1
+    assert [response.status_code for response in responses] == [202] * 3
+    assert sorted(response.headers.get('Idempotent-Replayed', 'false') for response in responses) == \
+        ['false', 'true', 'true']
+
+
+def test_expired_keys_are_forgotten(app):
+    client = app.test_client()
+    post(client, 'abc', {'user_input': 'sedan'})
+    app.config['IDEMPOTENCY_TTL_SECONDS'] = 0
+    assert 'Idempotent-Replayed' not in post(client, 'abc', {'user_input': 'sedan'}).headers
+    assert len(app.calls) == 2
+
+    app.config['IDEMPOTENCY_TTL_SECONDS'] = 3600
+    app.config['IDEMPOTENCY_MAX_KEYS'] = 2
+    for key in ('k1', 'k2', 'k3'):
+        post(client, key, {'user_input': key})
+        time.sleep(0.01)
+    with app.app_context():
+        app.extensions['idempotency'].prune()
+        assert sorted(row.key for row in db.session.query(IdempotencyKey)) == ['k2', 'k3']
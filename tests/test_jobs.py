@@ -0,0 +1,147 @@
+import pytest
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, abort
+from sqlalchemy import inspect
+
+from app.models.database import db
+from app.models.jobs import (
+    FAILED, QUEUED, SUCCEEDED, claim, create_job_table, enqueue, get_job, init_jobs,
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'main.db'}"
+    app.config['SQLALCHEMY_BINDS'] = {'jobs': f"sqlite:///{tmp_path / 'jobs.db'}"}
+    app.config['JOB_QUEUE_ENABLED'] = True
+    app.config['JOB_RETRY_SECONDS'] = 0
+    app.config['JOB_MAX_ATTEMPTS'] = 3
+    db.init_app(app)
+    init_jobs(app, db)
+
+    with app.app_context():
+        create_job_table()
+
+    yield app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def make_pool(app, handlers):
+    pool = app.extensions['jobs']
+    pool.handlers.update(handlers)
+    return pool
+
+
+def test_job_runs_and_records_result(app):
+    calls = []
+
+    def verify(asset_id, progress):
+        progress('verifying')
+        calls.append(asset_id)
+        return {'success': True, 'asset_id': asset_id}, 200
+
+    pool = make_pool(app, {'verify': verify})
+    with app.app_context():
+        job_id = enqueue('verify', 7)
+        assert get_job(job_id)['status'] == QUEUED
+
+        assert pool.run_once()
+        assert not pool.run_once()
+
+        job = get_job(job_id)
+        assert calls == [7]
+        assert job['status'] == SUCCEEDED
+        assert job['result'] == {'success': True, 'asset_id': 7}
+        assert job['attempts'] == 1
+
+
+def test_failures_retry_until_attempts_run_out(app):
+    def flaky(asset_id, progress):
+        raise ConnectionError('chain unreachable')
+
+    pool = make_pool(app, {'tokenize': flaky})
+    with app.app_context():
+        job_id = enqueue('tokenize', 1)
+        for _ in range(3):
+            assert pool.run_once()
+        assert not pool.run_once()
+
+        job = get_job(job_id)
+        assert job['status'] == FAILED
+        assert job['attempts'] == 3
+        assert job['error'] == 'chain unreachable'
+
+
+def test_refusals_and_missing_assets_are_not_retried(app):
+    def refuse(asset_id, progress):
+        if asset_id == 404:
+            abort(404)
+        return {'error': 'Asset must be verified before tokenization'}, 400
+
+    pool = make_pool(app, {'tokenize': refuse})
+    with app.app_context():
+        refused, missing = enqueue('tokenize', 1), enqueue('tokenize', 404)
+        pool.run_once()
+        pool.run_once()
+
+        assert get_job(refused)['status'] == FAILED
+        assert get_job(refused)['attempts'] == 1
+        assert get_job(refused)['error'] == 'Asset must be verified before tokenization'
+        assert get_job(missing)['status'] == FAILED
+
+
+def test_jobs_for_one_asset_run_in_order(app):
+    with app.app_context():
+        verify = enqueue('verify', 1)
+        tokenize = enqueue('tokenize', 1)
+        other = enqueue('verify', 2)
+
+        first = claim('worker-a')
+        second = claim('worker-b')
+        assert (first.id, second.id) == (verify, other)
+        # The tokenize waits behind the running verify
+        assert claim('worker-c') is None
+        assert get_job(tokenize)['status'] == QUEUED
+
+
+def test_expired_lease_is_reclaimed(app):
+    with app.app_context():
+        job_id = enqueue('verify', 1)
+        stale = claim('crashed', lease_seconds=-1)
+        assert stale.id == job_id
+
+        reclaimed = claim('worker')
+        assert reclaimed.id == job_id
+        assert reclaimed.attempts == 2
+        assert reclaimed.locked_by != stale.locked_by
+
+
+def test_worker_threads_pick_up_new_jobs(app):
+    def verify(asset_id, progress):
+        return {'success': True}, 200
+
+    app.config['JOB_POLL_SECONDS'] = 5
+    pool = make_pool(app, {'verify': verify})
+    pool.start(2)
+    try:
+        with app.app_context():
+            job_ids = [enqueue('verify', asset_id) for asset_id in range(4)]
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if all(get_job(job_id)['status'] == SUCCEEDED for job_id in job_ids):
+                    break
+                time.sleep(0.05)
+            assert [get_job(job_id)['status'] for job_id in job_ids] == [SUCCEEDED] * 4
+            # The queue lives on the jobs bind only
+            assert 'job' not in inspect(db.engines[None]).get_table_names()
+    finally:
+        pool.stop(timeout=5)
@@ -0,0 +1,221 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from app import codec
+from app.agents.verification_agent import VerificationAgent
+from app.models.database import db, User, Asset, Transaction, StatCounter, verification_summary
+from app.models.migrations import add_missing_columns, backfill_verification_columns, migrate_wallet_addresses
+from app.models.sharding import bucket_for
+from config import TestingConfig
+from migrate_db import migrate_database
+
+OTHER_WALLET = '0x1111111111111111111111111111111111111111'
+
+LEGACY_TRANSACTION_TABLE = """
+CREATE TABLE "transaction" (
+    id INTEGER PRIMARY KEY,
+    asset_id INTEGER NOT NULL REFERENCES asset (id),
+    transaction_type VARCHAR(50) NOT NULL,
+    transaction_hash VARCHAR(100),
+    status VARCHAR(20),
+    details TEXT,
+    created_at DATETIME
+)
+"""
+
+# The user and asset tables as they were before wallet addresses went binary
+# and assets gained a version and a currency
+LEGACY_TABLES = [
+    """
+    CREATE TABLE user (
+        id INTEGER PRIMARY KEY,
+        wallet_address VARCHAR(42) NOT NULL UNIQUE,
+        email VARCHAR(120),
+        kyc_status VARCHAR(20),
+        jurisdiction VARCHAR(10),
+        created_at DATETIME
+    )
+    """,
+    """
+    CREATE TABLE asset (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        asset_type VARCHAR(50) NOT NULL,
+        description TEXT NOT NULL,
+        estimated_value FLOAT NOT NULL,
+        location VARCHAR(200) NOT NULL,
+        verification_status VARCHAR(20),
+        token_id VARCHAR(100),
+        requirements TEXT,
+        created_at DATETIME,
+        updated_at DATETIME
+    )
+    """,
+    LEGACY_TRANSACTION_TABLE,
+]
+
+
+@pytest.fixture
+def asset():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(wallet_address='0x742d35Cc6e34d8d7C15fE14c123456789abcdef0')
+        db.session.add(user)
+        db.session.flush()
+        asset = Asset(user_id=user.id, asset_type='real_estate', description='3 bedroom apartment, 1200 sqft',
+                      estimated_value=450000, location='New York')
+        db.session.add(asset)
+        db.session.commit()
+        yield asset
+
+
+def test_verification_result_fills_typed_columns(asset):
+    result = VerificationAgent().verify_asset(asset.to_dict())
+    tx = Transaction(asset_id=asset.id, transaction_type='verification', status=result['status'],
+                     details_data=result)
+    db.session.add(tx)
+    db.session.commit()
+
+    assert tx.verification_score == result['overall_score']
+    assert tx.compliance_score == result['breakdown']['compliance']
+    assert tx.ruleset_version == VerificationAgent.RULESET_VERSION
+    assert verification_summary(tx) == {
+        'status': result['status'],
+        'overall_score': result['overall_score'],
+        'breakdown': result['breakdown'],
+        'ruleset_version': result['ruleset_version'],
+    }
+
+    tokenization = Transaction(asset_id=asset.id, transaction_type='tokenization', details_data={'success': True})
+    assert tokenization.verification_score is None
+
+
+def test_legacy_table_is_upgraded_and_backfilled(asset):
+    """Old rows gain the typed columns with values parsed from their blobs"""
+    db.session.execute(text('DROP TABLE "transaction"'))
+    db.session.execute(text(LEGACY_TRANSACTION_TABLE))
+    result = VerificationAgent().verify_asset(asset.to_dict())
+    rows = [
+        ('verification', codec.dumps(result)),
+        ('verification', 'not json'),
+        ('tokenization', codec.dumps({'success': True})),
+    ]
+    for transaction_type, details in rows:
+        db.session.execute(
+            text('INSERT INTO "transaction" (asset_id, transaction_type, status, details) '
+                 'VALUES (:asset_id, :type, :status, :details)'),
+            {'asset_id': asset.id, 'type': transaction_type, 'status': 'verified', 'details': details},
+        )
+    db.session.commit()
+
+    assert 'compliance_score' in add_missing_columns(Transaction)
+    assert add_missing_columns(Transaction) == []
+    assert backfill_verification_columns(batch_size=1) == 1
+    assert backfill_verification_columns() == 0
+
+    scored = Transaction.query.filter(Transaction.compliance_score.isnot(None)).all()
+    assert len(scored) == 1
+    assert scored[0].asset_specific_score == result['breakdown']['asset_specific']
+    assert {c['name'] for c in inspect(db.engine).get_columns('transaction')} >= {'ruleset_version'}
+
+
+def test_text_wallet_addresses_become_binary(asset):
+    """Case variants of one wallet merge; every address ends up as 20 bytes"""
+    wallet = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+    owner_id = asset.user_id
+    for address in (wallet, wallet.lower()):
+        db.session.execute(text('INSERT INTO user (wallet_address, created_at) VALUES (:address, :now)'),
+                           {'address': address, 'now': datetime(2024, 1, 1)})
+    duplicate_id = db.session.execute(text('SELECT max(id) FROM user')).scalar()
+    db.session.execute(text('UPDATE asset SET user_id = :id'), {'id': duplicate_id})
+    db.session.execute(text('UPDATE user SET wallet_address = :text WHERE id = :id'),
+                       {'text': '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0', 'id': owner_id})
+    db.session.commit()
+
+    assert migrate_wallet_addresses(batch_size=1) == 2
+    assert migrate_wallet_addresses() == 0
+
+    db.session.expire_all()
+    users = User.query.order_by(User.id).all()
+    assert [user.to_dict()['wallet_address'].lower() for user in users] == [
+        '0x742d35cc6e34d8d7c15fe14c123456789abcdef0', wallet.lower(),
+    ]
+    assert Asset.query.one().user_id == users[1].id
+    assert db.session.execute(text('SELECT count(*) FROM user WHERE length(wallet_address) = 20')).scalar() == 2
+    # The users inserted above bypassed the counters; the merge recounts them
+    assert db.session.get(StatCounter, 'total_users').value == 2
+
+
+def test_malformed_wallet_address_aborts_migration(asset):
+    db.session.execute(text("UPDATE user SET wallet_address = '0xnot-a-wallet'"))
+    db.session.commit()
+
+    with pytest.raises(RuntimeError):
+        migrate_wallet_addresses()
+    db.session.rollback()
+    assert db.session.execute(text('SELECT wallet_address FROM user')).scalar() == '0xnot-a-wallet'
+
+
+def test_pre_series_database_is_migrated(tmp_path):
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'legacy.db'}"
+
+    from app.main import create_app, create_schema
+
+    app = create_app(Settings)
+    wallet = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for ddl in LEGACY_TABLES:
+                connection.execute(text(ddl))
+            connection.execute(text(
+                "INSERT INTO user (id, wallet_address, kyc_status, created_at) VALUES (:id, :wallet, 'pending', :now)"
+            ), [
+                {'id': 1, 'wallet': wallet, 'now': datetime(2023, 1, 1)},
+                {'id': 2, 'wallet': OTHER_WALLET, 'now': datetime(2023, 1, 1)},
+                # The same wallet as user 1, merged into it by the migration
+                {'id': 3, 'wallet': wallet.lower(), 'now': datetime(2023, 1, 2)},
+            ])
+            connection.execute(text(
+                "INSERT INTO asset (id, user_id, asset_type, description, estimated_value, location, "
+                "verification_status, token_id, created_at, updated_at) "
+                "VALUES (:id, :user_id, :asset_type, :description, :value, 'New York', :status, :token_id, :now, :now)"
+            ), [
+                {'id': 1, 'user_id': 1, 'asset_type': 'real_estate', 'description': '3 bedroom apartment',
+                 'value': 450000, 'status': 'verified', 'token_id': 'RWA_1', 'now': datetime(2023, 1, 1)},
+                {'id': 2, 'user_id': 2, 'asset_type': 'vehicle', 'description': '2019 sedan',
+                 'value': 20000, 'status': 'pending', 'token_id': None, 'now': datetime(2023, 1, 1)},
+            ])
+        # What init-db runs before the migration; it must not read the columns that are missing yet
+        create_schema()
+
+    migrate_database(app)
+
+    with app.app_context():
+        assert {'version', 'currency'} <= {column['name'] for column in inspect(db.engine).get_columns('asset')}
+        assert db.session.get(User, 1).bucket == bucket_for(wallet)
+
+    client = app.test_client()
+    body = client.get(f'/api/portfolio/{wallet}').get_json()
+    assert body['asset_count'] == 1 and body['verified_count'] == 1
+    assert body['total_value'] == 450000
+    body = client.get('/api/search?q=apartment').get_json()
+    assert [asset['id'] for asset in body['assets']] == [1]
+    body = client.get('/api/stats').get_json()
+    assert (body['total_users'], body['total_assets'], body['verified_assets'], body['tokenized_assets']) == (
+        2, 2, 1, 1,
+    )
+
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,93 @@
+import pytest
+import sys
+import os
+import gzip
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, Response, jsonify
+
+from app import negotiation
+from app.negotiation import init_compression, msgpack_response, wants_msgpack
+
+ROWS = [{'id': i, 'asset_type': 'vehicle', 'description': '2019 sedan in Texas'} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['COMPRESS_MIN_SIZE'] = 512
+    init_compression(app)
+
+    @app.route('/large')
+    def large():
+        response = jsonify({'assets': ROWS})
+        response.set_etag('v1')
+        return response
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{{"id":{row["id"]}}}\n' for row in ROWS), mimetype='application/x-ndjson')
+
+    @app.route('/events')
+    def events():
+        return Response(iter(['data: 1\n\n'] * 100), mimetype='text/event-stream')
+
+    return app.test_client()
+
+
+def test_large_responses_are_gzipped_with_their_own_etag(client):
+    plain = client.get('/large')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    compressed = client.get('/large', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data) / 4
+    assert compressed.headers['Content-Length'] == str(len(compressed.data))
+    assert compressed.headers['ETag'] == '"v1-gzip"'
+
+
+def test_small_and_refused_responses_stay_plain(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/large', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+
+def test_streams_compress_except_event_streams(client):
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = zlib.decompress(response.data, 16 + zlib.MAX_WBITS).decode().splitlines()
+    assert len(lines) == len(ROWS)
+
+    assert 'Content-Encoding' not in client.get('/events', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_brotli_is_preferred_when_installed(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == client.get('/large').data
+
+
+def test_msgpack_is_negotiated():
+    msgpack = pytest.importorskip('msgpack')
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept': 'application/msgpack'}):
+        assert wants_msgpack()
+        response = msgpack_response({'assets': ROWS[:2]})
+        assert msgpack.unpackb(response.get_data()) == {'assets': ROWS[:2]}
+    with app.test_request_context(headers={'Accept': '*/*'}):
+        assert not wants_msgpack()
+
+
+def test_json_is_served_without_msgpack(monkeypatch):
+    monkeypatch.setattr(negotiation, 'msgpack', None)
+    app = Flask(__name__)
+    with app.test_request_context('/?format=msgpack', headers={'Accept': 'application/msgpack'}):
+        assert not wants_msgpack()
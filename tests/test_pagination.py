@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models.database import db, User, Asset
+from app.models.pagination import (
+    MAX_LIMIT,
+    InvalidPageRequest,
+    decode_cursor,
+    iter_rows,
+    keyset_page,
+    parse_limit,
+)
+
+
+@pytest.fixture
+def wallet_assets():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(wallet_address='0x742d35Cc6e34d8d7C15fE14c123456789abcdef0')
+        db.session.add(user)
+        db.session.commit()
+
+        # Several assets share a timestamp so ties must be broken on id
+        for i in range(7):
+            db.session.add(Asset(
+                user_id=user.id,
+                asset_type='vehicle',
+                description=f'Vehicle {i}',
+                estimated_value=1000 * i,
+                location='Texas',
+                created_at=datetime(2024, 1, 1 if i < 5 else 2),
+            ))
+        db.session.commit()
+
+        yield Asset.query.filter_by(user_id=user.id)
+
+
+def test_pages_cover_every_row_once(wallet_assets):
+    """Walking the cursors returns all rows newest first without gaps"""
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(wallet_assets, Asset, 2, cursor)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_stream_matches_pages(wallet_assets):
+    assert [row.id for row in iter_rows(wallet_assets, Asset)] == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_limit_is_capped():
+    assert parse_limit(None) > 0
+    assert parse_limit(str(MAX_LIMIT * 10)) == MAX_LIMIT
+    with pytest.raises(InvalidPageRequest):
+        parse_limit('0')
+
+
+def test_bad_cursor_rejected():
+    with pytest.raises(InvalidPageRequest):
+        decode_cursor('not-a-cursor')
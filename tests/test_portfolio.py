@@ -0,0 +1,171 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import select, update
+
+from app.main import create_app, create_schema
+from app.models.database import db, User, Asset, FxRate, PortfolioRollup
+from app.models.fx import set_fx_rate
+from app.models.portfolio import ensure_portfolio_rollups, rebuild_portfolio_rollups
+from app.models.seed import SeedGenerator, load
+from config import TestingConfig
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+OTHER_WALLET = '0x1111111111111111111111111111111111111111'
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'portfolio.db'}"
+
+    app = create_app(Settings)
+    with app.app_context():
+        create_schema()
+        user = User(wallet_address=WALLET)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            Asset(user_id=user.id, asset_type='vehicle', description='Sedan', estimated_value=20000,
+                  location='Texas'),
+            Asset(user_id=user.id, asset_type='real_estate', description='Flat worth 2.5 crore',
+                  estimated_value=2.5e7, currency='INR', location='Mumbai'),
+            Asset(user_id=user.id, asset_type='vehicle', description='Truck', estimated_value=50000,
+                  location='Texas'),
+        ])
+        db.session.commit()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def rollups():
+    rows = db.session.scalars(select(PortfolioRollup).where(PortfolioRollup.asset_count > 0)).all()
+    return sorted(
+        (row.user_id, row.asset_type, row.currency,
+         *(pytest.approx(getattr(row, name)) for name in PortfolioRollup.METRICS))
+        for row in rows
+    )
+
+
+def assert_matches_rebuild():
+    incremental = rollups()
+    rebuild_portfolio_rollups(db.session.connection())
+    db.session.commit()
+    assert incremental == rollups()
+
+
+def test_rollups_follow_verification_and_tokenization(app):
+    with app.app_context():
+        assert rollups() == [
+            (1, 'real_estate', 'INR', 1, 2.5e7, 0, 0, 0, 0),
+            (1, 'vehicle', 'USD', 2, 70000, 0, 0, 0, 0),
+        ]
+
+        sedan, flat, truck = Asset.query.order_by(Asset.id).all()
+        sedan.verification_status = 'verified'
+        flat.verification_status = 'verified'
+        db.session.commit()
+        sedan.token_id = 'token-1'
+        truck.estimated_value = 55000
+        db.session.commit()
+        assert rollups() == [
+            (1, 'real_estate', 'INR', 1, 2.5e7, 1, 2.5e7, 0, 0),
+            (1, 'vehicle', 'USD', 2, 75000, 1, 20000, 1, 20000),
+        ]
+
+        db.session.delete(flat)
+        db.session.commit()
+        assert [row[:3] for row in rollups()] == [(1, 'vehicle', 'USD')]
+        assert_matches_rebuild()
+
+
+def test_routes_keep_rollups_in_step(app):
+    client = app.test_client()
+    assert client.post('/api/verify/1').status_code == 200
+    client.post('/api/tokenize/1')
+    with app.app_context():
+        assert_matches_rebuild()
+
+
+def test_portfolio_in_requested_currency(app):
+    client = app.test_client()
+    body = client.get(f'/api/portfolio/{WALLET}').get_json()
+    assert body['wallet_address'].lower() == WALLET.lower()
+    assert body['currency'] == 'USD'
+    assert body['asset_count'] == 3
+    # 2.5 crore rupees at the default 0.012 USD per rupee
+    assert body['total_value'] == pytest.approx(370000)
+    assert body['by_asset_type']['real_estate']['total_value'] == pytest.approx(300000)
+    assert body['by_asset_type']['vehicle']['asset_count'] == 2
+    assert body['by_currency'] == {
+        'INR': {'asset_count': 1, 'total_value': 2.5e7},
+        'USD': {'asset_count': 2, 'total_value': 70000},
+    }
+
+    body = client.get(f'/api/portfolio/{WALLET}?currency=inr').get_json()
+    assert body['currency'] == 'INR'
+    assert body['total_value'] == pytest.approx(2.5e7 + 70000 / 0.012)
+    assert body['fx_rates']['INR'] == 1.0
+
+    body = client.get(f'/api/portfolio/{OTHER_WALLET}').get_json()
+    assert body['asset_count'] == 0 and body['total_value'] == 0
+    assert body['by_asset_type'] == {}
+
+    assert client.get(f'/api/portfolio/{WALLET}?currency=XYZ').status_code == 400
+    assert client.get(f'/api/portfolio/{WALLET}?currency=dollars').status_code == 400
+    assert client.get('/api/portfolio/not-a-wallet').status_code == 400
+
+
+def test_fx_rates_are_cached(app):
+    client = app.test_client()
+    url = f'/api/portfolio/{WALLET}'
+    assert client.get(url).get_json()['total_value'] == pytest.approx(370000)
+
+    with app.app_context():
+        db.session.execute(update(FxRate).where(FxRate.currency == 'INR').values(usd_rate=0.02))
+        db.session.commit()
+    # Still the cached rate until it expires or is set through set_fx_rate
+    assert client.get(url).get_json()['total_value'] == pytest.approx(370000)
+
+    with app.app_context():
+        set_fx_rate('inr', 0.01)
+    assert client.get(url).get_json()['total_value'] == pytest.approx(320000)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['set-fx-rate', 'EUR', '1.1'])
+    assert result.exit_code == 0
+    with app.app_context():
+        assert db.session.get(FxRate, 'EUR').usd_rate == 1.1
+
+
+def test_seed_and_existing_databases_get_rollups(app):
+    with app.app_context():
+        load(SeedGenerator(seed=5, users=20), batch_size=50)
+        assert_matches_rebuild()
+
+        db.session.execute(PortfolioRollup.__table__.delete())
+        db.session.commit()
+        assert ensure_portfolio_rollups(db.session.connection()) > 2
+        db.session.commit()
+        assert_matches_rebuild()
+        assert len(rollups()) > 2
+
+
+def test_nlp_agent_reads_rupee_amounts():
+    spacy = pytest.importorskip('spacy')
+    if not spacy.util.is_package('en_core_web_sm'):
+        pytest.skip("spaCy model en_core_web_sm is not installed")
+    from app.agents.nlp_agent import NLPAgent
+
+    agent = NLPAgent()
+    assert agent._extract_amount('Flat in Mumbai worth 2.5 crore') == (2.5e7, 'INR')
+    assert agent._extract_amount('Villa worth 45 lakhs in Goa') == (4.5e6, 'INR')
+    assert agent._extract_amount('Land for Rs. 8,00,000') == (8e5, 'INR')
+    assert agent._extract_amount('Apartment in New York worth $450,000') == (450000, 'USD')
+    assert agent._extract_amount('Handcrafted 2 craft tables') == (None, 'USD')
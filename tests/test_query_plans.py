@@ -0,0 +1,25 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import check_query_plans
+
+# The routes run the NLP agent, which needs the spaCy model
+spacy = pytest.importorskip('spacy')
+if not spacy.util.is_package('en_core_web_sm'):
+    pytest.skip("spaCy model en_core_web_sm is not installed", allow_module_level=True)
+
+
+def test_route_queries_use_indexes():
+    """No route query is planned as a full table scan"""
+    plans = check_query_plans.collect_query_plans()
+    assert plans, "no queries were captured"
+    assert check_query_plans.find_full_scans(plans) == []
+
+
+def test_unindexed_filter_is_reported():
+    """The checker flags a filtered scan of a real table"""
+    assert check_query_plans.is_full_scan('SCAN asset', {'asset'})
+    assert not check_query_plans.is_full_scan('SEARCH asset USING INDEX ix_asset_user_created (user_id=?)', {'asset'})
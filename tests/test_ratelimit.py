@@ -0,0 +1,129 @@
+import pytest
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+
+from app.models.ratelimit import LoadMonitor, MemoryBuckets, bucket_store, init_rate_limits, load_monitor
+import config
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+OTHER_WALLET = '0x0000000000000000000000000000000000000001'
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(
+        RATELIMIT_IP_RATE=0.01, RATELIMIT_IP_BURST=100,
+        RATELIMIT_WALLET_RATE=0.01, RATELIMIT_WALLET_BURST=20,
+        SHED_NLP_QUEUE_DEPTH=2, SHED_NLP_P95_SECONDS=0, SHED_RETRY_SECONDS=7,
+    )
+    init_rate_limits(app)
+
+    @app.route('/api/intake', methods=['POST'])
+    def asset_intake():
+        return jsonify({'success': True})
+
+    @app.route('/api/assets/<wallet_address>')
+    def get_user_assets(wallet_address):
+        return jsonify({'assets': []})
+
+    @app.route('/health')
+    def health_check_basic():
+        return jsonify(status='ok')
+
+    return app
+
+
+def test_bucket_refills_at_its_rate():
+    buckets = MemoryBuckets()
+    assert buckets.take('ip:1', 5, rate=10, burst=10) == (True, 0.0)
+    assert buckets.take('ip:1', 5, rate=10, burst=10)[0]
+    allowed, wait = buckets.take('ip:1', 5, rate=10, burst=10)
+    assert not allowed and 0.4 < wait <= 0.5
+    time.sleep(0.5)
+    assert buckets.take('ip:1', 5, rate=10, burst=10)[0]
+
+
+def test_buckets_are_bounded():
+    buckets = MemoryBuckets(max_buckets=2)
+    for key in ('a', 'b', 'c'):
+        buckets.take(key, 1, rate=1, burst=1)
+    assert len(buckets) == 2
+    # 'a' was dropped and comes back full
+    assert buckets.take('a', 1, rate=1, burst=1)[0]
+    with pytest.raises(ValueError):
+        bucket_store('memcached://localhost')
+
+
+def test_memory_buckets_are_refused_with_several_workers():
+    app = Flask(__name__)
+    app.config.update(WEB_CONCURRENCY=4, RATELIMIT_STORAGE_URL='memory://')
+    with pytest.raises(RuntimeError):
+        init_rate_limits(app)
+
+    app = Flask(__name__)
+    app.config.update(WEB_CONCURRENCY=4, RATELIMIT_STORAGE_URL='memory://', RATELIMIT_ENABLED=False)
+    init_rate_limits(app)
+
+
+def test_worker_count_follows_gunicorn_settings(monkeypatch):
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.delenv('GUNICORN_CMD_ARGS', raising=False)
+    assert config._worker_count() == 1
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    assert config._worker_count() == 4
+    monkeypatch.setenv('GUNICORN_CMD_ARGS', '--threads 16 --workers 2')
+    assert config._worker_count() == 2
+    monkeypatch.setenv('GUNICORN_CMD_ARGS', '--workers=3')
+    assert config._worker_count() == 3
+
+
+def test_intake_costs_more_than_reads_per_wallet(app):
+    client = app.test_client()
+    for _ in range(2):
+        assert client.post('/api/intake', json={'wallet_address': WALLET}).status_code == 200
+    response = client.post('/api/intake', json={'wallet_address': WALLET.lower()})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+    # Reads cost 1 and the wallet has none left; another wallet is unaffected
+    assert client.get(f'/api/assets/{WALLET}').status_code == 429
+    assert client.get(f'/api/assets/{OTHER_WALLET}').status_code == 200
+    assert client.get('/health').status_code == 200
+
+
+def test_ip_bucket_covers_requests_without_a_wallet(app):
+    app.config['RATELIMIT_IP_BURST'] = 3
+    client = app.test_client()
+    statuses = [client.get(f'/api/assets/0x{index:040x}').status_code for index in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    other_client = app.test_client()
+    assert other_client.get('/api/assets/x', environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 200
+
+
+def test_intake_is_shed_when_the_nlp_queue_is_deep(app):
+    client = app.test_client()
+    with app.app_context():
+        monitor = load_monitor()
+        with monitor.track(), monitor.track():
+            response = client.post('/api/intake', json={'wallet_address': WALLET})
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '7'
+            # Reads are not shed
+            assert client.get(f'/api/assets/{WALLET}').status_code == 200
+    assert client.post('/api/intake', json={'wallet_address': WALLET}).status_code == 200
+
+
+def test_p95_latency_triggers_shedding():
+    monitor = LoadMonitor(window_seconds=60)
+    assert monitor.p95() is None
+    monitor._samples.extend((time.monotonic(), 0.1) for _ in range(18))
+    monitor._samples.extend((time.monotonic(), 9.0) for _ in range(2))
+    assert monitor.p95() == 9.0
+    assert monitor.overloaded({'SHED_NLP_P95_SECONDS': 5, 'SHED_RETRY_SECONDS': 5}) == 9
+    assert monitor.overloaded({'SHED_NLP_P95_SECONDS': 10}) == 0
@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, jsonify
+
+from app.models.database import db, User
+from app.models.routing import (
+    READ_YOUR_WRITES_COOKIE,
+    REPLICA_BIND_KEY,
+    configure_engines,
+    engine_options,
+    init_read_routing,
+    replica_read,
+)
+from config import TestingConfig
+
+PRIMARY_WALLET = '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed'
+
+
+@pytest.fixture
+def routed_app(tmp_path):
+    """Primary and replica as two separate SQLite files"""
+
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URI = f"sqlite:///{tmp_path / 'replica.db'}"
+        READ_YOUR_WRITES_SECONDS = 30
+
+    app = Flask(__name__)
+    configure_engines(app, Settings)
+    db.init_app(app)
+    init_read_routing(app, db)
+
+    @app.route('/users')
+    @replica_read
+    def list_users():
+        return jsonify([u.to_dict()['wallet_address'] for u in User.query.order_by(User.id).all()])
+
+    @app.route('/users', methods=['POST'])
+    def add_user():
+        db.session.add(User(wallet_address=PRIMARY_WALLET))
+        db.session.commit()
+        return jsonify(success=True)
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines[REPLICA_BIND_KEY])
+
+    yield app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_read_only_route_uses_replica(routed_app):
+    """Reads go to the replica until the client writes"""
+    client = routed_app.test_client()
+    client.post('/users')
+
+    fresh_client = routed_app.test_client()
+    assert fresh_client.get('/users').get_json() == []
+
+
+def test_reads_stick_to_primary_after_write(routed_app):
+    """The writing client sees its own write on the next read"""
+    client = routed_app.test_client()
+    response = client.post('/users')
+    assert READ_YOUR_WRITES_COOKIE in response.headers.get('Set-Cookie', '')
+
+    assert client.get('/users').get_json() == [PRIMARY_WALLET]
+
+
+def test_engine_options_only_size_server_pools():
+    """Pool sizing is applied to server databases, not SQLite"""
+
+    class Postgres(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'postgresql://db/rwa'
+
+    assert 'pool_size' not in engine_options(TestingConfig)
+    options = engine_options(Postgres)
+    assert options['pool_size'] == TestingConfig.DB_POOL_SIZE
+    assert options['pool_pre_ping'] is True
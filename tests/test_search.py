@@ -0,0 +1,149 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from sqlalchemy import text
+
+from app.models.database import db, User, Asset
+from app.models.search import (
+    InvalidSearchRequest, drop_search_index, ensure_search_index, parse_query, search_assets,
+)
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'search.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user = User(wallet_address=WALLET)
+        db.session.add(user)
+        db.session.flush()
+        add_asset(user.id, 'Three bedroom apartment with a garden', 'Brooklyn, NY')
+        add_asset(user.id, '2019 Honda Civic sedan', 'Austin, TX', entities=['Honda'])
+        add_asset(user.id, 'Warehouse forklift', 'Garden City, NY')
+        add_asset(user.id, 'Oil painting of a harbour', 'Boston, MA', entities=['Monet'])
+        db.session.commit()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def add_asset(user_id, description, location, entities=()):
+    asset = Asset(user_id=user_id, asset_type='other', description=description,
+                  estimated_value=1000, location=location)
+    asset.requirements_data = {'entities': [{'text': entity, 'label': 'ORG'} for entity in entities]}
+    db.session.add(asset)
+    return asset
+
+
+def ids(matches):
+    return [asset.id for asset, score in matches]
+
+
+def test_ranks_description_above_location(app):
+    with app.app_context():
+        matches, next_cursor = search_assets(['garden'], 10)
+        assert ids(matches) == [1, 3]
+        assert next_cursor is None
+
+        assert ids(search_assets(['monet'], 10)[0]) == [4]
+        # Stemmed, and every term must match
+        assert ids(search_assets(['gardens', 'brooklyn'], 10)[0]) == [1]
+        assert search_assets(['submarine'], 10)[0] == []
+
+
+def test_index_follows_writes(app):
+    with app.app_context():
+        asset = db.session.get(Asset, 2)
+        asset.description = 'Vintage motorcycle'
+        db.session.commit()
+        assert search_assets(['civic'], 10)[0] == []
+        assert ids(search_assets(['motorcycle'], 10)[0]) == [2]
+
+        # Status changes leave the index alone but must not break it
+        asset.verification_status = 'verified'
+        db.session.commit()
+        assert ids(search_assets(['motorcycle'], 10)[0]) == [2]
+
+        db.session.delete(db.session.get(Asset, 4))
+        db.session.commit()
+        assert search_assets(['harbour'], 10)[0] == []
+
+        db.session.rollback()
+        add_asset(1, 'Motorcycle trailer', 'Denver, CO')
+        db.session.rollback()
+        assert ids(search_assets(['motorcycle'], 10)[0]) == [2]
+
+
+def test_pages_cover_every_match_once(app):
+    with app.app_context():
+        for index in range(7):
+            add_asset(1, f'Garden shed number {index}', 'Portland, OR')
+        db.session.commit()
+        expected = ids(search_assets(['garden'], 100)[0])
+
+        seen, cursor = [], None
+        while True:
+            matches, cursor = search_assets(['garden'], 3, cursor)
+            seen.extend(ids(matches))
+            if cursor is None:
+                break
+        assert seen == expected
+        assert len(seen) == 9
+
+
+def test_existing_database_is_backfilled(app):
+    with app.app_context():
+        connection = db.session.connection()
+        drop_search_index(connection)
+        assert ensure_search_index(connection) == 4
+        assert ensure_search_index(connection) == 0
+        db.session.commit()
+        assert ids(search_assets(['sedan'], 10)[0]) == [2]
+        assert db.session.execute(text('SELECT count(*) FROM asset_search')).scalar() == 4
+
+
+def test_query_parsing():
+    assert parse_query('  "Garden" OR apartment* ') == ['garden', 'or', 'apartment']
+    with pytest.raises(InvalidSearchRequest):
+        parse_query('  *** ')
+    with pytest.raises(InvalidSearchRequest):
+        parse_query(None)
+
+
+def test_search_route(tmp_path):
+    from app.main import create_app, create_schema
+    from config import TestingConfig
+
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'route.db'}"
+
+    app = create_app(Settings)
+    with app.app_context():
+        create_schema()
+        user = User(wallet_address=WALLET)
+        db.session.add(user)
+        db.session.flush()
+        add_asset(user.id, 'Lakeside cabin', 'Tahoe, CA')
+        db.session.commit()
+
+    client = app.test_client()
+    body = client.get('/api/search?q=cabin').get_json()
+    assert [asset['description'] for asset in body['assets']] == ['Lakeside cabin']
+    assert body['assets'][0]['relevance'] > 0
+    assert body['next_cursor'] is None
+    assert client.get('/api/search').status_code == 400
+    assert client.get('/api/search?q=cabin&cursor=bad').status_code == 400
+
+    with app.app_context():
+        db.engine.dispose()
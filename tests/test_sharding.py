@@ -0,0 +1,178 @@
+import pytest
+import sys
+import os
+import io
+import json
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from werkzeug.exceptions import NotFound
+
+from app.models.archive import archive_transactions, read_archived_transactions
+from app.models.database import db, User, Asset, Transaction, ArchiveSegmentEntry, PortfolioRollup
+from app.models.export import export_table
+from app.models.routing import SHARD_KEY, configure_engines, init_read_routing
+from app.models.sharding import (
+    MOVING, NUM_BUCKETS, ShardUnavailable, bucket_for, configure_shards, init_shards, init_sharding,
+    load_bucket_map, move_bucket, plan_rebalance, route_asset, route_wallet, set_bucket, shard_engine,
+)
+from app.models.stats import get_counters, reconcile_counters
+from app.models.wallets import get_or_create_user_id
+from config import TestingConfig
+
+WALLETS = [f'0x{i:040x}' for i in range(1, 13)]
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Settings(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'control.db'}"
+        SQLALCHEMY_REPLICA_URI = None
+        SHARD_URIS = [f"sqlite:///{tmp_path / 'shard0.db'}", f"sqlite:///{tmp_path / 'shard1.db'}"]
+        SHARD_MAP_SECONDS = 60
+
+    app = Flask(__name__)
+    configure_engines(app, Settings)
+    configure_shards(app, Settings)
+    app.config['STATS_CACHE_SECONDS'] = 0
+    db.init_app(app)
+    init_read_routing(app, db)
+    init_sharding(app, db)
+
+    with app.app_context():
+        db.create_all()
+        init_shards()
+
+    yield app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def intake(wallet, assets=1):
+    route_wallet(wallet, write=True)
+    user_id = get_or_create_user_id(wallet)
+    for i in range(assets):
+        asset = Asset(user_id=user_id, asset_type='vehicle', description=f'car {i}',
+                      estimated_value=1000, location='Texas')
+        db.session.add(asset)
+        db.session.flush()
+        db.session.add(Transaction(asset_id=asset.id, transaction_type='verification', status='verified'))
+    db.session.commit()
+    return user_id
+
+
+def rows_on(shard, model):
+    with shard_engine(shard).connect() as connection:
+        return connection.execute(db.select(model.__table__)).all()
+
+
+def test_wallet_rows_live_on_their_bucket_shard(app):
+    with app.app_context():
+        for wallet in WALLETS:
+            intake(wallet, assets=2)
+
+        layout = load_bucket_map()
+        for shard in (0, 1):
+            users = rows_on(shard, User)
+            assert users
+            assert all(layout[bucket_for(user.wallet_address)][0] == shard for user in users)
+
+        ids = [row.id for shard in (0, 1) for row in rows_on(shard, Asset)]
+        assert len(ids) == len(set(ids)) == 24
+
+
+def test_stats_gather_across_shards(app):
+    with app.app_context():
+        for wallet in WALLETS:
+            intake(wallet)
+
+        assert get_counters()['total_users'] == len(WALLETS)
+        assert get_counters()['total_assets'] == len(WALLETS)
+        assert reconcile_counters()['total_users'] == len(WALLETS)
+
+
+def test_unrouted_query_is_rejected(app):
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            User.query.count()
+
+
+def test_asset_lookup_finds_its_shard(app):
+    with app.app_context():
+        intake(WALLETS[0])
+        asset_id = rows_on(route_wallet(WALLETS[0]), Asset)[0].id
+        db.session.info.pop(SHARD_KEY)
+
+        assert route_asset(asset_id) == route_wallet(WALLETS[0])
+        assert db.session.get(Asset, asset_id).description == 'car 0'
+        with pytest.raises(NotFound):
+            route_asset(asset_id + 1000)
+
+
+def test_move_bucket_keeps_rows_and_counters(app, tmp_path):
+    with app.app_context():
+        user_id = intake(WALLETS[0], assets=3)
+        intake(WALLETS[1])
+        bucket = bucket_for(WALLETS[0])
+        source = load_bucket_map()[bucket][0]
+        target = 1 - source
+        # Another wallet's rows on the same shard stay where they are
+        other = bucket_for(WALLETS[1])
+        set_bucket(other, source)
+        assert {row.bucket for row in rows_on(source, User)} == {bucket, other}
+
+        # Archive one of the wallet's transactions on the source shard
+        route_wallet(WALLETS[0])
+        archived = Transaction.query.join(Asset).filter(Asset.user_id == user_id).first()
+        archived.created_at = datetime(2020, 1, 15)
+        archived_id, archived_asset_id = archived.id, archived.asset_id
+        db.session.commit()
+        assert len(archive_transactions(archive_dir=str(tmp_path / 'archive'))) == 1
+        db.session.info.pop(SHARD_KEY)
+
+        set_bucket(bucket, source, MOVING)
+        with pytest.raises(ShardUnavailable):
+            route_wallet(WALLETS[0], write=True)
+        set_bucket(bucket, source)
+
+        assert move_bucket(bucket, target, settle_seconds=0) == {
+            'users': 1, 'assets': 3, 'transactions': 2, 'archive_entries': 1,
+        }
+        assert load_bucket_map()[bucket] == (target, 'active')
+        assert [row.bucket for row in rows_on(source, User)] == [other]
+        assert [row.id for row in rows_on(target, User)] == [user_id]
+        assert get_counters()['total_assets'] == 4
+        assert user_id not in [row.user_id for row in rows_on(source, PortfolioRollup)]
+        assert rows_on(source, ArchiveSegmentEntry) == []
+        assert [row.asset_id for row in rows_on(target, ArchiveSegmentEntry)] == [archived_asset_id]
+        assert [(row.user_id, row.asset_count) for row in rows_on(target, PortfolioRollup)] == [(user_id, 3)]
+
+        db.session.info.pop(SHARD_KEY, None)
+        route_wallet(WALLETS[0])
+        assert User.query.filter_by(wallet_address=WALLETS[0]).one().id == user_id
+        assert [tx['id'] for tx in read_archived_transactions(archived_asset_id)] == [archived_id]
+
+
+def test_export_reads_every_shard(app):
+    with app.app_context():
+        for wallet in WALLETS:
+            intake(wallet)
+
+        out = io.StringIO()
+        assert export_table('users', out) == len(WALLETS)
+        assert len({json.loads(line)['id'] for line in out.getvalue().splitlines()}) == len(WALLETS)
+
+
+def test_plan_rebalance_spreads_buckets_evenly():
+    layout = {bucket: (bucket % 2, 'active') for bucket in range(NUM_BUCKETS)}
+    moves = plan_rebalance(layout, 3)
+
+    for bucket, target in moves:
+        layout[bucket] = (target, 'active')
+    owned = [sum(shard == index for shard, _ in layout.values()) for index in range(3)]
+    assert max(owned) - min(owned) <= 1
+    assert len(moves) == owned[2]
@@ -0,0 +1,81 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models.database import db, User, Asset, StatCounter
+from app.models.stats import get_counters, load_counters, reconcile_counters
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['STATS_CACHE_SECONDS'] = 60
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def add_asset(user, **kwargs):
+    asset = Asset(
+        user_id=user.id,
+        asset_type='real_estate',
+        description='3 bedroom apartment',
+        estimated_value=450000,
+        location='New York',
+        **kwargs
+    )
+    db.session.add(asset)
+    db.session.commit()
+    return asset
+
+
+def test_counters_follow_the_write_path(app):
+    """Intake, verification and tokenization keep the counters exact"""
+    user = User(wallet_address='0x742d35Cc6e34d8d7C15fE14c123456789abcdef0')
+    db.session.add(user)
+    db.session.commit()
+
+    first = add_asset(user)
+    second = add_asset(user)
+
+    first.verification_status = 'verified'
+    db.session.commit()
+    first.token_id = 'RWA_0001'
+    db.session.commit()
+
+    second.verification_status = 'verified'
+    db.session.commit()
+    second.verification_status = 'requires_review'
+    db.session.commit()
+
+    expected = {'total_assets': 2, 'total_users': 1, 'verified_assets': 1, 'tokenized_assets': 1}
+    assert load_counters() == expected
+    assert reconcile_counters() == expected
+
+    db.session.delete(first)
+    db.session.commit()
+    assert load_counters() == {'total_assets': 1, 'total_users': 1, 'verified_assets': 0, 'tokenized_assets': 0}
+
+
+def test_reconcile_repairs_drift(app):
+    db.session.add(StatCounter(name='total_users', value=42))
+    db.session.commit()
+
+    assert reconcile_counters()['total_users'] == 0
+    assert load_counters()['total_users'] == 0
+
+
+def test_cached_counters_refresh_after_local_commit(app):
+    assert get_counters()['total_users'] == 0
+
+    db.session.add(User(wallet_address='0x0000000000000000000000000000000000000001'))
+    db.session.commit()
+
+    assert get_counters()['total_users'] == 1
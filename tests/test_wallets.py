@@ -0,0 +1,100 @@
+import pytest
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app.models.addresses import InvalidWalletAddress, normalize_address
+from app.models.database import db, User
+from app.models.stats import load_counters
+from app.models.wallets import get_or_create_user_id, wallet_cache
+
+WALLET = '0x742d35Cc6e34d8d7C15fE14c123456789abcdef0'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'wallets.db'}"
+    app.config['WALLET_CACHE_SIZE'] = 2
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_created_user_is_cached_after_commit(app):
+    with app.app_context():
+        user_id = get_or_create_user_id(WALLET, email='owner@example.com', jurisdiction='US')
+        assert wallet_cache().get(normalize_address(WALLET)) is None
+
+        db.session.commit()
+        assert wallet_cache().get(normalize_address(WALLET)) == user_id
+        assert get_or_create_user_id(WALLET) == user_id
+        assert load_counters()['total_users'] == 1
+        assert db.session.get(User, user_id).kyc_status == 'pending'
+
+
+def test_rolled_back_user_is_not_cached(app):
+    with app.app_context():
+        get_or_create_user_id(WALLET)
+        db.session.rollback()
+
+        assert wallet_cache().get(normalize_address(WALLET)) is None
+        assert User.query.count() == 0
+
+
+def test_cache_is_bounded(app):
+    with app.app_context():
+        for i in range(3):
+            get_or_create_user_id(f'0x{i:040x}')
+            db.session.commit()
+
+        assert len(wallet_cache()) == 2
+        assert wallet_cache().get(bytes(20)) is None
+
+
+def test_parallel_intakes_create_one_user(app):
+    """Concurrent get-or-create calls for a new wallet agree on one user"""
+    results, errors = [], []
+    barrier = threading.Barrier(4)
+
+    def intake():
+        try:
+            with app.app_context():
+                barrier.wait()
+                results.append(get_or_create_user_id(WALLET))
+                db.session.commit()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=intake) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(results)) == 1
+    with app.app_context():
+        assert User.query.count() == 1
+        assert load_counters()['total_users'] == 1
+
+
+def test_address_casing_maps_to_one_user(app):
+    with app.app_context():
+        user_id = get_or_create_user_id(WALLET.lower())
+        db.session.commit()
+
+        assert get_or_create_user_id(WALLET.upper().replace('0X', '0x')) == user_id
+        assert User.query.filter_by(wallet_address=WALLET).one().id == user_id
+        with pytest.raises(InvalidWalletAddress):
+            get_or_create_user_id('0x742d35')